@@ -0,0 +1 @@
+"""Общие для машины Тьюринга и машины Поста части исполнителя."""
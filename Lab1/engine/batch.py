@@ -0,0 +1,48 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Программа, переданная процессу-исполнителю при запуске (см. _init_worker)
+_program = None
+
+
+def _init_worker(program):
+    global _program
+    _program = program
+
+
+def _run_chunk(runner, chunk, max_steps, timeout):
+    return [runner(_program, index, tape, max_steps, timeout) for index, tape in chunk]
+
+
+def _chunks(tapes, chunksize):
+    chunk = []
+    for item in enumerate(tapes):
+        chunk.append(item)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_batch(runner, program, tapes, max_steps=1000, timeout=None, chunksize=16, workers=None):
+    """Прогоняет одну программу на множестве лент в пуле процессов.
+
+    program - уже разобранная программа: она передается каждому процессу один
+    раз при его запуске. runner(program, index, tape, max_steps, timeout) -
+    функция уровня модуля, которая выполняет одну ленту и возвращает словарь
+    результата. Ленты раздаются пачками по chunksize, результаты выдаются
+    генератором по мере готовности пачек, поэтому порядок не сохраняется -
+    в каждом результате есть индекс ленты 'index'.
+    """
+    if chunksize < 1:
+        raise ValueError("Размер пачки должен быть положительным")
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               initargs=(program,))
+    try:
+        futures = [pool.submit(_run_chunk, runner, chunk, max_steps, timeout)
+                   for chunk in _chunks(tapes, chunksize)]
+        for future in as_completed(futures):
+            yield from future.result()
+    finally:
+        pool.shutdown(cancel_futures=True)
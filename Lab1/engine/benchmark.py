@@ -0,0 +1,108 @@
+"""Общая часть набора замеров: прогон нагрузок, JSON и сравнение с базовой линией.
+
+Нагрузка - это функция factory(log_level), которая возвращает готовую к
+запуску машину, и лимит шагов. Машина должна иметь run(max_steps) и step_count.
+"""
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+
+
+def _timed_run(factory, log_level, max_steps):
+    machine = factory(log_level)
+    start = time.perf_counter()
+    machine.run(max_steps)
+    return time.perf_counter() - start, machine.step_count
+
+
+def measure(factory, max_steps, repeat=3):
+    """Замеряет одну нагрузку; время - лучшее из repeat прогонов"""
+    logged, steps = min(_timed_run(factory, 'full', max_steps) for _ in range(repeat))
+    execution = min(_timed_run(factory, 'off', max_steps)[0] for _ in range(repeat))
+
+    # Память меряем отдельным прогоном: tracemalloc сильно замедляет код
+    tracemalloc.start()
+    machine = factory('full')
+    machine.run(max_steps)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del machine
+
+    return {
+        'steps': steps,
+        'seconds': logged,
+        'steps_per_sec': steps / logged if logged else 0.0,
+        'execution_seconds': execution,
+        'logging_seconds': max(logged - execution, 0.0),
+        'peak_bytes': peak,
+    }
+
+
+def run_suite(workloads, names=None, repeat=3):
+    """Замеряет нагрузки workloads: имя -> (factory, max_steps)"""
+    results = {}
+    for name, (factory, max_steps) in workloads.items():
+        if names and name not in names:
+            continue
+        results[name] = measure(factory, max_steps, repeat)
+    return results
+
+
+def compare(results, baseline, tolerance=0.1):
+    """Список регрессий относительно базовой линии (словаря results из JSON)"""
+    regressions = []
+    for name, row in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if row['steps'] != base['steps']:
+            regressions.append(f"{name}: шагов {row['steps']}, было {base['steps']}")
+        if row['steps_per_sec'] < base['steps_per_sec'] * (1 - tolerance):
+            regressions.append(f"{name}: шагов/сек {row['steps_per_sec']:.0f}, "
+                               f"было {base['steps_per_sec']:.0f}")
+        if row['peak_bytes'] > base['peak_bytes'] * (1 + tolerance):
+            regressions.append(f"{name}: пик памяти {row['peak_bytes']}, "
+                               f"было {base['peak_bytes']}")
+    return regressions
+
+
+def print_results(results):
+    print(f"{'нагрузка':>14} {'шагов':>10} {'шагов/сек':>12} {'исполнение':>11} "
+          f"{'журнал':>9} {'пик байт':>12}")
+    for name, row in results.items():
+        print(f"{name:>14} {row['steps']:>10} {row['steps_per_sec']:>12.0f} "
+              f"{row['execution_seconds']:>11.4f} {row['logging_seconds']:>9.4f} "
+              f"{row['peak_bytes']:>12}")
+
+
+def main(machine, workloads, argv=None):
+    """Точка входа командной строки; возвращает код завершения"""
+    parser = argparse.ArgumentParser(description=f"Набор замеров: {machine}")
+    parser.add_argument('--output', help="куда записать результаты в JSON")
+    parser.add_argument('--baseline', help="JSON с прошлыми результатами для сравнения")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="допустимое ухудшение, доля (по умолчанию 0.1)")
+    parser.add_argument('--repeat', type=int, default=3, help="прогонов на замер")
+    parser.add_argument('--only', nargs='*', help="замерить только эти нагрузки")
+    args = parser.parse_args(argv)
+
+    results = run_suite(workloads, args.only, args.repeat)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'machine': machine, 'python': platform.python_version(),
+                       'results': results}, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('machine') != machine:
+            raise ValueError(f"Базовая линия снята для другой машины: {baseline.get('machine')}")
+        regressions = compare(results, baseline['results'], args.tolerance)
+        for line in regressions:
+            print("РЕГРЕССИЯ", line)
+        return 1 if regressions else 0
+    return 0
@@ -0,0 +1,129 @@
+"""Генерация специализированного кода на Python по таблице vm.Program.
+
+Вместо цикла интерпретатора с поиском в таблице каждая строка таблицы
+(состояние) становится своей функцией с проверками символов, записанными
+прямо в тексте; переход строки в саму себя крутится во внутреннем цикле
+функции, а переход в другую строку - выход в диспетчер, который берет
+следующую функцию из списка по номеру строки. Скомпилированный код
+кэшируется для каждой таблицы, а также по ее содержимому - чтобы та же
+программа в другой машине не компилировалась заново.
+"""
+import weakref
+
+from engine import vm
+
+# Сколько последних таблиц помнить по содержимому
+CACHE_SIZE = 32
+
+# Таблица -> скомпилированная функция run (запись исчезает вместе с таблицей)
+_cache = weakref.WeakKeyDictionary()
+# Содержимое таблицы -> функция run, в порядке добавления
+_by_content = {}
+
+# Диспетчер: функции строк возвращают (строка, позиция, шаги, рост слева, остановка)
+_DISPATCH = '''
+def run(cells, position, pc, limit):
+    steps = 0
+    shift = 0
+    status = None
+    while steps < limit and status is None:
+        pc, position, steps, grown, status = rows[pc](cells, position, steps, limit)
+        shift += grown
+    return steps, position, pc, status, shift
+'''
+
+
+def _transition(lines, pad, pc, write, symbol, move, target):
+    """Код одного перехода строки pc"""
+    if write != symbol:
+        lines.append(f"{pad}cells[position] = {write}")
+    if move:
+        lines.append(f"{pad}position += {move}")
+    lines.append(f"{pad}steps += 1")
+    if move > 0:
+        lines.append(f"{pad}if position >= size:")
+        lines.append(f"{pad}    cells.extend(bytes(size))")
+        lines.append(f"{pad}    size += size")
+    elif move < 0:
+        lines.append(f"{pad}if position < 0:")
+        lines.append(f"{pad}    cells[0:0] = bytes(size)")
+        lines.append(f"{pad}    position += size")
+        lines.append(f"{pad}    grown += size")
+        lines.append(f"{pad}    size += size")
+    if target != pc:
+        lines.append(f"{pad}return {target}, position, steps, grown, None")
+
+
+def _row(lines, program, pc):
+    """Функция строки pc: крутится, пока переходы ведут в саму строку"""
+    width = program.width
+    lines.append(f"def row_{pc}(cells, position, steps, limit):  # {program.labels[pc]!r}")
+    lines.append("    size = len(cells)")
+    lines.append("    grown = 0")
+    lines.append("    while steps < limit:")
+    lines.append("        symbol = cells[position]")
+    branch = 'if'
+    for symbol in range(width):
+        k = pc * width + symbol
+        target = program.next_pc[k]
+        if target == vm.MACRO:
+            target = program.macros[k][4]
+        if target == vm.HALT:
+            continue
+        lines.append(f"        {branch} symbol == {symbol}:")
+        branch = 'elif'
+        if target == vm.HALT_AFTER:
+            if program.write[k] != symbol:
+                lines.append(f"            cells[position] = {program.write[k]}")
+            lines.append(f"            return {pc}, position, steps + 1, grown, HALT_AFTER")
+        elif target == vm.STOP:
+            lines.append(f"            return {pc}, position, steps, grown, STOP")
+        else:
+            _transition(lines, ' ' * 12, pc, program.write[k], symbol, program.move[k], target)
+    if branch == 'if':
+        lines.append(f"        return {pc}, position, steps, grown, HALT")
+    else:
+        lines.append("        else:")
+        lines.append(f"            return {pc}, position, steps, grown, HALT")
+    lines.append(f"    return {pc}, position, steps, grown, None")
+
+
+def generate(program):
+    """Текст модуля с функцией run(cells, position, pc, limit) для таблицы program.
+
+    Функция работает как program.execute, но возвращает (шаги, позиция,
+    строка, остановка, сдвиг) - без крайних позиций головки. Макросы
+    (см. vm.Program.set_macro) выполняются обычными шагами.
+    """
+    lines = []
+    for pc in range(len(program.labels)):
+        _row(lines, program, pc)
+        lines.append("")
+    lines.append("rows = [" + ", ".join(f"row_{pc}" for pc in range(len(program.labels))) + "]")
+    return '\n'.join(lines) + '\n' + _DISPATCH
+
+
+def _content(program):
+    """Ключ содержимого таблицы: все, от чего зависит сгенерированный код, кроме меток"""
+    targets = program.next_pc
+    if program.macros:
+        targets = [program.macros[k][4] if target == vm.MACRO else target
+                   for k, target in enumerate(targets)]
+    return program.width, tuple(targets), tuple(program.write), tuple(program.move)
+
+
+def load(program):
+    """Скомпилированная функция run для program; для одной таблицы код строится один раз"""
+    function = _cache.get(program)
+    if function is None:
+        key = _content(program)
+        function = _by_content.get(key)
+        if function is None:
+            namespace = {'HALT': vm.HALT, 'HALT_AFTER': vm.HALT_AFTER, 'STOP': vm.STOP}
+            exec(compile(generate(program), f"<vm program {id(program):x}>", 'exec'), namespace)
+            function = namespace['run']
+            if len(_by_content) >= CACHE_SIZE:
+                del _by_content[next(iter(_by_content))]
+            _by_content[key] = function
+        _cache[program] = function
+    return function
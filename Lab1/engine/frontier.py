@@ -0,0 +1,76 @@
+import heapq
+import pickle
+import tempfile
+from itertools import count
+
+
+class Frontier:
+    """Очередь с приоритетом, которая при переполнении сбрасывает часть элементов на диск.
+
+    В памяти лежит куча не больше limit элементов. Когда она переполняется,
+    худшая половина сортируется и дописывается на диск отдельным отрезком
+    (временный файл в каталоге directory). pop() берет лучший элемент среди
+    кучи и голов отрезков, так что порядок выдачи тот же, что у обычной кучи.
+    При равных приоритетах элементы выдаются в порядке добавления, поэтому
+    с постоянным приоритетом очередь работает как FIFO (обход в ширину).
+    """
+
+    def __init__(self, limit=100000, directory=None):
+        if limit < 2:
+            raise ValueError("Лимит очереди должен быть не меньше 2")
+        self.limit = limit
+        self.directory = directory
+        self.heap = []
+        self.runs = []       # [файл, голова отрезка]
+        self.size = 0
+        self.spilled = 0     # сколько элементов было сброшено на диск
+        self._counter = count()
+
+    def push(self, priority, item):
+        heapq.heappush(self.heap, (priority, next(self._counter), item))
+        self.size += 1
+        if len(self.heap) > self.limit:
+            self._spill()
+
+    def _spill(self):
+        entries = sorted(self.heap)
+        keep = len(entries) // 2
+        run = tempfile.TemporaryFile(dir=self.directory)
+        for entry in entries[keep:]:
+            pickle.dump(entry, run, pickle.HIGHEST_PROTOCOL)
+        run.seek(0)
+        self.spilled += len(entries) - keep
+        self.heap = entries[:keep]  # отсортированный список - уже куча
+        self.runs.append([run, pickle.load(run)])
+
+    def pop(self):
+        """Возвращает (приоритет, элемент) с наименьшим приоритетом"""
+        if not self.size:
+            raise IndexError("Очередь пуста")
+        best = None
+        for run in self.runs:
+            if best is None or run[1] < best[1]:
+                best = run
+        self.size -= 1
+        if best is None or (self.heap and self.heap[0] < best[1]):
+            priority, _, item = heapq.heappop(self.heap)
+            return priority, item
+
+        priority, _, item = best[1]
+        try:
+            best[1] = pickle.load(best[0])
+        except EOFError:
+            best[0].close()
+            self.runs.remove(best)
+        return priority, item
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        """Удаляет файлы отрезков"""
+        for run, _ in self.runs:
+            run.close()
+        self.runs = []
+        self.heap = []
+        self.size = 0
@@ -0,0 +1,73 @@
+class LoopDetector:
+    """Обнаружение зацикливания по алгоритму Брента.
+
+    Конфигурация машины - это (состояние, позиция головки, лента). Раз в
+    2^k шагов запоминается "черепаха" - копия конфигурации; каждая следующая
+    конфигурация ("заяц") сравнивается с ней. Сравнивается не вся лента, а
+    только окно вокруг головки, которое машина посетила с момента снимка:
+
+    * если состояние совпало и окно (в координатах относительно головки)
+      совпало, машина повторит тот же отрезок работы;
+    * если головка при этом сместилась на shift != 0, цикл "сдвигающийся":
+      дополнительно требуется, чтобы в момент снимка лента в направлении
+      сдвига за пределами окна была пустой - тогда каждый следующий период
+      встречает такую же обстановку.
+
+    Оба условия достаточны, поэтому ложных срабатываний не бывает.
+    """
+
+    def __init__(self, blank):
+        self.blank = blank
+        self.power = 1
+        self.lam = 0
+        self.tortoise = None
+
+    def start(self, step, state, position, tape):
+        """Запоминает начальную конфигурацию"""
+        self._snapshot(step, state, position, tape)
+
+    def _snapshot(self, step, state, position, tape):
+        cells = tape.cells()
+        self.tortoise = (step, state, position, cells,
+                         min(cells, default=None), max(cells, default=None))
+        self.low = self.high = position
+
+    def check(self, step, state, position, tape):
+        """Проверяет очередную конфигурацию; возвращает описание цикла или None"""
+        if position < self.low:
+            self.low = position
+        elif position > self.high:
+            self.high = position
+
+        self.lam += 1
+        if state == self.tortoise[1]:
+            cycle = self._verify(step, position, tape)
+            if cycle is not None:
+                return cycle
+
+        if self.lam == self.power:
+            self._snapshot(step, state, position, tape)
+            self.power *= 2
+            self.lam = 0
+        return None
+
+    def _verify(self, step, position, tape):
+        start, _, origin, cells, cells_low, cells_high = self.tortoise
+        blank = self.blank
+        shift = position - origin
+        before, after = origin - self.low, self.high - origin
+
+        # За окном в направлении сдвига лента в момент снимка должна быть пустой
+        if shift > 0 and cells_high is not None and cells_high > origin + after:
+            return None
+        if shift < 0 and cells_low is not None and cells_low < origin - before:
+            return None
+
+        # Сначала дешевая проверка ячейки под головкой, затем всего окна
+        if cells.get(origin, blank) != tape.read_at(position):
+            return None
+        for offset in range(-before, after + 1):
+            if cells.get(origin + offset, blank) != tape.read_at(position + offset):
+                return None
+
+        return {'start': start, 'period': step - start, 'shift': shift}
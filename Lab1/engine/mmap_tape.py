@@ -0,0 +1,186 @@
+import mmap
+import re
+import tempfile
+
+# Размер куска при поиске непустых ячеек и выгрузке (чтобы не копировать весь файл)
+SCAN_CHUNK = 1 << 20
+
+_NONZERO = re.compile(rb'[^\x00]')
+
+
+class MappedCells:
+    """Ячейки ленты - байтовые коды в файле, отображенном в память.
+
+    Позиция p хранится в байте origin + p файла; файл растет кусками не
+    меньше chunk байт (и не меньше своего размера - амортизированно O(1) на
+    ячейку) в ту сторону, куда ушла запись, при росте влево содержимое
+    сдвигается. Чтение и запись рядом с головкой идут через окно window
+    байт в памяти процесса, которое сбрасывается в файл при переносе.
+    Если ленте понадобится больше max_cells ячеек, запись выбрасывает
+    MemoryError, не трогая ленту. Без path файл временный.
+    """
+
+    def __init__(self, path=None, chunk=1 << 16, window=4096, max_cells=None):
+        if max_cells is not None and max_cells < 1:
+            raise ValueError("Лимит ячеек должен быть положительным")
+        self.file = tempfile.TemporaryFile() if path is None else open(path, 'w+b')
+        self.chunk = chunk
+        self.max_cells = max_cells
+        self.size = chunk if max_cells is None else min(chunk, max_cells)
+        self.file.truncate(self.size)
+        self.map = mmap.mmap(self.file.fileno(), self.size)
+        self.origin = self.size // 2
+
+        self.window = bytearray(min(window, self.size))
+        self.window_start = 0
+        self.dirty = False
+        self._move_window(self.origin)
+
+        # Границы записанных ненулевых кодов; могут быть шире реальных
+        self.low = 0
+        self.high = -1
+
+    # --- окно ---
+
+    def _flush(self):
+        if self.dirty:
+            self.map[self.window_start:self.window_start + len(self.window)] = self.window
+            self.dirty = False
+
+    def _move_window(self, index):
+        """Переносит окно так, чтобы в нем был байт index файла"""
+        self._flush()
+        start = min(max(index - len(self.window) // 2, 0), self.size - len(self.window))
+        self.window[:] = self.map[start:start + len(self.window)]
+        self.window_start = start
+
+    def _grow(self, index):
+        """Расширяет файл так, чтобы в нем был байт index; возвращает его новый номер"""
+        while index < 0 or index >= self.size:
+            extra = max(self.chunk, self.size)
+            if self.max_cells is not None:
+                extra = min(extra, self.max_cells - self.size)
+                if extra <= 0:
+                    raise MemoryError(f"Лента не помещается в {self.max_cells} ячеек")
+            self._flush()
+            old = self.size
+            self.size += extra
+            self.map.resize(self.size)
+            if index < 0:
+                self.map.move(extra, 0, old)
+                self.map[0:extra] = bytes(extra)
+                self.origin += extra
+                self.window_start += extra
+                index += extra
+        return index
+
+    def reserve(self, start, stop):
+        """Расширяет файл под позиции [start, stop]; MemoryError, если они не помещаются.
+
+        Ячейки при этом не меняются, поэтому после ошибки лента цела.
+        """
+        self._grow(start + self.origin)
+        self._grow(stop + self.origin)
+
+    # --- ячейки ---
+
+    def get(self, position):
+        index = position + self.origin
+        offset = index - self.window_start
+        if 0 <= offset < len(self.window):
+            return self.window[offset]
+        if 0 <= index < self.size:
+            self._move_window(index)
+            return self.window[index - self.window_start]
+        return 0
+
+    def set(self, position, code):
+        index = position + self.origin
+        offset = index - self.window_start
+        if not 0 <= offset < len(self.window):
+            if not 0 <= index < self.size:
+                if not code:
+                    return
+                index = self._grow(index)
+            self._move_window(index)
+            offset = index - self.window_start
+        self.window[offset] = code
+        self.dirty = True
+        if code:
+            if self.low > self.high:
+                self.low = self.high = position
+            elif position < self.low:
+                self.low = position
+            elif position > self.high:
+                self.high = position
+
+    def load(self, position, data):
+        """Записывает коды data подряд начиная с position"""
+        if not data:
+            return
+        self._grow(position + len(data) - 1 + self.origin)
+        index = self._grow(position + self.origin)
+        self._flush()
+        self.map[index:index + len(data)] = data
+        self.window[:] = self.map[self.window_start:self.window_start + len(self.window)]
+        low, high = position, position + len(data) - 1
+        if self.low <= self.high:
+            low, high = min(low, self.low), max(high, self.high)
+        self.low, self.high = low, high
+
+    def export(self, start, stop):
+        """Коды позиций [start, stop) байтами; за пределами файла - нули"""
+        self._flush()
+        result = bytearray(max(stop - start, 0))
+        first = max(start + self.origin, 0)
+        last = min(stop + self.origin, self.size)
+        if first < last:
+            result[first - self.origin - start:last - self.origin - start] = self.map[first:last]
+        return bytes(result)
+
+    def nonzero(self, start, stop):
+        """Пары (позиция, код) ненулевых ячеек на [start, stop), по возрастанию позиций"""
+        for chunk_start in range(start, stop, SCAN_CHUNK):
+            data = self.export(chunk_start, min(chunk_start + SCAN_CHUNK, stop))
+            for match in _NONZERO.finditer(data):
+                yield chunk_start + match.start(), data[match.start()]
+
+    def bounds(self):
+        """Сужает границы до ненулевых кодов; None, если ненулевых нет"""
+        while self.low <= self.high:
+            data = self.export(self.low, min(self.low + SCAN_CHUNK, self.high + 1))
+            stripped = data.lstrip(b'\x00')
+            self.low += len(data) - len(stripped)
+            if stripped:
+                break
+        while self.low <= self.high:
+            data = self.export(max(self.high + 1 - SCAN_CHUNK, self.low), self.high + 1)
+            stripped = data.rstrip(b'\x00')
+            self.high -= len(data) - len(stripped)
+            if stripped:
+                break
+        if self.low > self.high:
+            return None
+        return self.low, self.high
+
+    def snapshot(self):
+        """Копия ненулевой части: (позиция первой ячейки, коды)"""
+        bounds = self.bounds()
+        if bounds is None:
+            return 0, b''
+        return bounds[0], self.export(bounds[0], bounds[1] + 1)
+
+    def restore(self, snapshot):
+        bounds = self.bounds()
+        if bounds is not None:
+            for start in range(bounds[0], bounds[1] + 1, SCAN_CHUNK):
+                stop = min(start + SCAN_CHUNK, bounds[1] + 1)
+                self.load(start, bytes(stop - start))
+        self.low, self.high = 0, -1
+        position, data = snapshot
+        self.load(position, data)
+
+    def close(self):
+        self._flush()
+        self.map.close()
+        self.file.close()
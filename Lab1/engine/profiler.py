@@ -0,0 +1,86 @@
+import json
+from time import perf_counter
+
+# Градации тепловой карты ленты: от не посещенных ячеек к самым частым
+SHADES = " .:-=+*#%@"
+
+
+class Profiler:
+    """Профиль выполнения: срабатывания переходов, время по состояниям, посещения ячеек.
+
+    Машина подключает профилировщик, подменяя свой step оберткой из wrap
+    (см. TuringMachine.enable_profiler, PostMachine.enable_profiler), поэтому
+    без профилировщика шаг не выполняет ни одной лишней проверки.
+    """
+
+    def __init__(self):
+        self.steps = 0
+        self.hits = {}      # переход -> число срабатываний
+        self.states = {}    # состояние -> [шагов, секунд]
+        self.cells = {}     # позиция головки -> число посещений
+
+    def record(self, transition, state, position, seconds):
+        self.steps += 1
+        self.hits[transition] = self.hits.get(transition, 0) + 1
+        entry = self.states.get(state)
+        if entry is None:
+            entry = self.states[state] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += seconds
+        self.cells[position] = self.cells.get(position, 0) + 1
+
+    def wrap(self, step, probe):
+        """Оборачивает метод шага: probe() до шага возвращает (переход, состояние, позицию)"""
+        record = self.record
+
+        def profiled_step():
+            transition, state, position = probe()
+            start = perf_counter()
+            stepped = step()
+            if stepped:
+                record(transition, state, position, perf_counter() - start)
+            return stepped
+        return profiled_step
+
+    def report(self):
+        """Профиль в виде словаря; переходы - по убыванию числа срабатываний"""
+        return {
+            'steps': self.steps,
+            'transitions': dict(sorted(self.hits.items(), key=lambda item: -item[1])),
+            'states': {state: {'steps': steps, 'seconds': seconds}
+                       for state, (steps, seconds) in self.states.items()},
+            'cells': dict(sorted(self.cells.items()))
+        }
+
+    def to_json(self, filename=None):
+        """Возвращает профиль в JSON; если задан filename - записывает его в файл"""
+        text = json.dumps(self.report(), ensure_ascii=False, indent=2)
+        if filename is not None:
+            with open(filename, 'w', encoding='utf-8') as f:
+                f.write(text)
+        return text
+
+    def heatmap(self, width=64):
+        """Текстовая тепловая карта посещений ленты: одна строка из width столбцов"""
+        if not self.cells:
+            return ""
+        low, high = min(self.cells), max(self.cells)
+        bucket = -(-(high - low + 1) // width)
+        columns = [0] * (-(-(high - low + 1) // bucket))
+        for position, visits in self.cells.items():
+            columns[(position - low) // bucket] += visits
+        top = max(columns)
+        row = ''.join(SHADES[-(-visits * (len(SHADES) - 1) // top)] for visits in columns)
+        return f"[{row}] ячейки {low}..{high}, {bucket} на столбец, максимум {top}"
+
+    def format(self, limit=10, width=64):
+        """Текстовый отчет: самые частые переходы, время по состояниям и карта ленты"""
+        lines = [f"Шагов: {self.steps}", "Переходы:"]
+        for transition, hits in list(self.report()['transitions'].items())[:limit]:
+            lines.append(f"{hits:>12} {hits / self.steps:>7.1%}  {transition}")
+        lines.append("Состояния:")
+        for state, (steps, seconds) in sorted(self.states.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{steps:>12} {seconds:>10.4f} с  {state}")
+        lines.append("Лента:")
+        lines.append(self.heatmap(width))
+        return '\n'.join(lines)
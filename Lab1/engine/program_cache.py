@@ -0,0 +1,126 @@
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+# Формат файла кэша (все числа little-endian):
+#   MAGIC, версия (uint8);
+#   число строк (uint32) и сами строки: длина (uint32) + UTF-8;
+#   ширина (uint8) и число (uint32) записей таблицы, затем таблица int64.
+# Первая строка - вид программы ('turing', 'post'), чтобы не перепутать кэши.
+MAGIC = b'L1PC'
+VERSION = 1
+
+# Кэш в памяти процесса: (вид, хэш) -> (строки, записи)
+_memory = {}
+
+
+def source_digest(data):
+    """Хэш содержимого исходного файла программы"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class StringTable:
+    """Интернирование строк: каждая строка хранится один раз и заменяется номером"""
+
+    def __init__(self):
+        self.strings = []
+        self.codes = {}
+
+    def intern(self, string):
+        code = self.codes.get(string)
+        if code is None:
+            code = self.codes[string] = len(self.strings)
+            self.strings.append(string)
+        return code
+
+
+def pack(kind, strings, rows, width):
+    """Сериализует программу: таблицу строк и записи из width целых чисел"""
+    table = array('q', [value for row in rows for value in row])
+    if sys.byteorder == 'big':
+        table.byteswap()
+    parts = [MAGIC, struct.pack('<BI', VERSION, len(strings) + 1)]
+    for string in [kind] + list(strings):
+        data = string.encode('utf-8')
+        parts.append(struct.pack('<I', len(data)))
+        parts.append(data)
+    parts.append(struct.pack('<BI', width, len(rows)))
+    parts.append(table.tobytes())
+    return b''.join(parts)
+
+
+def unpack(kind, data):
+    """Разбирает файл кэша; ValueError, если он поврежден или другого вида"""
+    try:
+        if data[:4] != MAGIC:
+            raise ValueError("Неизвестный формат кэша программы")
+        version, count = struct.unpack_from('<BI', data, 4)
+        if version != VERSION:
+            raise ValueError(f"Неподдерживаемая версия кэша программы: {version}")
+        offset = 9
+        strings = []
+        for _ in range(count):
+            length, = struct.unpack_from('<I', data, offset)
+            offset += 4
+            strings.append(data[offset:offset + length].decode('utf-8'))
+            offset += length
+        width, count = struct.unpack_from('<BI', data, offset)
+        offset += 5
+    except (struct.error, UnicodeDecodeError) as error:
+        raise ValueError("Поврежденный кэш программы") from error
+
+    if not strings or strings[0] != kind:
+        raise ValueError("Кэш относится к программе другого вида")
+    table = array('q')
+    if len(data) - offset != table.itemsize * width * count:
+        raise ValueError("Поврежденный кэш программы")
+    table.frombytes(data[offset:])
+    if sys.byteorder == 'big':
+        table.byteswap()
+    rows = [tuple(table[i:i + width]) for i in range(0, len(table), width)]
+    return strings[1:], rows
+
+
+def cache_file(cache_dir, kind, digest):
+    return os.path.join(cache_dir, f"{kind}-{digest}.bin")
+
+
+def load(kind, digest, cache_dir=None):
+    """Ищет разобранную программу в памяти, затем в cache_dir; None, если ее нет"""
+    cached = _memory.get((kind, digest))
+    if cached is None and cache_dir is not None:
+        try:
+            with open(cache_file(cache_dir, kind, digest), 'rb') as f:
+                cached = unpack(kind, f.read())
+        except (OSError, ValueError):
+            # Нет файла или он испорчен - программа будет разобрана заново
+            return None
+        _memory[(kind, digest)] = cached
+    return cached
+
+
+def store(kind, digest, strings, rows, width, cache_dir=None):
+    """Запоминает разобранную программу в памяти и, если задан cache_dir, на диске"""
+    rows = [tuple(row) for row in rows]
+    _memory[(kind, digest)] = (list(strings), rows)
+    if cache_dir is None:
+        return
+    try:
+        data = pack(kind, strings, rows, width)
+    except OverflowError:
+        # Число не помещается в int64 - такую программу держим только в памяти
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    # Пишем во временный файл и атомарно переименовываем: параллельные
+    # запуски не увидят наполовину записанный кэш
+    fd, temp_name = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_name, cache_file(cache_dir, kind, digest))
+    except BaseException:
+        os.remove(temp_name)
+        raise
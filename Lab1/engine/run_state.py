@@ -0,0 +1,94 @@
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+
+# Формат файла состояния прогона (все числа little-endian):
+#   MAGIC, версия (uint8);
+#   число строк (uint32) и сами строки: длина (uint32) + UTF-8 - вид машины,
+#   хэш программы, состояние (строка программы), затем таблица символов;
+#   позиция головки (int64), шаг (uint64), признак остановки (uint8),
+#   границы ленты (2 x int64), позиция первой ячейки (int64);
+#   ширина кода ячейки (uint8: 1 или 2), длина (uint32) и сжатые zlib коды ячеек.
+MAGIC = b'L1RS'
+VERSION = 1
+
+_NUMBERS = struct.Struct('<qQBqqqBI')
+
+
+def pack(kind, digest, state, position, steps, halted, bounds, symbols, low, codes):
+    """Сериализует состояние машины; codes - коды ячеек начиная с позиции low"""
+    width = 1 if max(codes, default=0) < 256 else 2
+    table = array('B' if width == 1 else 'H', codes)
+    if sys.byteorder == 'big':
+        table.byteswap()
+    data = zlib.compress(table.tobytes())
+
+    strings = [kind, digest, state] + list(symbols)
+    parts = [MAGIC, struct.pack('<BI', VERSION, len(strings))]
+    for string in strings:
+        encoded = string.encode('utf-8')
+        parts.append(struct.pack('<I', len(encoded)))
+        parts.append(encoded)
+    parts.append(_NUMBERS.pack(position, steps, halted, bounds[0], bounds[1], low, width, len(data)))
+    parts.append(data)
+    return b''.join(parts)
+
+
+def unpack(kind, data):
+    """Разбирает файл состояния; ValueError, если он поврежден или от другой машины"""
+    try:
+        if data[:4] != MAGIC:
+            raise ValueError("Неизвестный формат файла состояния")
+        version, count = struct.unpack_from('<BI', data, 4)
+        if version != VERSION:
+            raise ValueError(f"Неподдерживаемая версия файла состояния: {version}")
+        offset = 9
+        strings = []
+        for _ in range(count):
+            (length,) = struct.unpack_from('<I', data, offset)
+            offset += 4
+            strings.append(data[offset:offset + length].decode('utf-8'))
+            offset += length
+        position, steps, halted, bound_low, bound_high, low, width, length = \
+            _NUMBERS.unpack_from(data, offset)
+        offset += _NUMBERS.size
+        table = array('B' if width == 1 else 'H',
+                      zlib.decompress(data[offset:offset + length]))
+    except (struct.error, UnicodeDecodeError, zlib.error) as error:
+        raise ValueError(f"Поврежденный файл состояния: {error}") from None
+    if sys.byteorder == 'big':
+        table.byteswap()
+    if strings[0] != kind:
+        raise ValueError(f"Файл состояния другой машины: {strings[0]}")
+    return {
+        'digest': strings[1],
+        'state': strings[2],
+        'symbols': strings[3:],
+        'position': position,
+        'steps': steps,
+        'halted': bool(halted),
+        'bounds': (bound_low, bound_high),
+        'low': low,
+        'codes': table,
+    }
+
+
+def save(filename, data):
+    """Записывает файл атомарно: прерванная запись не портит предыдущее сохранение"""
+    directory = os.path.dirname(os.path.abspath(filename))
+    handle, temp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            f.write(data)
+        os.replace(temp, filename)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
+def load(filename):
+    with open(filename, 'rb') as f:
+        return f.read()
@@ -0,0 +1,225 @@
+import struct
+import tempfile
+import zlib
+
+# Цвета палитры: 0 - пустая ячейка, 1 - головка, дальше - символы ленты
+# в порядке появления (после конца списка - оттенки серого)
+PALETTE = [
+    (255, 255, 255), (220, 40, 40),
+    (0, 0, 0), (40, 90, 200), (40, 160, 70), (230, 140, 20),
+    (130, 60, 170), (120, 80, 40), (20, 150, 160), (200, 60, 140),
+]
+HEAD = 1
+
+# Запись шага: позиция записи, код нового символа, сдвиг головки
+_DELTA = struct.Struct('<qBb')
+# Сколько записей читать и писать за раз
+_CHUNK = 4096
+
+
+def color(index):
+    if index < len(PALETTE):
+        return PALETTE[index]
+    shade = 40 + (index * 37) % 176
+    return shade, shade, shade
+
+
+class SpaceTimeDiagram:
+    """Пространственно-временная диаграмма прогона: строка - шаг, столбец - ячейка.
+
+    record прогоняет машину через iter_steps и сохраняет во временный файл
+    только изменения: для каждого шага позицию записи, код символа и сдвиг
+    головки. Размер картинки известен после прогона: если шагов больше
+    max_rows, в картинку попадает каждый stride-й шаг, если ячеек больше
+    max_columns - в пиксель сводится bucket соседних ячеек (виден самый
+    "старший" символ). Строки картинки восстанавливаются повторным проходом
+    по файлу изменений, поэтому память не зависит от числа шагов - только
+    от ширины ленты. Работает с машиной Тьюринга и машиной Поста.
+    """
+
+    def __init__(self, max_rows=1024, max_columns=1024, directory=None):
+        if max_rows < 1 or max_columns < 1:
+            raise ValueError("Размер картинки должен быть положительным")
+        self.max_rows = max_rows
+        self.max_columns = max_columns
+        self.directory = directory
+        self.deltas = None
+        self.codes = {}
+        self.initial = {}
+        self.head = 0
+        self.steps = 0
+        self.low = self.high = 0
+
+    def record(self, machine, max_steps=None, batch=1000):
+        """Прогоняет machine не больше max_steps шагов (None - до остановки), как run.
+
+        Возвращает число записанных шагов; предыдущая запись стирается. На
+        время прогона журнал машины выключен (иначе он рос бы с каждым
+        шагом), прежние записи журнала сохраняются.
+        """
+        self.close()
+        self.deltas = tempfile.TemporaryFile(dir=self.directory)
+        tape = machine.tape
+        cells = tape.cells()
+        # Пустой символ - то, что лежит левее всех непустых ячеек
+        blank = tape.read_at(min(cells, default=tape.position) - 1)
+        self.codes = {blank: 0}
+        for symbol in sorted(set(cells.values()), key=str):
+            self._code(symbol)
+        self.initial = {position: self.codes[symbol] for position, symbol in cells.items()}
+        self.head = tape.position
+        self.low = min(min(cells, default=self.head), self.head)
+        self.high = max(max(cells, default=self.head), self.head)
+        self.steps = 0
+
+        log = machine.log
+        log.freeze()
+        machine.log = type(log)('off')
+        try:
+            buffer = bytearray()
+            for events in machine.iter_steps(batch, max_steps):
+                for event in events:
+                    position = event.position
+                    buffer += _DELTA.pack(position, self._code(event.new_symbol),
+                                          event.new_position - position)
+                    if event.new_position < self.low:
+                        self.low = event.new_position
+                    elif event.new_position > self.high:
+                        self.high = event.new_position
+                self.steps += len(events)
+                if len(buffer) >= _CHUNK * _DELTA.size:
+                    self.deltas.write(buffer)
+                    buffer.clear()
+            self.deltas.write(buffer)
+        finally:
+            machine.log = log
+        return self.steps
+
+    def _code(self, symbol):
+        code = self.codes.get(symbol)
+        if code is None:
+            code = len(self.codes) + 1      # код 1 занят головкой
+            if code > 255:
+                raise ValueError("Слишком много разных символов для картинки")
+            self.codes[symbol] = code
+        return code
+
+    @property
+    def stride(self):
+        """Через сколько шагов берется строка картинки"""
+        if self.max_rows == 1:
+            return self.steps + 1
+        return max(-(-self.steps // (self.max_rows - 1)), 1)
+
+    @property
+    def bucket(self):
+        """Сколько ячеек ленты сводится в один столбец картинки"""
+        return -(-(self.high - self.low + 1) // self.max_columns)
+
+    @property
+    def shape(self):
+        """Размер картинки: (строки, столбцы)"""
+        return self.steps // self.stride + 1, -(-(self.high - self.low + 1) // self.bucket)
+
+    def rows(self):
+        """Строки картинки - bytes с номерами цветов палитры"""
+        if self.deltas is None:
+            raise RuntimeError("Сначала нужно записать прогон (record)")
+        low, stride, bucket = self.low, self.stride, self.bucket
+        cells = bytearray(self.high - low + 1)
+        for position, code in self.initial.items():
+            cells[position - low] = code
+        head = self.head - low
+
+        def row():
+            if bucket == 1:
+                pixels = bytearray(cells)
+            else:
+                pixels = bytearray(max(cells[i:i + bucket]) for i in range(0, len(cells), bucket))
+            pixels[head // bucket] = HEAD
+            return bytes(pixels)
+
+        yield row()
+        step = 0
+        self.deltas.seek(0)
+        while True:
+            data = self.deltas.read(_CHUNK * _DELTA.size)
+            if not data:
+                break
+            for position, code, move in _DELTA.iter_unpack(data):
+                cells[position - low] = code
+                head = position - low + move
+                step += 1
+                if step % stride == 0:
+                    yield row()
+
+    def image(self):
+        """Картинка целиком - массив numpy uint8 размера shape с номерами цветов"""
+        import numpy
+
+        image = numpy.empty(self.shape, dtype=numpy.uint8)
+        for i, row in enumerate(self.rows()):
+            image[i] = numpy.frombuffer(row, dtype=numpy.uint8)
+        return image
+
+    def palette(self):
+        """Цвета (r, g, b) всех используемых номеров палитры"""
+        return [color(index) for index in range(max(max(self.codes.values()), HEAD) + 1)]
+
+    def write_ppm(self, filename):
+        """Записывает картинку в формате PPM (P6), по строке за раз"""
+        colors = self.palette()
+        channels = [bytes(c[i] for c in colors).ljust(256, b'\0') for i in range(3)]
+        rows, columns = self.shape
+        with open(filename, 'wb') as f:
+            f.write(b'P6\n%d %d\n255\n' % (columns, rows))
+            pixels = bytearray(3 * columns)
+            for row in self.rows():
+                for i in range(3):
+                    pixels[i::3] = row.translate(channels[i])
+                f.write(pixels)
+
+    def write_png(self, filename):
+        """Записывает картинку в формате PNG с палитрой, сжимая по строке за раз"""
+        colors = self.palette()
+        rows, columns = self.shape
+        compressor = zlib.compressobj(9)
+        with open(filename, 'wb') as f:
+            f.write(b'\x89PNG\r\n\x1a\n')
+            _chunk(f, b'IHDR', struct.pack('>IIBBBBB', columns, rows, 8, 3, 0, 0, 0))
+            _chunk(f, b'PLTE', b''.join(bytes(c) for c in colors))
+            data = bytearray()
+            for row in self.rows():
+                data += compressor.compress(b'\0' + row)     # фильтр строки: без фильтра
+                if len(data) >= 1 << 16:
+                    _chunk(f, b'IDAT', data)
+                    data.clear()
+            data += compressor.flush()
+            _chunk(f, b'IDAT', data)
+            _chunk(f, b'IEND', b'')
+
+    def close(self):
+        if self.deltas is not None:
+            self.deltas.close()
+            self.deltas = None
+
+
+def _chunk(f, kind, data):
+    f.write(struct.pack('>I', len(data)))
+    f.write(kind)
+    f.write(data)
+    f.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind))))
+
+
+def render(machine, filename, max_steps=None, max_rows=1024, max_columns=1024):
+    """Прогоняет machine и записывает диаграмму в filename (.png или .ppm)"""
+    diagram = SpaceTimeDiagram(max_rows, max_columns)
+    try:
+        diagram.record(machine, max_steps)
+        if str(filename).lower().endswith('.ppm'):
+            diagram.write_ppm(filename)
+        else:
+            diagram.write_png(filename)
+        return diagram.shape
+    finally:
+        diagram.close()
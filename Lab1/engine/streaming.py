@@ -0,0 +1,28 @@
+import asyncio
+
+
+def batched(events, batch):
+    """Группирует события шагов в списки по batch штук (последний может быть короче)"""
+    if batch < 1:
+        raise ValueError("Размер пачки должен быть положительным")
+    chunk = []
+    for event in events:
+        chunk.append(event)
+        if len(chunk) == batch:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def stream_steps(machine, batch=100, max_steps=None):
+    """Асинхронный генератор пачек событий шагов machine.iter_steps.
+
+    После каждой пачки управление отдается циклу событий, так что прогон
+    длинной программы не блокирует остальные задачи (например, сервер,
+    который пересылает пачки клиентам), а весь след выполнения нигде не
+    накапливается.
+    """
+    for chunk in machine.iter_steps(batch, max_steps):
+        yield chunk
+        await asyncio.sleep(0)
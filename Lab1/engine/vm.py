@@ -0,0 +1,159 @@
+"""Общая табличная виртуальная машина для машины Тьюринга и машины Поста.
+
+Программа - это таблица строк (pc) по width символов. Для строки pc и кода
+символа c в ячейке pc * width + c таблиц next_pc, write и move записано
+действие: записать write, сдвинуть головку на move и перейти в строку next_pc.
+Отрицательный next_pc - одна из остановок ниже. Лента - список кодов
+символов; при необходимости список растет в обе стороны.
+
+Машина Тьюринга компилируется в строки-состояния (см. CompiledProgram),
+машина Поста - в строки-номера строк программы (см. PostMachine.compile).
+"""
+
+HALT = -1        # действия нет: машина останавливается, шаг не выполняется
+HALT_AFTER = -2  # шаг выполняется (без движения головки), затем машина останавливается
+STOP = -3        # выполнение прекращается без шага и без остановки машины
+MACRO = -4       # для ячейки задан макрос (см. Program.set_macro)
+
+# Начальный размер окна поиска конца серии в макросе (окно растет вдвое)
+SCAN_WINDOW = 64
+
+
+def run_length(cells, position, direction, stops, count):
+    """Длина серии ячеек от position в направлении direction без кодов из stops.
+
+    Серия ограничена count ячейками и краем cells (bytearray). Поиск идет
+    окнами растущего размера, поэтому стоит O(длины серии), а не O(len(cells)).
+    """
+    window = SCAN_WINDOW
+    if direction > 0:
+        end = min(len(cells), position + count)
+        start = position
+        while start < end:
+            stop = min(start + window, end)
+            hits = [i for i in (cells.find(code, start, stop) for code in stops) if i >= 0]
+            if hits:
+                return min(hits) - position
+            start = stop
+            window += window
+        return end - position
+
+    end = max(0, position - count + 1)
+    stop = position + 1
+    while stop > end:
+        start = max(stop - window, end)
+        hits = [i for i in (cells.rfind(code, start, stop) for code in stops) if i >= 0]
+        if hits:
+            return position - max(hits)
+        stop = start
+        window += window
+    return position - end + 1
+
+
+class Program:
+    """Таблица переходов: строки с метками (состояниями, номерами строк)"""
+
+    def __init__(self, width):
+        self.width = width
+        self.labels = []
+        self.label_codes = {}
+        self.next_pc = []
+        self.write = []
+        self.move = []
+        # Макросы: номер ячейки таблицы -> (стоимость, запись, сдвиг, стоп-коды, следующая строка)
+        self.macros = {}
+
+    def add_row(self, label, target=HALT):
+        """Добавляет строку, в которой все символы ведут к остановке target"""
+        code = self.label_codes.get(label)
+        if code is None:
+            code = self.label_codes[label] = len(self.labels)
+            self.labels.append(label)
+            self.next_pc.extend([target] * self.width)
+            self.write.extend(range(self.width))
+            self.move.extend([0] * self.width)
+        return code
+
+    def set(self, pc, symbol, write, move, next_pc):
+        k = pc * self.width + symbol
+        self.next_pc[k] = next_pc
+        self.write[k] = write
+        self.move[k] = move
+
+    def set_macro(self, pc, symbol, cost, fill, move, stops):
+        """Заменяет цикл, начинающийся в строке pc на символе symbol, одним действием.
+
+        Одна итерация цикла стоит cost шагов, записывает в ячейку fill (None -
+        ячейка не меняется), сдвигает головку на move и возвращается в pc.
+        Цикл продолжается, пока под головкой нет кода из stops. Макрос
+        выполняется только на ленте-bytearray; обычное действие ячейки
+        (см. set) должно быть первым шагом итерации.
+        """
+        k = pc * self.width + symbol
+        self.macros[k] = (cost, fill, move, stops, self.next_pc[k])
+        self.next_pc[k] = MACRO
+
+    def execute(self, cells, position, pc, limit):
+        """Выполняет не более limit шагов на списке кодов cells.
+
+        position - индекс головки в cells, pc - начальная строка. Возвращает
+        кортеж (шаги, позиция, строка, остановка, сдвиг, low, high): остановка -
+        HALT, HALT_AFTER, STOP или None, если исчерпан limit; сдвиг - на
+        сколько элементов список вырос слева; low и high - крайние позиции
+        головки за прогон (в координатах итогового списка).
+        """
+        width = self.width
+        next_pc, write, move = self.next_pc, self.write, self.move
+        size = len(cells)
+        low = high = position
+        shift = 0
+        steps = 0
+        status = None
+        macros = self.macros
+        while steps < limit:
+            k = pc * width + cells[position]
+            target = next_pc[k]
+            if target < 0:
+                if target == MACRO:
+                    cost, fill, direction, stops, target = macros[k]
+                    count = (limit - steps) // cost
+                else:
+                    if target == HALT_AFTER:
+                        cells[position] = write[k]
+                        steps += 1
+                    status = target
+                    break
+                if count:
+                    # Целые итерации цикла: проходим серию за одну операцию
+                    count = run_length(cells, position, direction, stops, count)
+                    end = position + direction * (count - 1)
+                    if fill is not None:
+                        first = min(position, end)
+                        cells[first:first + count] = bytes((fill,)) * count
+                    position = end + direction
+                    steps += count * cost
+                else:
+                    # Бюджета на целую итерацию нет - выполняем ее по шагам
+                    cells[position] = write[k]
+                    position += move[k]
+                    pc = target
+                    steps += 1
+            else:
+                cells[position] = write[k]
+                position += move[k]
+                pc = target
+                steps += 1
+            if position < low:
+                if position < 0:
+                    cells[0:0] = bytes(size)
+                    position += size
+                    high += size
+                    shift += size
+                    size += size
+                low = position
+            elif position > high:
+                if position >= size:
+                    cells.extend(bytes(size))
+                    size += size
+                high = position
+        return steps, position, pc, status, shift, low, high
@@ -0,0 +1,52 @@
+"""Пакетный прогон одной программы машины Поста на множестве лент в нескольких процессах.
+
+Пример:
+    for result in run_batch(program_lines, ["101", "0110"], max_steps=10000):
+        print(result['index'], result['tape'], result['steps'], result['halted'])
+"""
+import os
+import sys
+import time
+
+from post_machine import PostMachine
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from engine import batch
+
+# Сколько шагов выполняется между проверками таймаута
+SLICE_STEPS = 10000
+
+
+def run_tape(program, index, tape_string, max_steps, timeout):
+    # Выполняет программу на одной ленте: не больше max_steps шагов и timeout секунд
+    machine = PostMachine(log_level='off')
+    machine.program, machine.code, machine.lines = program
+    machine.load_tape(tape_string)
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    timed_out = False
+    while not machine.halted and machine.step_count < max_steps:
+        if deadline is not None and time.monotonic() >= deadline:
+            timed_out = True
+            break
+        portion = min(SLICE_STEPS, max_steps - machine.step_count)
+        executed = machine.run(portion, engine='vm')
+        if executed < portion:
+            break
+
+    return {
+        'index': index,
+        'tape': machine.tape.get_full_tape(),
+        'steps': machine.step_count,
+        'halted': machine.halted,
+        'timeout': timed_out
+    }
+
+
+def run_batch(program_lines, tapes, max_steps=1000, timeout=None, chunksize=16, workers=None):
+    # Программа разбирается один раз; результаты (index, tape, steps, halted,
+    # timeout) выдаются по мере готовности, не по порядку
+    machine = PostMachine()
+    machine.load_program(program_lines)
+    program = (machine.program, machine.code, machine.lines)
+    return batch.run_batch(run_tape, program, tapes, max_steps, timeout, chunksize, workers)
@@ -0,0 +1,86 @@
+"""Замеры производительности машины Поста.
+
+Запуск: python benchmark.py [--output results.json] [--baseline old.json]
+"""
+import os
+import sys
+
+from post_machine import PostMachine
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from engine import benchmark
+
+# Сложение унарных чисел: "111011" -> "11111"
+UNARY_ADDITION = [
+    "1. ? 3 2",     # идем вправо до промежутка
+    "2. → 1",
+    "3. 1 4",       # заполняем промежуток
+    "4. → 5",
+    "5. ? 6 4",     # идем до конца второго слагаемого
+    "6. ← 7",
+    "7. 0 8",       # стираем лишнюю единицу
+    "8. !",
+]
+
+# Удвоение: "111" -> "1111110" правее исходного блока, исходный блок стирается
+UNARY_DOUBLING = [
+    "1. 0 2",       # стираем левую единицу исходного блока
+    "2. → 3",
+    "3. ? 4 2",     # идем до промежутка
+    "4. → 5",
+    "5. ? 6 4",     # идем до конца результата
+    "6. 1 7",
+    "7. → 8",
+    "8. 1 9",       # дописываем две единицы
+    "9. ← 10",
+    "10. ? 11 9",   # возвращаемся к промежутку
+    "11. ← 12",
+    "12. ? 14 13",  # исходный блок пуст - останов
+    "13. ← 15",
+    "14. !",
+    "15. ? 16 13",  # идем к началу исходного блока
+    "16. → 1",
+]
+
+# Стирание блока единиц
+ERASE = [
+    "1. ? 4 2",
+    "2. 0 3",
+    "3. → 1",
+    "4. !",
+]
+
+# Бесконечно растущий "челнок": дописывает единицу и возвращается к началу блока
+SHUTTLE = [
+    "1. → 2",
+    "2. ? 3 4",
+    "3. 1 5",
+    "4. → 2",
+    "5. ← 6",
+    "6. ? 7 5",
+    "7. → 2",
+]
+
+
+def workload(tape_string, program, max_steps, tape_mode='dict'):
+    def factory(log_level):
+        machine = PostMachine(log_level=log_level, tape_mode=tape_mode)
+        machine.load_tape(tape_string)
+        machine.load_program(program)
+        return machine
+    return factory, max_steps
+
+
+WORKLOADS = {
+    'unary_add': workload("1" * 25000 + "0" + "1" * 25000, UNARY_ADDITION, 10 ** 6),
+    'unary_double': workload("1" * 40, UNARY_DOUBLING, 10 ** 6),
+    'erase': workload("1" * 50000, ERASE, 10 ** 6),
+    'shuttle': workload("0111", SHUTTLE, 20000),
+    # Те же нагрузки на упакованной ленте
+    'unary_add_bits': workload("1" * 25000 + "0" + "1" * 25000, UNARY_ADDITION, 10 ** 6, 'bits'),
+    'erase_bits': workload("1" * 50000, ERASE, 10 ** 6, 'bits'),
+}
+
+
+if __name__ == "__main__":
+    sys.exit(benchmark.main('post', WORKLOADS))
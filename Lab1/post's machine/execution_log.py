@@ -0,0 +1,154 @@
+from collections import deque
+
+# Уровни журнала: 'off' - шаги не записываются, 'full' - записывается каждый шаг
+LOG_LEVELS = ('off', 'full')
+
+
+class ExecutionLog:
+    """Журнал выполнения машины Поста.
+
+    Шаг хранится кортежем: номер шага, строка и текст команды, символ до и
+    после шага, позиция до и после, следующая строка и признак пустой ленты.
+    Содержимое ленты не хранится: при чтении оно восстанавливается откатом
+    шагов от текущей ленты, а границы ленты
+    складываются из границ на момент первой записи и позиций головки.
+    Для чтения журнал ведет себя как список словарей прежнего формата.
+
+    limit ограничивает число хранимых шагов: самые старые вытесняются.
+    """
+
+    def __init__(self, level='full', limit=None):
+        if level not in LOG_LEVELS:
+            raise ValueError(f"Неизвестный уровень журнала: {level}")
+        if limit is not None and limit <= 0:
+            raise ValueError("Размер журнала должен быть положительным")
+        self.level = level
+        self.limit = limit
+        self.clear()
+
+    def clear(self):
+        self.tape = None     # лента, на которой записаны шаги
+        self.frozen = []     # записи, уже развернутые в словари (см. _rebase)
+        self.entries = deque()
+        self.base_min = self.base_max = 0
+
+    # --- запись ---
+
+    def _rebase(self, tape):
+        """Машине подменили ленту: старые шаги разворачиваем, пока лента доступна"""
+        if self.tape is not None:
+            self.frozen.extend(self.get_log()[len(self.frozen):])
+            self.entries.clear()
+        self.tape = tape
+
+    def freeze(self):
+        """Разворачивает хранимые шаги: ленту сейчас изменят без записи в журнал"""
+        if self.tape is not None:
+            self._rebase(None)
+
+    def record(self, step, line, command, old_symbol, new_symbol, old_position,
+               new_position, next_line, tape):
+        if self.level == 'off':
+            return
+        if tape is not self.tape:
+            self._rebase(tape)
+        if not self.entries:
+            # Границы ленты монотонно растут, поэтому границ после первого
+            # хранимого шага достаточно, чтобы восстановить их для любого шага
+            self.base_min, self.base_max = tape.min_position, tape.max_position
+        self.entries.append((step, line, command, old_symbol, new_symbol, old_position,
+                             new_position, next_line, tape.is_empty()))
+        if self.limit is not None and len(self) > self.limit:
+            if self.frozen:
+                del self.frozen[0]
+            else:
+                # Позиции вытесненного шага остаются в границах следующих
+                evicted = self.entries.popleft()
+                self.base_min = min(self.base_min, evicted[5], evicted[6])
+                self.base_max = max(self.base_max, evicted[5], evicted[6])
+
+    def truncate(self, step):
+        """Удаляет записи о шагах с номером step и дальше (для перемотки назад)"""
+        self.frozen = [entry for entry in self.frozen if entry['step'] < step]
+        while self.entries and self.entries[-1][0] >= step:
+            self.entries.pop()
+
+    # --- чтение ---
+
+    def _expand(self, start, stop):
+        """Разворачивает хранимые шаги [start, stop) в словари с содержимым ленты"""
+        if start >= stop:
+            return []
+
+        # Границы ленты после каждого шага - накопленные от base_min/base_max
+        low, high = self.base_min, self.base_max
+        bounds = []
+        for entry in self.entries:
+            if len(bounds) == stop:
+                break
+            low = min(low, entry[5], entry[6])
+            high = max(high, entry[5], entry[6])
+            bounds.append((low, high))
+
+        # Единицы на ленте после каждого шага - откатом от текущей ленты
+        ones = set(self.tape.cells())
+        result = []
+        for index in range(len(self.entries) - 1, start - 1, -1):
+            (step, line, command, old_symbol, new_symbol, old_position,
+             new_position, next_line, empty) = self.entries[index]
+            if index < stop:
+                low, high = bounds[index]
+                if empty:
+                    tape_content = '0'
+                else:
+                    tape_content = ''.join('1' if cell in ones else '0'
+                                           for cell in range(low, high + 1))
+                result.append({
+                    'step': step,
+                    'line': line,
+                    'command': command,
+                    'old_symbol': old_symbol,
+                    'new_symbol': new_symbol,
+                    'old_position': old_position,
+                    'new_position': new_position,
+                    'next_line': next_line,
+                    'tape_content': tape_content
+                })
+            if old_symbol == 1:
+                ones.add(old_position)
+            else:
+                ones.discard(old_position)
+        result.reverse()
+        return result
+
+    def get_log(self):
+        """Возвращает журнал в виде списка словарей"""
+        return self.frozen + self._expand(0, len(self.entries))
+
+    def __len__(self):
+        return len(self.frozen) + len(self.entries)
+
+    def __iter__(self):
+        return iter(self.get_log())
+
+    def __eq__(self, other):
+        if isinstance(other, ExecutionLog):
+            other = other.get_log()
+        return self.get_log() == other
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, stride = item.indices(len(self))
+            if stride != 1 or start < len(self.frozen):
+                return self.get_log()[item]
+            offset = len(self.frozen)
+            return self._expand(start - offset, max(stop, start) - offset)
+        length = len(self)
+        if item < 0:
+            item += length
+        if not 0 <= item < length:
+            raise IndexError("Индекс записи журнала вне диапазона")
+        if item < len(self.frozen):
+            return self.frozen[item]
+        item -= len(self.frozen)
+        return self._expand(item, item + 1)[0]
@@ -0,0 +1,70 @@
+from enum import IntEnum
+
+
+class Opcode(IntEnum):
+    HALT = 0    # '!', комментарий, пустая или непонятная команда
+    RIGHT = 1   # → a
+    LEFT = 2    # ← a
+    ZERO = 3    # 0 a
+    ONE = 4     # 1 a
+    TEST = 5    # ? a b
+    ERROR = 6   # номер строки не число: ошибка возникает при выполнении
+
+
+OPERATIONS = {
+    '→': Opcode.RIGHT, '->': Opcode.RIGHT,
+    '←': Opcode.LEFT, '<-': Opcode.LEFT,
+    '0': Opcode.ZERO,
+    '1': Opcode.ONE,
+    '?': Opcode.TEST,
+}
+
+# Число номеров строк у каждой операции
+ARGUMENTS = {Opcode.HALT: 0, Opcode.RIGHT: 1, Opcode.LEFT: 1,
+             Opcode.ZERO: 1, Opcode.ONE: 1, Opcode.TEST: 2}
+
+
+def parse(command):
+    """Строгий разбор команды программы в кортеж (код операции, a, b).
+
+    Комментарий ('#...') разбирается как остановка - так он и выполнялся.
+    Неизвестная операция, не то число аргументов или нечисловой номер
+    строки дают ValueError с описанием ошибки.
+    """
+    cmd_parts = command.split()
+    if not cmd_parts:
+        raise ValueError("пустая команда")
+    if cmd_parts[0].startswith('#'):
+        return Opcode.HALT, 0, 0
+
+    opcode = Opcode.HALT if cmd_parts[0] == '!' else OPERATIONS.get(cmd_parts[0])
+    if opcode is None:
+        raise ValueError(f"неизвестная операция '{cmd_parts[0]}'")
+    arguments = ARGUMENTS[opcode]
+    if len(cmd_parts) != arguments + 1:
+        raise ValueError(f"операции '{cmd_parts[0]}' нужно аргументов: {arguments}")
+    try:
+        targets = [int(part) for part in cmd_parts[1:]]
+    except ValueError:
+        raise ValueError("номер строки должен быть целым числом") from None
+    targets.extend([0] * (2 - arguments))
+    return opcode, targets[0], targets[1]
+
+
+def decode(command):
+    """Нестрогий разбор отдельной команды (см. PostMachine.execute_command).
+
+    Команда без нужного числа аргументов останавливает машину, лишние
+    аргументы игнорируются, а нечисловой номер строки дает ERROR, у которого
+    в a лежит текст ошибки - она будет выброшена при выполнении.
+    """
+    cmd_parts = command.strip().split()
+    opcode = OPERATIONS.get(cmd_parts[0]) if cmd_parts else None
+    if opcode is None or len(cmd_parts) < ARGUMENTS[opcode] + 1:
+        return Opcode.HALT, 0, 0
+    try:
+        targets = [int(part) for part in cmd_parts[1:ARGUMENTS[opcode] + 1]]
+    except ValueError as error:
+        return Opcode.ERROR, str(error), 0
+    targets.extend([0] * (2 - ARGUMENTS[opcode]))
+    return opcode, targets[0], targets[1]
@@ -1,21 +1,72 @@
+import io
+import os
+import sys
+from bisect import bisect_right, insort
+from collections import namedtuple
+from functools import partial
+
+from execution_log import ExecutionLog
+from instructions import Opcode, decode, parse
+from tape import TAPE_MODES, MappedTape
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from engine import program_cache, run_state, streaming, vm
+from engine.loop_detector import LoopDetector
+from engine.profiler import Profiler
+
+# Наибольшая длина цепочки записей в цикле, который заменяется макросом (см. compile)
+MAX_LOOP_CHAIN = 8
+
+# Событие шага (см. PostMachine.iter_steps): номер шага, строка, символ до и
+# после шага, позиция до и после шага, следующая строка
+StepEvent = namedtuple('StepEvent', 'step line symbol new_symbol position new_position next_line')
+
+# Исполнители run: 'step' - пошагово через step, 'vm' - по скомпилированной таблице
+ENGINES = ('step', 'vm')
 
-from tape import Tape
 
 class PostMachine:
-    def __init__(self):
-        self.tape = Tape()
+    def __init__(self, checkpoint_interval=None, log_level='full', tape_mode='dict',
+                 log_limit=None, tape_options=None):
+        if tape_mode not in TAPE_MODES:
+            raise ValueError(f"Неизвестный режим ленты: {tape_mode}")
+        # tape_options - параметры конструктора ленты, например max_cells для 'mmap'
+        self.tape_class = partial(TAPE_MODES[tape_mode], **(tape_options or {}))
+        self.tape = self.tape_class()
         self.program = []
+        # Разобранная программа: команда и ее текст по номеру строки (None - строки нет)
+        self.code = [None]
+        self.lines = [None]
+        self.compiled = None  # таблица для общей виртуальной машины (см. compile)
         self.current_line = 1
         self.halted = False
         self.step_count = 0
-        self.log = []
+        self.log = ExecutionLog(log_level, log_limit)  # журнал (см. execution_log.py)
+        self.cycle = None  # найденный цикл (см. run с detect_loops=True)
+        self.profiler = None  # профилировщик шагов (см. enable_profiler)
 
+        # Контрольные точки для перемотки (см. seek): шаг -> (лента, позиция, строка)
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoints = {}
+        self.checkpoint_steps = []
 
     def load_tape(self, tape_string):
-        self.tape = Tape(tape_string)
+        self.tape = self._new_tape(tape_string)
+        self.clear_checkpoints()
+
+    def _new_tape(self, *args):
+        # Новая лента взамен текущей. Лента в файле закрывается до того, как
+        # откроют новую (с тем же path новая перезаписала бы файл старой), а
+        # журнал перед этим разворачивает записи, пока старая лента доступна
+        if isinstance(self.tape, MappedTape):
+            self.log.freeze()
+            self.tape.close()
+        return self.tape_class(*args)
 
     def load_program(self, program_lines):
-
+        # Каждая команда сразу разбирается (см. instructions.parse); строка с
+        # ошибкой - ValueError, и тогда программа не меняется
+        entries = []
         for line_num, line in enumerate(program_lines, 1):
             line = line.strip()
             if not line:
@@ -24,63 +75,85 @@ class PostMachine:
             if line[0].isdigit() and '.' in line:
                 line = line.split('. ', 1)[1]
 
-            self.program.append((line_num, line))
-
-    def load_program_from_file(self, filename):
-        with open(filename, 'r', encoding='utf-8') as f:
-            program_lines = f.readlines()
-        self.load_program(program_lines)
+            try:
+                instruction = parse(line)
+            except ValueError as error:
+                raise ValueError(f"Строка {line_num}: {error}: '{line}'") from None
+            entries.append((line_num, line, instruction))
+        self._add_lines(entries)
+
+    def _add_lines(self, entries):
+        # Пополняет таблицы code и lines, индексируемые номером строки;
+        # при повторной загрузке, как и в find_line, действует первая строка с номером
+        for line_num, command, instruction in entries:
+            self.program.append((line_num, command))
+            if line_num >= len(self.code):
+                missing = line_num + 1 - len(self.code)
+                self.code.extend([None] * missing)
+                self.lines.extend([None] * missing)
+            if self.code[line_num] is None:
+                self.code[line_num] = instruction
+                self.lines[line_num] = command
+        self.compiled = None
+
+    def load_program_from_file(self, filename, cache_dir=None):
+        # Разобранная программа кэшируется по хэшу содержимого файла: в памяти
+        # процесса и, если задан cache_dir, в двоичном файле в этом каталоге
+        with open(filename, 'rb') as f:
+            data = f.read()
+        digest = program_cache.source_digest(data)
+
+        cached = program_cache.load('post', digest, cache_dir)
+        if cached is not None:
+            strings, rows = cached
+            self._add_lines([(line_num, strings[text], (Opcode(opcode), a, b))
+                             for line_num, text, opcode, a, b in rows])
+            return
+
+        start = len(self.program)
+        self.load_program(io.TextIOWrapper(io.BytesIO(data), encoding='utf-8').readlines())
+
+        table = program_cache.StringTable()
+        rows = [(line_num, table.intern(command)) + parse(command)
+                for line_num, command in self.program[start:]]
+        program_cache.store('post', digest, table.strings, rows, 5, cache_dir)
 
     def find_line(self, line_number):
-        for num, cmd in self.program:
-            if num == line_number:
-                return cmd
+        if 0 < line_number < len(self.lines):
+            return self.lines[line_number]
         return None
 
     def execute_command(self, command):
-        cmd_parts = command.strip().split()
-
-        if not cmd_parts:
-            self.halted = True
-            return None
-
-        operation = cmd_parts[0]
-
-        if operation == '!':
-            self.halted = True
-            return None
+        return self.execute_instruction(decode(command))
 
-        elif operation == '→' or operation == '->':
-            if len(cmd_parts) >= 2:
-                self.tape.move_right()
-                return int(cmd_parts[1])
+    def execute_instruction(self, instruction):
+        # Выполняет разобранную команду (см. instructions.decode); возвращает следующую строку
+        opcode, a, b = instruction
 
-        elif operation == '←' or operation == '<-':
-            if len(cmd_parts) >= 2:
-                self.tape.move_left()
-                return int(cmd_parts[1])
+        if opcode == Opcode.RIGHT:
+            self.tape.move_right()
+            return a
 
-        elif operation == '0':
+        elif opcode == Opcode.LEFT:
+            self.tape.move_left()
+            return a
 
-            if len(cmd_parts) >= 2:
-                self.tape.write(0)
-                return int(cmd_parts[1])
+        elif opcode == Opcode.ZERO:
+            self.tape.write(0)
+            return a
 
-        elif operation == '1':
-            if len(cmd_parts) >= 2:
-                self.tape.write(1)
-                return int(cmd_parts[1])
+        elif opcode == Opcode.ONE:
+            self.tape.write(1)
+            return a
 
-        elif operation == '?':
-            if len(cmd_parts) >= 3:
-                current_symbol = self.tape.read()
-                line_if_0 = int(cmd_parts[1])
-                line_if_1 = int(cmd_parts[2])
+        elif opcode == Opcode.TEST:
+            if self.tape.read() == 0:
+                return a
+            else:
+                return b
 
-                if current_symbol == 0:
-                    return line_if_0
-                else:
-                    return line_if_1
+        elif opcode == Opcode.ERROR:
+            raise ValueError(a)
 
         self.halted = True
         return None
@@ -89,8 +162,12 @@ class PostMachine:
         if self.halted == True or not self.current_line:
             return False
 
-        command = self.find_line(self.current_line)
-        if command is None:
+        if self.checkpoint_interval and self.step_count % self.checkpoint_interval == 0:
+            self._save_checkpoint()
+
+        line = self.current_line
+        instruction = self.code[line] if 0 < line < len(self.code) else None
+        if instruction is None:
             self.halted = True
             return False
 
@@ -100,32 +177,307 @@ class PostMachine:
         old_position = self.tape.position
 
 
-        next_line = self.execute_command(command)
+        next_line = self.execute_instruction(instruction)
 
-        self.log.append({
-            'step': self.step_count,
-            'line': old_line,
-            'command': command,
-            'old_symbol': old_symbol,
-            'new_symbol': self.tape.read(),
-            'old_position': old_position,
-            'new_position': self.tape.position,
-            'next_line': next_line,
-            'tape_content': self.tape.get_full_tape()
-        })
+        if self.log.level == 'full':
+            self.log.record(self.step_count, old_line, self.lines[line], old_symbol,
+                            self.tape.read(), old_position, self.tape.position,
+                            next_line, self.tape)
         self.current_line = next_line
         self.step_count += 1
 
         return True
 
-    def run(self, max_steps=1000):
+    def enable_profiler(self, profiler=None):
+        # Профилирование шагов (см. engine/profiler.py): переход и "состояние" -
+        # номер строки. step подменяется оберткой, без профилировщика он не замедляется
+        self.profiler = profiler or Profiler()
+        self.step = self.profiler.wrap(
+            PostMachine.step.__get__(self),
+            lambda: (self.current_line, self.current_line, self.tape.position))
+        return self.profiler
+
+    def disable_profiler(self):
+        profiler, self.profiler = self.profiler, None
+        self.__dict__.pop('step', None)
+        return profiler
+
+    def _save_checkpoint(self):
+        if self.step_count not in self.checkpoints:
+            self.checkpoints[self.step_count] = (
+                self.tape.snapshot(), self.tape.position, self.current_line)
+            insort(self.checkpoint_steps, self.step_count)
+
+    def clear_checkpoints(self):
+        self.checkpoints = {}
+        self.checkpoint_steps = []
+
+    def seek(self, step):
+        # Переводит машину к состоянию после step шагов: восстанавливает ближайшую
+        # контрольную точку не позже step и доигрывает остаток. Вперед журнал
+        # просто доигрывается от текущего шага, чтобы в нем не было пропусков.
+        if self.step_count > step or self.halted:
+            i = bisect_right(self.checkpoint_steps, step) - 1
+            if i < 0:
+                raise ValueError(f"Нет контрольной точки для шага {step}")
+            base = self.checkpoint_steps[i]
+            snapshot, position, line = self.checkpoints[base]
+            self.tape.restore(snapshot)
+            self.tape.position = position
+            self.current_line = line
+            self.step_count = base
+            self.halted = False
+            self.cycle = None
+            self.log.truncate(base)
+
+        while self.step_count < step and self.step():
+            pass
+        return self.step_count == step
+
+    def step_back(self):
+        if self.step_count == 0:
+            return False
+        return self.seek(self.step_count - 1)
+
+    def compile(self):
+        # Таблица переходов общей виртуальной машины (engine/vm.py): строка
+        # таблицы на каждую строку программы и на каждый номер, куда есть переход.
+        # Символы: 0 и 1 - значения ячеек, 2 - хранимый ноль (см. Tape.stored_zeros),
+        # запись в который убирает его с ленты так же, как Tape.write
+        if self.compiled is not None:
+            return self.compiled
+
+        program = vm.Program(3)
+        lines = [(line, instruction) for line, instruction in enumerate(self.code)
+                 if instruction is not None]
+        for line, _ in lines:
+            program.add_row(line)
+
+        def row(target):
+            # Строки 0 нет - выполнение прекращается без остановки, как в step()
+            return program.add_row(target, vm.STOP if target == 0 else vm.HALT)
+
+        for line, (opcode, a, b) in lines:
+            pc = program.label_codes[line]
+            for symbol in range(3):
+                if opcode == Opcode.RIGHT or opcode == Opcode.LEFT:
+                    move = 1 if opcode == Opcode.RIGHT else -1
+                    program.set(pc, symbol, symbol, move, row(a))
+                elif opcode == Opcode.ZERO or opcode == Opcode.ONE:
+                    program.set(pc, symbol, 1 if opcode == Opcode.ONE else 0, 0, row(a))
+                elif opcode == Opcode.TEST:
+                    program.set(pc, symbol, symbol, 0, row(b if symbol == 1 else a))
+                else:
+                    program.set(pc, symbol, symbol, 0, vm.HALT_AFTER)
+
+        # Циклы просмотра и заполнения ("? a b", записи и сдвиг обратно на "?")
+        # выполняются макросом: вся серия одинаковых ячеек проходится за раз
+        for line, (opcode, a, b) in lines:
+            if opcode != Opcode.TEST:
+                continue
+            pc = program.label_codes[line]
+            for codes, stops, target in (((0, 2), (1,), a), ((1,), (0, 2), b)):
+                loop = self._scan_loop(line, target)
+                if loop is not None:
+                    cost, fill, move = loop
+                    for symbol in codes:
+                        program.set_macro(pc, symbol, cost, fill, move, stops)
+        self.compiled = program
+        return program
+
+    def _scan_loop(self, line, target):
+        # Цепочка строк от target: записи в текущую ячейку, затем сдвиг обратно
+        # на строку line. Возвращает (стоимость итерации, запись, сдвиг) или None
+        fill = None
+        cost = 1
+        for _ in range(MAX_LOOP_CHAIN):
+            instruction = self.code[target] if 0 < target < len(self.code) else None
+            if instruction is None:
+                return None
+            opcode, next_line, _ = instruction
+            cost += 1
+            if opcode == Opcode.ZERO or opcode == Opcode.ONE:
+                fill = 1 if opcode == Opcode.ONE else 0
+                target = next_line
+            elif opcode == Opcode.RIGHT or opcode == Opcode.LEFT:
+                if next_line != line:
+                    return None
+                return cost, fill, 1 if opcode == Opcode.RIGHT else -1
+            else:
+                return None
+        return None
+
+    def run_fast(self, max_steps=1000):
+        # Прогон по скомпилированной таблице без журнала; машина приходит
+        # в то же состояние, что и после run(max_steps)
+        line = self.current_line
+        if self.halted or not line or max_steps <= 0:
+            return 0
+        program = self.compile()
+        pc = program.label_codes.get(line)
+        if pc is None:
+            self.halted = True
+            return 0
+        self.log.freeze()
+
+        # Локальная копия ленты: список кодов от самой левой до самой правой ячейки
+        tape = self.tape
+        ones = tape.cells()
+        zeros = tape.stored_zeros()
+        position = tape.position
+        low = min(min(ones, default=position), min(zeros, default=position), position)
+        high = max(max(ones, default=position), max(zeros, default=position), position)
+        buffer = bytearray(high - low + 1)
+        for cell in ones:
+            buffer[cell - low] = 1
+        for cell in zeros:
+            buffer[cell - low] = 2
+        initial = buffer.copy()
+
+        steps, index, pc, status, shift, visited_low, visited_high = program.execute(
+            buffer, position - low, pc, max_steps)
+
+        if isinstance(tape, MappedTape) and 1 in buffer:
+            # Место в файле готовим заранее: при нехватке лента остается прежней
+            tape.reserve(low - shift + buffer.find(1), low - shift + buffer.rfind(1))
+
+        # Переносим изменившиеся ячейки обратно на ленту
+        initial[0:0] = bytes(shift)
+        initial.extend(bytes(len(buffer) - len(initial)))
+        low -= shift
+        for offset, (old, new) in enumerate(zip(initial, buffer)):
+            if old != new:
+                tape.position = low + offset
+                tape.write(1 if new == 1 else 0)
+        tape.position = low + index
+        if steps:
+            # Головка побывала во всех позициях между visited_low и visited_high
+            tape.min_position = min(tape.min_position, low + visited_low)
+            tape.max_position = max(tape.max_position, low + visited_high)
+
+        if status == vm.HALT_AFTER:
+            self.current_line = None
+        else:
+            self.current_line = program.labels[pc]
+        self.halted = status == vm.HALT or status == vm.HALT_AFTER
+        self.step_count += steps
+        return steps
+
+    def program_digest(self):
+        text = '\n'.join(f"{line_num}. {command}" for line_num, command in self.program)
+        return program_cache.source_digest(text.encode('utf-8'))
+
+    def save_state(self, filename):
+        # Сохраняет ленту, головку, строку, счетчик шагов и хэш программы в
+        # двоичный файл (формат - engine/run_state.py). Коды ячеек как в compile:
+        # 0 - ноль, 1 - единица, 2 - хранимый ноль
+        tape = self.tape
+        ones = tape.cells()
+        zeros = tape.stored_zeros()
+        low = min(min(ones, default=0), min(zeros, default=0))
+        high = max(max(ones, default=-1), max(zeros, default=-1))
+        codes = bytearray(max(high - low + 1, 0))
+        for cell in ones:
+            codes[cell - low] = 1
+        for cell in zeros:
+            codes[cell - low] = 2
+        line = '' if self.current_line is None else str(self.current_line)
+        data = run_state.pack('post', self.program_digest(), line, tape.position,
+                              self.step_count, self.halted,
+                              (tape.min_position, tape.max_position), [], low, codes)
+        run_state.save(filename, data)
+
+    def load_state(self, filename):
+        # Восстанавливает машину из файла save_state; программа должна быть уже загружена
+        saved = run_state.unpack('post', run_state.load(filename))
+        if saved['digest'] != self.program_digest():
+            raise ValueError("Состояние сохранено для другой программы")
+        low, codes = saved['low'], saved['codes']
+        # Хранимые нули бывают только в исходных данных, т.е. начиная с позиции 0
+        stored = {low + offset for offset, code in enumerate(codes) if code == 2}
+        size = max(stored) + 1 if stored else 0
+        tape = self._new_tape('0' * size)
+        for position in range(size):
+            if position not in stored:
+                tape.position = position
+                tape.write(0)
+        for offset, code in enumerate(codes):
+            if code == 1:
+                tape.position = low + offset
+                tape.write(1)
+        tape.min_position, tape.max_position = saved['bounds']
+        tape.position = saved['position']
+        self.tape = tape
+        self.current_line = int(saved['state']) if saved['state'] else None
+        self.step_count = saved['steps']
+        self.halted = saved['halted']
+        self.cycle = None
+        self.log.clear()
+        self.clear_checkpoints()
+
+    def run(self, max_steps=1000, detect_loops=False, autosave=None, autosave_every=100000,
+            engine='step'):
+        # С detect_loops=True выполнение прерывается, как только доказано,
+        # что программа зациклилась; описание цикла - в get_status()['cycle'].
+        # С файлом autosave состояние сохраняется в него (save_state) каждые
+        # autosave_every шагов и в конце прогона.
+        # С engine='vm' прогон идет через run_fast - по скомпилированной таблице,
+        # без журнала, поиска циклов, контрольных точек и профилировщика
+        if engine not in ENGINES:
+            raise ValueError(f"Неизвестный исполнитель: {engine}")
+        self.cycle = None
+        if engine == 'vm':
+            if detect_loops or self.checkpoint_interval or self.profiler is not None:
+                raise ValueError("Поиск циклов, контрольные точки и профилировщик "
+                                 "работают только пошагово")
+            if autosave is None:
+                return self.run_fast(max_steps)
+            executed_steps = 0
+            while True:
+                steps = self.run_fast(min(autosave_every, max_steps - executed_steps))
+                executed_steps += steps
+                self.save_state(autosave)
+                if not steps or executed_steps >= max_steps:
+                    return executed_steps
+
+        detector = None
+        if detect_loops:
+            detector = LoopDetector(0)
+            detector.start(self.step_count, self.current_line, self.tape.position, self.tape)
+
         executed_steps = 0
         while not self.halted and executed_steps < max_steps:
             if not self.step():
                 break
             executed_steps += 1
+            if autosave is not None and self.step_count % autosave_every == 0:
+                self.save_state(autosave)
+            if detector is not None:
+                self.cycle = detector.check(self.step_count, self.current_line,
+                                            self.tape.position, self.tape)
+                if self.cycle is not None:
+                    break
+        if autosave is not None:
+            self.save_state(autosave)
         return executed_steps
 
+    def iter_steps(self, batch=100, max_steps=None):
+        # Генератор выполнения: списки из batch событий StepEvent, не больше
+        # max_steps шагов (None - до остановки). Шаги идут через step, как в run;
+        # асинхронная обертка - engine.streaming.stream_steps
+        return streaming.batched(self._step_events(max_steps), batch)
+
+    def _step_events(self, max_steps):
+        executed = 0
+        while max_steps is None or executed < max_steps:
+            line, position = self.current_line, self.tape.position
+            symbol = self.tape.read()
+            if not self.step():
+                return
+            executed += 1
+            yield StepEvent(self.step_count - 1, line, symbol, self.tape.read_at(position),
+                            position, self.tape.position, self.current_line)
+
     def get_status(self):
         return {
             'current_line': self.current_line,
@@ -133,13 +485,19 @@ class PostMachine:
             'symbol': self.tape.read(),
             'halted': self.halted,
             'steps': self.step_count,
-            'tape_content': self.tape.get_full_tape()
+            'tape_content': self.tape.get_full_tape(),
+            'cycle': self.cycle
         }
 
     def reset(self):
         self.current_line = 1
         self.halted = False
         self.program = []
-        self.log = []
+        self.code = [None]
+        self.lines = [None]
+        self.compiled = None
+        self.log.clear()
         self.tape.position = 0
         self.step_count = 0
+        self.cycle = None
+        self.clear_checkpoints()
@@ -1,6 +1,12 @@
+import json
 import pytest
+import random
 from post_machine import PostMachine
-from tape import Tape
+from tape import Tape, BitTape, MappedTape
+from instructions import Opcode
+from batch import run_batch
+from engine import program_cache, spacetime
+import benchmark
 
 
 def test_tape_initialization_empty():
@@ -109,6 +115,53 @@ def test_tape_expansion():
     assert tape.get_full_tape() == "1001"
 
 
+def tape_state(tape):
+    return (tape.position, tape.min_position, tape.max_position, tape.read_at(tape.position),
+            tape.get_full_tape(), tape.cells())
+
+
+@pytest.mark.parametrize("initial", ["", "0", "00", "101", "1" * 20, "0110x1" * 7])
+def test_bit_tape_matches_tape(initial):
+    """Тест: упакованная лента ведет себя как словарная на случайных операциях"""
+    rng = random.Random(initial)
+    tapes = [Tape(initial), BitTape(initial)]
+    saved = None
+    for _ in range(2000):
+        operation = rng.random()
+        for tape in tapes:
+            if operation < 0.25:
+                tape.move_left() if operation < 0.1 else tape.move_right()
+            elif operation < 0.3:
+                tape.position = rng.randrange(-40, 80) if tape is tapes[0] else tapes[0].position
+            elif operation < 0.6:
+                tape.write(1 if operation < 0.45 else 0)
+            elif operation < 0.62:
+                tape.write(2)
+            else:
+                tape.read()
+        if operation > 0.995:
+            saved = [tape.snapshot() for tape in tapes]
+        elif operation < 0.003 and saved:
+            for tape, snapshot in zip(tapes, saved):
+                tape.restore(snapshot)
+        assert tape_state(tapes[0]) == tape_state(tapes[1])
+
+
+def test_bit_tape_export_long():
+    """Тест выгрузки длинной ленты, выходящей за хранимые байты"""
+    data = "".join(random.Random(1).choice("01") for _ in range(100003))
+    tape = BitTape(data)
+    assert tape.get_full_tape() == data
+    assert len(tape.bits) == (len(data) + 7) // 8
+
+    tape.position = -5
+    tape.write(1)
+    tape.position = len(data) + 3
+    tape.read()
+    assert tape.get_full_tape() == "1" + "0" * 4 + data + "0" * 4
+    assert tape.export(-100, -90) == "0" * 10
+
+
 def test_post_machine_initialization():
     """Тест инициализации машины Поста"""
     machine = PostMachine()
@@ -176,6 +229,28 @@ def test_post_machine_load_program_with_comments():
     assert machine.find_line(3) == "→ 2"
     assert machine.find_line(5) == "!"
 
+@pytest.mark.parametrize("line", ["→", "? 1", "? 1 x", "→ 2 3", "! 1", "стоп", "0 а"])
+def test_post_machine_load_program_malformed(line):
+    """Тест: строки с ошибками обнаруживаются при загрузке"""
+    machine = PostMachine()
+    with pytest.raises(ValueError, match="Строка 2"):
+        machine.load_program(["1. → 2", "2. " + line])
+
+
+def test_post_machine_decoded_program():
+    """Тест таблицы команд, индексируемой номером строки"""
+    machine = PostMachine()
+    machine.load_program(["1. ? 3 2", "", "3. ← 1", "# комментарий", "5. !"])
+    assert machine.code[1] == (Opcode.TEST, 3, 2)
+    assert machine.code[2] is None
+    assert machine.code[3] == (Opcode.LEFT, 1, 0)
+    assert machine.code[4] == (Opcode.HALT, 0, 0)
+    assert machine.code[5] == (Opcode.HALT, 0, 0)
+
+    machine.current_line = -1
+    assert not machine.step() and machine.halted
+
+
 def test_post_machine_execute_command_move_right():
     """Тест выполнения команды движения вправо"""
     machine = PostMachine()
@@ -324,6 +399,328 @@ def test_post_machine_run_max_steps():
     assert not machine.halted
 
 
+def test_post_machine_run_detects_cycle():
+    """Тест обнаружения цикла на месте"""
+    machine = PostMachine()
+    machine.load_tape("1")
+    machine.load_program(["1. → 2", "2. ← 1"])
+
+    steps = machine.run(max_steps=10 ** 6, detect_loops=True)
+    cycle = machine.get_status()['cycle']
+    assert steps < 100
+    assert not machine.halted
+    assert cycle['period'] == 2
+    assert cycle['shift'] == 0
+    assert 'cycle' not in machine.log[-1]
+
+    # Следующий прогон не сообщает о старом цикле
+    machine.run(max_steps=50)
+    assert machine.get_status()['cycle'] is None
+
+
+def test_post_machine_run_detects_translated_cycle():
+    """Тест обнаружения цикла со сдвигом вдоль ленты"""
+    machine = PostMachine()
+    machine.load_tape("101")
+    machine.load_program(["1. 1 2", "2. → 1"])
+
+    steps = machine.run(max_steps=10 ** 6, detect_loops=True)
+    cycle = machine.get_status()['cycle']
+    assert steps < 100
+    assert cycle['shift'] == cycle['period'] // 2
+
+
+def test_post_machine_run_no_false_cycle():
+    """Тест: растущий "челнок" не зацикливается, детектор не срабатывает"""
+    machine = PostMachine()
+    machine.load_program([
+        "1. → 2",
+        "2. ? 3 4",     # ищем конец блока единиц
+        "3. 1 5",       # дописываем единицу
+        "4. → 2",
+        "5. ← 6",
+        "6. ? 7 5",     # возвращаемся к началу блока
+        "7. → 2",
+    ])
+
+    steps = machine.run(max_steps=3000, detect_loops=True)
+    assert steps == 3000
+    assert machine.get_status()['cycle'] is None
+
+
+SHUTTLE_PROGRAM = [
+    "1. → 2",
+    "2. ? 3 4",
+    "3. 1 5",
+    "4. → 2",
+    "5. ← 6",
+    "6. ? 7 5",
+    "7. !",
+]
+
+
+def machine_state(machine):
+    return (machine.current_line, machine.tape.position, machine.tape.get_full_tape(),
+            machine.step_count, machine.halted, len(machine.log))
+
+
+def test_post_machine_seek():
+    """Тест перемотки к произвольному шагу"""
+    reference = PostMachine()
+    reference.load_tape("0111")
+    reference.load_program(SHUTTLE_PROGRAM)
+    states = [machine_state(reference)]
+    while reference.step():
+        states.append(machine_state(reference))
+
+    machine = PostMachine(checkpoint_interval=5)
+    machine.load_tape("0111")
+    machine.load_program(SHUTTLE_PROGRAM)
+    machine.run(max_steps=1000)
+    assert machine.halted
+    assert len(machine.checkpoints) == (len(states) - 1) // 5 + 1
+
+    for step in (12, 3, len(states) - 1, 0, 9):
+        assert machine.seek(step)
+        assert machine_state(machine) == states[step]
+
+
+def test_post_machine_step_back():
+    """Тест пошагового отката назад"""
+    machine = PostMachine(checkpoint_interval=4)
+    machine.load_tape("011")
+    machine.load_program(SHUTTLE_PROGRAM)
+    machine.run(max_steps=1000)
+    final_log = list(machine.log)
+
+    while machine.step_back():
+        pass
+    assert machine.step_count == 0
+    assert machine.current_line == 1
+    assert machine.tape.get_full_tape() == "011"
+
+    machine.run(max_steps=1000)
+    assert machine.log == final_log
+
+
+def test_post_machine_seek_without_checkpoints():
+    """Тест перемотки назад без контрольных точек"""
+    machine = PostMachine()
+    machine.load_program(["1. → 1"])
+    machine.run(max_steps=3)
+    with pytest.raises(ValueError):
+        machine.seek(1)
+
+
+def test_post_machine_run_batch():
+    """Тест пакетного прогона: результаты совпадают с последовательным запуском"""
+    tapes = ["0" + "1" * n for n in range(1, 8)]
+    results = list(run_batch(SHUTTLE_PROGRAM, tapes, max_steps=10 ** 4, chunksize=3, workers=2))
+    assert sorted(result['index'] for result in results) == list(range(len(tapes)))
+
+    for result in results:
+        machine = PostMachine()
+        machine.load_tape(tapes[result['index']])
+        machine.load_program(SHUTTLE_PROGRAM)
+        machine.run(max_steps=10 ** 4)
+        assert result['tape'] == machine.tape.get_full_tape()
+        assert result['steps'] == machine.step_count
+        assert result['halted'] and not result['timeout']
+
+
+def test_post_machine_run_batch_limits():
+    """Тест пакетного прогона с ограничением шагов и времени"""
+    program = ["1. → 2", "2. ← 1"]
+    by_steps = list(run_batch(program, ["1"], max_steps=5))
+    assert by_steps[0]['steps'] == 5
+    assert not by_steps[0]['halted'] and not by_steps[0]['timeout']
+
+    by_time = list(run_batch(program, ["1", "11"], max_steps=10 ** 12, timeout=0.2, workers=2))
+    assert len(by_time) == 2
+    assert all(result['timeout'] and not result['halted'] for result in by_time)
+
+
+def test_post_machine_log_level_off():
+    """Тест работы без журнала"""
+    machine = PostMachine(log_level='off')
+    machine.load_tape("111")
+    machine.load_program(SHUTTLE_PROGRAM)
+    machine.run(max_steps=1000)
+    assert machine.halted
+    assert machine.log == []
+    with pytest.raises(ValueError):
+        PostMachine(log_level='ring')
+
+
+@pytest.mark.parametrize("program, tape, expected", [
+    (benchmark.UNARY_ADDITION, "111011", "11111"),
+    (benchmark.UNARY_DOUBLING, "111", "0000111111"),
+    (benchmark.ERASE, "111", "0"),
+])
+def test_benchmark_programs(program, tape, expected):
+    """Тест программ из набора замеров"""
+    machine = PostMachine()
+    machine.load_tape(tape)
+    machine.load_program(program)
+    machine.run(max_steps=10000)
+    assert machine.halted
+    assert machine.tape.get_full_tape().rstrip("0") == expected.rstrip("0")
+    assert machine.tape.get_full_tape().count("1") == expected.count("1")
+
+
+@pytest.mark.parametrize("tape", ["0111", "01111111", "1"])
+def test_post_machine_bit_tape_matches_dict(tape):
+    """Тест: машина на упакованной ленте работает так же, как на словарной"""
+    machines = [PostMachine(tape_mode='dict', checkpoint_interval=7),
+                PostMachine(tape_mode='bits', checkpoint_interval=7)]
+    for machine in machines:
+        machine.load_tape(tape)
+        machine.load_program(SHUTTLE_PROGRAM)
+        machine.run(max_steps=1000)
+    assert machines[0].log == machines[1].log
+    assert machine_state(machines[0]) == machine_state(machines[1])
+
+    for machine in machines:
+        machine.seek(9)
+    assert machine_state(machines[0]) == machine_state(machines[1])
+    with pytest.raises(ValueError):
+        PostMachine(tape_mode='array')
+
+
+@pytest.mark.parametrize("tape_mode", ['dict', 'bits'])
+@pytest.mark.parametrize("tape, program", [
+    ("0111", SHUTTLE_PROGRAM),
+    ("00", ["1. 0 2", "2. → 3", "3. 0 4", "4. ← 5", "5. ← 6", "6. 1 7", "7. 0 8", "8. !"]),
+    ("1" * 5 + "0" + "1" * 3, benchmark.UNARY_ADDITION),
+])
+def test_post_machine_log_reconstructs_tape(tape_mode, tape, program):
+    """Тест: содержимое ленты в журнале совпадает со снятым после каждого шага"""
+    machine = PostMachine(tape_mode=tape_mode)
+    machine.load_tape(tape)
+    machine.load_program(program)
+    expected = []
+    while machine.step():
+        expected.append(machine.tape.get_full_tape())
+
+    assert [entry['tape_content'] for entry in machine.log] == expected
+    assert [entry['step'] for entry in machine.log] == list(range(len(expected)))
+    assert machine.log[3:7] == machine.log.get_log()[3:7]
+    assert machine.log[-2] == machine.log.get_log()[-2]
+    assert machine.log[::2] == machine.log.get_log()[::2]
+
+
+def test_post_machine_log_limit():
+    """Тест ограничения журнала: старые шаги вытесняются"""
+    machine = PostMachine(log_limit=10)
+    full = PostMachine()
+    for m in (machine, full):
+        m.load_tape("0111")
+        m.load_program(SHUTTLE_PROGRAM)
+        m.run(max_steps=1000)
+
+    assert len(machine.log) == 10
+    assert machine.log == full.log[-10:]
+    with pytest.raises(IndexError):
+        machine.log[10]
+
+
+def test_post_machine_log_limit_keeps_evicted_bounds():
+    """Тест: движения головки из вытесненных шагов остаются в границах ленты"""
+    program = ["1. ← 2", "2. ← 3", "3. → 4", "4. → 5", "5. 1 6", "6. 1 7", "7. 1 8", "8. !"]
+    machine = PostMachine(log_limit=3)
+    full = PostMachine()
+    for m in (machine, full):
+        m.load_tape("1")
+        m.load_program(program)
+        m.run()
+
+    assert machine.log == full.log[-3:]
+    assert [entry['tape_content'] for entry in machine.log] == ["001"] * 3
+
+
+def test_post_machine_log_after_tape_change():
+    """Тест: при подмене ленты старые записи журнала сохраняются"""
+    machine = PostMachine()
+    machine.load_program(["1. 1 2", "2. → 1"])
+    machine.load_tape("0")
+    machine.run(max_steps=2)
+    before = machine.log.get_log()
+    machine.load_tape("000")
+    machine.current_line = 1
+    machine.run(max_steps=2)
+    assert machine.log[:2] == before
+    assert [entry['tape_content'] for entry in machine.log] == ["1", "10", "100", "100"]
+
+
+RUN_FAST_CASES = [
+    ("0111", SHUTTLE_PROGRAM),
+    ("1" * 5 + "0" + "1" * 3, benchmark.UNARY_ADDITION),
+    ("111", benchmark.UNARY_DOUBLING),
+    ("00", ["1. 0 2", "2. → 3", "3. 0 4", "4. !"]),                # хранимые нули стираются
+    ("0", ["1. ← 2", "2. 1 3", "3. ← 0"]),                         # переход на строку 0
+    ("1", ["1. ? 2 7", "2. !"]),                                   # переход на несуществующую строку
+    ("10", ["1. → 2", "2. ← 1"]),
+    ("", []),
+    ("0" * 6 + "1", ["1. ? 2 3", "2. → 1", "3. !"]),               # просмотр хранимых нулей
+    ("1" * 9, ["1. → 2", "2. ? 3 4", "3. 1 5", "4. ← 2", "5. !"]),  # просмотр влево
+    ("1" * 9, ["1. ? 5 2", "2. 1 3", "3. 0 4", "4. ← 1", "5. 1 6", "6. ← 5"]),  # две записи за итерацию
+]
+
+
+@pytest.mark.parametrize("tape_mode", ['dict', 'bits', 'mmap'])
+@pytest.mark.parametrize("max_steps", [0, 1, 3, 17, 1000])
+@pytest.mark.parametrize("tape, program", RUN_FAST_CASES)
+def test_post_machine_run_fast_matches_run(tape, program, max_steps, tape_mode):
+    """Тест: прогон по скомпилированной таблице совпадает с пошаговым"""
+    slow, fast = PostMachine(tape_mode=tape_mode), PostMachine(tape_mode=tape_mode, log_level='off')
+    for machine in (slow, fast):
+        machine.load_tape(tape)
+        machine.load_program(program)
+    assert fast.run(max_steps, engine='vm') == slow.run(max_steps)
+    assert machine_state(fast)[:-1] == machine_state(slow)[:-1]
+    assert (fast.tape.min_position, fast.tape.max_position) == \
+        (slow.tape.min_position, slow.tape.max_position)
+    assert fast.tape.is_empty() == slow.tape.is_empty()
+
+
+def test_post_machine_compile_scan_loops():
+    """Тест: циклы просмотра и заполнения распознаются как макросы"""
+    machine = PostMachine()
+    machine.load_program(benchmark.ERASE)
+    program = machine.compile()
+    pc = program.label_codes[1]
+    assert program.macros == {pc * 3 + 1: (3, 0, 1, (0, 2), program.label_codes[2])}
+
+    machine = PostMachine()
+    machine.load_program(["1. ? 2 3", "2. ? 3 4", "3. !", "4. → 1"])  # не цикл: в цепочке проверка
+    assert machine.compile().macros == {}
+
+
+def test_post_machine_run_fast_long_scan():
+    """Тест: длинная серия проходится макросом с точным числом шагов"""
+    machine = PostMachine(log_level='off')
+    machine.load_tape("1" * 100000 + "0" + "1" * 100000)
+    machine.load_program(benchmark.UNARY_ADDITION)
+    steps = machine.run(max_steps=10 ** 6)
+    assert machine.halted
+    assert steps == machine.step_count == 4 * 100000 + 7  # как у пошагового прогона: 4n + 7
+    assert machine.tape.get_full_tape().strip('0') == "1" * 200000
+
+
+def test_post_machine_run_fast_keeps_log():
+    """Тест: записи журнала до быстрого прогона не портятся"""
+    machine = PostMachine()
+    machine.load_tape("0111")
+    machine.load_program(benchmark.SHUTTLE)
+    machine.run(max_steps=5)
+    before = machine.log.get_log()
+    machine.run_fast(30)
+    machine.run(max_steps=5)
+    assert machine.log[:5] == before
+    assert len(machine.log) == 10
+    assert machine.log[-1]['tape_content'] == machine.tape.get_full_tape()
+
+
 def test_post_machine_run_already_halted():
     """Тест выполнения уже остановленной машины"""
     machine = PostMachine()
@@ -385,6 +782,46 @@ def test_post_machine_load_program_from_file(tmp_path):
     assert machine.find_line(3) == "# Comment"
 
 
+def test_post_machine_load_program_from_file_cache(tmp_path, monkeypatch):
+    """Тест двоичного кэша разобранной программы"""
+    program_file = tmp_path / "program.txt"
+    program_file.write_text("1. ? 2 3\n2. 1 3\n3. → 4\n# Comment\n")
+    cache_dir = tmp_path / "cache"
+
+    first = PostMachine()
+    first.load_program_from_file(str(program_file), cache_dir=str(cache_dir))
+    assert len(list(cache_dir.iterdir())) == 1
+
+    # Второй процесс: кэша в памяти нет, программа читается из файла кэша без разбора
+    monkeypatch.setattr(program_cache, '_memory', {})
+    monkeypatch.setattr(PostMachine, 'load_program', None)
+    second = PostMachine()
+    second.load_program_from_file(str(program_file), cache_dir=str(cache_dir))
+    assert second.program == first.program
+
+    assert second.code == first.code and second.lines == first.lines
+
+    second.load_tape("0")
+    second.run(max_steps=10)
+    assert second.halted and second.step_count == 4
+    assert second.tape.get_full_tape() == "10"
+
+
+def test_post_machine_load_program_from_file_broken_cache(tmp_path, monkeypatch):
+    """Тест: испорченный файл кэша игнорируется, программа разбирается заново"""
+    program_file = tmp_path / "program.txt"
+    program_file.write_text("1. → 2\n2. !\n")
+    cache_dir = tmp_path / "cache"
+    PostMachine().load_program_from_file(str(program_file), cache_dir=str(cache_dir))
+    for cache_file in cache_dir.iterdir():
+        cache_file.write_bytes(b"garbage")
+
+    monkeypatch.setattr(program_cache, '_memory', {})
+    machine = PostMachine()
+    machine.load_program_from_file(str(program_file), cache_dir=str(cache_dir))
+    assert machine.program == [(1, "→ 2"), (2, "!")]
+
+
 def test_post_machine_log_structure():
     """Тест структуры лога выполнения"""
     machine = PostMachine()
@@ -440,11 +877,10 @@ def test_complex_program_copy():
         "4. ← 5",      # Двинуться влево
         "5. ?"         # Проверить следующий символ (без параметров - остановка)
     ]
-    machine.load_program(program)
-
-    machine.run(max_steps=10)
-    # Программа должна остановиться на строке 5 из-за неправильного синтаксиса
-    assert machine.halted == True
+    # Строка 5 с неправильным синтаксисом обнаруживается уже при загрузке
+    with pytest.raises(ValueError, match="Строка 5"):
+        machine.load_program(program)
+    assert machine.program == []
 
 
 def test_edge_case_empty_program():
@@ -507,4 +943,189 @@ def test_edge_case_tape_boundaries():
 
 
 if __name__ == "__main__":
-    pytest.main([__file__, "-v"])
\ No newline at end of file
+    pytest.main([__file__, "-v"])
+
+
+def test_post_machine_profiler():
+    """Тест: профиль по строкам программы и посещениям ячеек"""
+    machine = PostMachine(log_level='off')
+    machine.load_tape("1110")
+    machine.load_program(benchmark.ERASE)
+    profiler = machine.enable_profiler()
+    machine.run()
+    assert machine.halted
+    assert profiler.steps == machine.step_count == 11  # '!' - тоже шаг
+    assert profiler.hits == {1: 4, 2: 3, 3: 3, 4: 1}
+    assert profiler.cells == {0: 3, 1: 3, 2: 3, 3: 2}
+    assert set(json.loads(profiler.to_json())['transitions']) == {'1', '2', '3', '4'}
+
+    machine.disable_profiler()
+    assert machine.profiler is None and 'step' not in machine.__dict__
+
+
+def test_post_machine_iter_steps():
+    """Тест: события шагов по пачкам совпадают с журналом выполнения"""
+    machine = PostMachine()
+    machine.load_tape("1110")
+    machine.load_program(benchmark.ERASE)
+    batches = list(machine.iter_steps(batch=4))
+    assert [len(batch) for batch in batches] == [4, 4, 3]
+    events = [event for batch in batches for event in batch]
+    assert machine.halted and len(events) == machine.step_count == 11
+    assert events[0] == (0, 1, 1, 1, 0, 0, 2)
+    assert events[1] == (1, 2, 1, 0, 0, 0, 3)
+    assert events[-1].next_line is None
+    assert [event.next_line for event in events] == [entry['next_line'] for entry in machine.log]
+
+    machine.reset()
+    assert list(machine.iter_steps(max_steps=0)) == []
+
+
+@pytest.mark.parametrize("tape_mode", ['dict', 'bits', 'mmap'])
+def test_post_machine_save_and_load_state(tmp_path, tape_mode):
+    """Тест: прогон, прерванный сохранением, продолжается с того же места"""
+    reference = PostMachine(tape_mode=tape_mode)
+    reference.load_tape("0100111")
+    reference.load_program(SHUTTLE_PROGRAM)
+    reference.run(max_steps=60)
+
+    machine = PostMachine(tape_mode=tape_mode)
+    machine.load_tape("0100111")
+    machine.load_program(SHUTTLE_PROGRAM)
+    machine.run(max_steps=7)
+    machine.save_state(tmp_path / "run.state")
+
+    resumed = PostMachine(tape_mode=tape_mode)
+    resumed.load_program(SHUTTLE_PROGRAM)
+    resumed.load_state(tmp_path / "run.state")
+    assert machine_state(resumed)[:-1] == machine_state(machine)[:-1]
+    assert resumed.tape.stored_zeros() == machine.tape.stored_zeros()
+    assert (resumed.tape.min_position, resumed.tape.max_position) == \
+        (machine.tape.min_position, machine.tape.max_position)
+    resumed.run(max_steps=53)
+    assert machine_state(resumed)[:-1] == machine_state(reference)[:-1]
+
+    other = PostMachine()
+    other.load_program(benchmark.ERASE)
+    with pytest.raises(ValueError):
+        other.load_state(tmp_path / "run.state")
+
+
+@pytest.mark.parametrize("engine", ['step', 'vm'])
+def test_post_machine_run_autosave(tmp_path, engine):
+    machine = PostMachine(log_level='off')
+    machine.load_tape("1" * 30)
+    machine.load_program(benchmark.ERASE)
+    steps = machine.run(max_steps=1000, autosave=tmp_path / "erase.state", autosave_every=40,
+                        engine=engine)
+    assert machine.halted and steps == 92
+
+    resumed = PostMachine()
+    resumed.load_program(benchmark.ERASE)
+    resumed.load_state(tmp_path / "erase.state")
+    assert machine_state(resumed)[:-1] == machine_state(machine)[:-1]
+    assert resumed.tape.is_empty()
+
+
+def test_post_machine_engine_does_not_depend_on_log_level():
+    """Тест: без журнала run() по-прежнему идет пошагово, таблица - только по запросу"""
+    machine = PostMachine(log_level='off')
+    machine.load_tape("111")
+    machine.load_program(benchmark.ERASE)
+    machine.run_fast = None
+    assert machine.run(1000) == 11 and machine.halted
+
+    with pytest.raises(ValueError):
+        machine.run(100, engine='jit')
+    with pytest.raises(ValueError):
+        machine.run(100, detect_loops=True, engine='vm')
+
+
+def test_mapped_tape_matches_tape():
+    """Тест: лента в файле ведет себя как лента-словарь, включая хранимые нули"""
+    rng = random.Random(11)
+    tape, mapped = Tape("0110"), MappedTape("0110")
+    for _ in range(3000):
+        operation = rng.choice(["left", "right", "write0", "write1", "read"])
+        results = []
+        for t in (tape, mapped):
+            if operation == "left":
+                t.move_left()
+            elif operation == "right":
+                t.move_right()
+            elif operation == "read":
+                results.append(t.read())
+            else:
+                t.write(int(operation[-1]))
+        assert results[:1] == results[1:]
+        assert mapped.is_empty() == tape.is_empty()
+    assert mapped.get_full_tape() == tape.get_full_tape()
+    assert mapped.cells() == tape.cells()
+    assert mapped.stored_zeros() == sorted(tape.stored_zeros())
+    assert (mapped.min_position, mapped.max_position) == (tape.min_position, tape.max_position)
+    mapped.close()
+
+
+def test_post_machine_mmap_tape_limit():
+    machine = PostMachine(tape_mode='mmap', tape_options={'max_cells': 512}, log_level='off')
+    machine.load_program(["1. 1 2", "2. → 1"])
+    with pytest.raises(MemoryError):
+        machine.run(max_steps=10 ** 6)
+    # Ошибка на записи очередной метки: все предыдущие шаги на ленте
+    marks = len(machine.tape.cells())
+    assert 0 < marks < 512
+    assert machine.tape.cells() == dict.fromkeys(range(marks), 1)
+    assert machine.step_count == 2 * marks and machine.tape.position == marks
+    assert machine.current_line == 1
+
+    # Прогон по таблице проверяет лимит до того, как изменить ленту
+    machine = PostMachine(tape_mode='mmap', tape_options={'max_cells': 512}, log_level='off')
+    machine.load_program(["1. 1 2", "2. → 1"])
+    with pytest.raises(MemoryError):
+        machine.run(max_steps=10 ** 6, engine='vm')
+    assert machine_state(machine) == (1, 0, '0', 0, False, 0)
+
+
+def test_post_machine_mmap_tape_reload_keeps_log(tmp_path):
+    """Тест: новая лента в том же файле не портит журнал прогона на старой"""
+    machine = PostMachine(tape_mode='mmap', tape_options={'path': tmp_path / "tape.bin"})
+    machine.load_tape("111")
+    machine.load_program(benchmark.ERASE)
+    machine.run()
+    log = machine.log.get_log()
+    assert [entry['tape_content'] for entry in log[:3]] == ['111', '011', '011']
+
+    old_tape = machine.tape
+    machine.load_tape("1")
+    assert machine.log.get_log() == log
+    assert old_tape.store.map.closed
+    machine.halted, machine.current_line = False, 1
+    machine.run()
+    assert machine.log.get_log()[:len(log)] == log
+    assert machine.tape.get_full_tape() == '0'
+
+    machine.save_state(tmp_path / "state.bin")
+    machine.load_state(tmp_path / "state.bin")
+    assert len(machine.log) == 0
+    machine.tape.close()
+
+
+@pytest.mark.parametrize("tape_mode", ['dict', 'bits', 'mmap'])
+def test_post_machine_space_time_diagram(tmp_path, tape_mode):
+    """Тест: диаграмма прогона машины Поста - строка на каждый stride-й шаг"""
+    machine = PostMachine(tape_mode=tape_mode)
+    machine.load_tape("1110")
+    machine.load_program(benchmark.ERASE)
+    diagram = spacetime.SpaceTimeDiagram(max_rows=4)
+    assert diagram.record(machine) == 11 and diagram.stride == 4
+    assert len(machine.log) == 0 and machine.log.level == 'full'
+    # 0 - пусто, 1 - головка, 2 - метка
+    assert list(diagram.rows()) == [bytes([1, 2, 2, 0]), bytes([0, 1, 2, 0]), bytes([0, 0, 1, 0])]
+    diagram.close()
+
+    machine.reset()
+    machine.load_tape("1" * 50)
+    machine.load_program(benchmark.ERASE)
+    assert spacetime.render(machine, tmp_path / "erase.ppm", max_columns=10) == (153, 9)
+    data = (tmp_path / "erase.ppm").read_bytes()
+    assert data.startswith(b'P6\n9 153\n255\n') and len(data) == 13 + 153 * 9 * 3
@@ -1,3 +1,10 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from engine.mmap_tape import MappedCells
+
+
 
 class Tape:
     def __init__(self, initial_data = ''):
@@ -18,6 +25,29 @@ class Tape:
             self.min_position = min(self.min_position, self.position)
         return self.tape.get(self.position, 0)
 
+    def read_at(self, position):
+        """Значение произвольной ячейки без движения головки и без расширения границ"""
+        return self.tape.get(position, 0)
+
+    def cells(self):
+        """Копия содержимого ленты: позиции единиц -> 1"""
+        return {position: 1 for position, value in self.tape.items() if value == 1}
+
+    def is_empty(self):
+        """Нет ни одной хранимой ячейки - get_full_tape() вернет '0'"""
+        return not self.tape
+
+    def stored_zeros(self):
+        """Позиции хранимых нулей - ячеек исходных данных, которые еще не перезаписывались"""
+        return [position for position, value in self.tape.items() if value == 0]
+
+    def snapshot(self):
+        """Копия содержимого и границ ленты (без позиции головки)"""
+        return dict(self.tape), self.min_position, self.max_position
+
+    def restore(self, snapshot):
+        cells, self.min_position, self.max_position = snapshot
+        self.tape = dict(cells)
 
     def write(self, value):
         if value == 1:
@@ -48,3 +78,247 @@ class Tape:
             symbols.append('1' if symbol == 1 else '0')
 
         return ''.join(symbols)
+
+
+class BitTape:
+    """Лента машины Поста, упакованная по биту на ячейку.
+
+    Ячейки хранятся в растущем в обе стороны bytearray (старший бит байта -
+    левая ячейка), offset - номер бита, соответствующего позиции 0. Поведение
+    совпадает с Tape, включая границы min_position/max_position и то, что
+    ячейки исходных данных считаются записанными, пока их не перезапишут
+    (отдельный битсет fresh, только на длину исходных данных).
+    """
+
+    def __init__(self, initial_data=''):
+        self.position = 0
+        self.min_position = 0
+        self.max_position = 0
+
+        size = len(initial_data)
+        if size:
+            self.max_position = size - 1
+        if not set(initial_data) <= {'0', '1'}:
+            initial_data = ''.join('1' if item == '1' else '0' for item in initial_data)
+        value = int(initial_data, 2) if initial_data else 0
+        pad = -size % 8
+        nbytes = (size + pad) // 8
+        self.bits = bytearray((value << pad).to_bytes(nbytes, 'big'))
+        self.offset = 0
+        self.ones = bin(value).count('1')
+        # Нули из исходных данных, которые еще не перезаписывались
+        mask = (1 << size) - 1
+        self.fresh = bytearray(((value ^ mask) << pad).to_bytes(nbytes, 'big'))
+        self.fresh_count = size - self.ones
+
+    def _grow(self, index):
+        # Расширяет битсет так, чтобы в нем был бит index; возвращает новый index
+        size = len(self.bits)
+        if index < 0:
+            extra = max(size, (7 - index) >> 3, 16)
+            self.bits[0:0] = bytes(extra)
+            self.offset += extra * 8
+            return index + extra * 8
+        extra = max(size, (index >> 3) + 1 - size, 16)
+        self.bits.extend(bytes(extra))
+        return index
+
+    def _bounds(self, position):
+        if position > self.max_position:
+            self.max_position = position
+        elif position < self.min_position:
+            self.min_position = position
+
+    def read(self):
+        self._bounds(self.position)
+        return self.read_at(self.position)
+
+    def read_at(self, position):
+        """Значение произвольной ячейки без движения головки и без расширения границ"""
+        index = position + self.offset
+        if 0 <= index < len(self.bits) * 8:
+            return (self.bits[index >> 3] >> (7 - (index & 7))) & 1
+        return 0
+
+    def write(self, value):
+        position = self.position
+        if value == 1 or value == 0:
+            if self.fresh_count and 0 <= position < len(self.fresh) * 8:
+                mask = 0x80 >> (position & 7)
+                if self.fresh[position >> 3] & mask:
+                    self.fresh[position >> 3] &= ~mask
+                    self.fresh_count -= 1
+
+            index = position + self.offset
+            if value == 1:
+                if index < 0 or index >= len(self.bits) * 8:
+                    index = self._grow(index)
+                mask = 0x80 >> (index & 7)
+                if not self.bits[index >> 3] & mask:
+                    self.bits[index >> 3] |= mask
+                    self.ones += 1
+            elif 0 <= index < len(self.bits) * 8:
+                mask = 0x80 >> (index & 7)
+                if self.bits[index >> 3] & mask:
+                    self.bits[index >> 3] &= ~mask
+                    self.ones -= 1
+        self._bounds(position)
+
+    def move_left(self):
+        self.position -= 1
+        self._bounds(self.position)
+
+    def move_right(self):
+        self.position += 1
+        self._bounds(self.position)
+
+    def cells(self):
+        """Копия содержимого ленты: позиции единиц -> 1"""
+        result = {}
+        for index, byte in enumerate(self.bits):
+            if byte:
+                base = index * 8 - self.offset
+                for bit in range(8):
+                    if byte & (0x80 >> bit):
+                        result[base + bit] = 1
+        return result
+
+    def snapshot(self):
+        """Копия содержимого и границ ленты (без позиции головки)"""
+        return (bytes(self.bits), self.offset, self.ones, bytes(self.fresh),
+                self.fresh_count, self.min_position, self.max_position)
+
+    def restore(self, snapshot):
+        bits, self.offset, self.ones, fresh, self.fresh_count, \
+            self.min_position, self.max_position = snapshot
+        self.bits = bytearray(bits)
+        self.fresh = bytearray(fresh)
+
+    def export(self, start, stop):
+        """Ячейки [start, stop) строкой из '0' и '1'"""
+        if start >= stop:
+            return ''
+        first = max(start + self.offset, 0)
+        last = min(stop + self.offset, len(self.bits) * 8)
+        if first >= last:
+            return '0' * (stop - start)
+        chunk = self.bits[first >> 3:(last + 7) >> 3]
+        # Перевод байтов в биты целиком на стороне C: int.from_bytes + format
+        text = format(int.from_bytes(chunk, 'big'), f'0{len(chunk) * 8}b')
+        skip = first & 7
+        return ('0' * (first - self.offset - start) + text[skip:skip + last - first]
+                + '0' * (stop + self.offset - last))
+
+    def is_empty(self):
+        """Нет ни одной хранимой ячейки - get_full_tape() вернет '0'"""
+        return not self.ones and not self.fresh_count
+
+    def stored_zeros(self):
+        """Позиции хранимых нулей - ячеек исходных данных, которые еще не перезаписывались"""
+        if not self.fresh_count:
+            return []
+        return [index * 8 + bit for index, byte in enumerate(self.fresh) if byte
+                for bit in range(8) if byte & (0x80 >> bit)]
+
+    def get_full_tape(self):
+        if self.is_empty():
+            return '0'
+        return self.export(self.min_position, self.max_position + 1)
+
+
+class MappedTape:
+    """Лента машины Поста в файле, отображенном в память (см. engine/mmap_tape.py).
+
+    Ячейка - байт: 0 - ноль, 1 - единица, 2 - хранимый ноль исходных данных
+    (см. stored_zeros). Поведение совпадает с Tape, включая границы
+    min_position/max_position; max_cells ограничивает размер файла.
+    """
+
+    def __init__(self, initial_data='', path=None, max_cells=None):
+        self.position = 0
+        self.min_position = 0
+        self.max_position = max(len(initial_data) - 1, 0)
+        self.store = MappedCells(path, max_cells=max_cells)
+        codes = bytes(1 if item == '1' else 2 for item in initial_data)
+        self.store.load(0, codes)
+        self.ones = codes.count(1)
+        self.fresh_count = len(codes) - self.ones
+
+    def _bounds(self, position):
+        if position > self.max_position:
+            self.max_position = position
+        elif position < self.min_position:
+            self.min_position = position
+
+    def read(self):
+        self._bounds(self.position)
+        return 1 if self.store.get(self.position) == 1 else 0
+
+    def read_at(self, position):
+        """Значение произвольной ячейки без движения головки и без расширения границ"""
+        return 1 if self.store.get(position) == 1 else 0
+
+    def write(self, value):
+        if value == 1 or value == 0:
+            old = self.store.get(self.position)
+            if old != value:
+                self.store.set(self.position, value)
+                self.ones += (value == 1) - (old == 1)
+                self.fresh_count -= old == 2
+        self._bounds(self.position)
+
+    def move_left(self):
+        self.position -= 1
+        self._bounds(self.position)
+
+    def move_right(self):
+        self.position += 1
+        self._bounds(self.position)
+
+    def _stored(self, code):
+        bounds = self.store.bounds()
+        if bounds is None:
+            return []
+        return [position for position, value in self.store.nonzero(bounds[0], bounds[1] + 1)
+                if value == code]
+
+    def cells(self):
+        """Копия содержимого ленты: позиции единиц -> 1"""
+        return dict.fromkeys(self._stored(1), 1)
+
+    def is_empty(self):
+        """Нет ни одной хранимой ячейки - get_full_tape() вернет '0'"""
+        return not self.ones and not self.fresh_count
+
+    def stored_zeros(self):
+        """Позиции хранимых нулей - ячеек исходных данных, которые еще не перезаписывались"""
+        return self._stored(2) if self.fresh_count else []
+
+    def reserve(self, start, stop):
+        """Готовит место под позиции [start, stop] (MemoryError сверх max_cells)"""
+        self.store.reserve(start, stop)
+
+    def snapshot(self):
+        """Копия содержимого и границ ленты (без позиции головки)"""
+        return (self.store.snapshot(), self.ones, self.fresh_count,
+                self.min_position, self.max_position)
+
+    def restore(self, snapshot):
+        cells, self.ones, self.fresh_count, self.min_position, self.max_position = snapshot
+        self.store.restore(cells)
+
+    def get_full_tape(self):
+        if self.is_empty():
+            return '0'
+        codes = self.store.export(self.min_position, self.max_position + 1)
+        return codes.translate(_DIGITS).decode('ascii')
+
+    def close(self):
+        """Закрывает файл ленты"""
+        self.store.close()
+
+
+# Коды ячеек MappedTape -> символы get_full_tape
+_DIGITS = bytes.maketrans(b'\x00\x01\x02', b'010')
+
+TAPE_MODES = {'dict': Tape, 'bits': BitTape, 'mmap': MappedTape}
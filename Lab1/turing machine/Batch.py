@@ -0,0 +1,55 @@
+"""Пакетный прогон одной программы на множестве лент в нескольких процессах.
+
+Пример:
+    for result in run_batch(program_lines, ["101", "0110"], max_steps=10000):
+        print(result['index'], result['tape'], result['steps'], result['halted'])
+"""
+import os
+import sys
+import time
+
+from Turing_Machine import TuringMachine
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from engine import batch
+
+# Сколько переходов выполняется между проверками таймаута
+SLICE_STEPS = 100000
+
+
+def run_tape(commands, index, tape_str, max_steps, timeout):
+    """Выполняет программу на одной ленте: не больше max_steps переходов и timeout секунд"""
+    tm = TuringMachine(log_level='off')
+    tm.commands = commands
+    tm.load_tape(tape_str)
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    timed_out = False
+    while not tm.halted and tm.step_count < max_steps:
+        if deadline is not None and time.monotonic() >= deadline:
+            timed_out = True
+            break
+        tm.execute(min(SLICE_STEPS, max_steps - tm.step_count))
+
+    if not tm.halted and not timed_out:
+        # Лимит исчерпан: проверяем, есть ли вообще следующий переход
+        tm.halted = tm.commands.find_command(tm.current_state, tm.tape.read()) is None
+
+    return {
+        'index': index,
+        'tape': tm.tape.get_full_tape(),
+        'steps': tm.step_count,
+        'halted': tm.halted,
+        'timeout': timed_out
+    }
+
+
+def run_batch(program_lines, tapes, max_steps=1000, timeout=None, chunksize=16, workers=None):
+    """Прогоняет программу на каждой ленте из tapes в пуле процессов.
+
+    Программа разбирается один раз. Результаты - словари с ключами index,
+    tape, steps, halted и timeout - выдаются по мере готовности, не по порядку.
+    """
+    tm = TuringMachine()
+    tm.load_program(program_lines)
+    return batch.run_batch(run_tape, tm.commands, tapes, max_steps, timeout, chunksize, workers)
@@ -0,0 +1,454 @@
+"""Замеры производительности машины Тьюринга.
+
+Запуск:
+    python Benchmark.py [--output results.json] [--baseline old.json]
+        набор нагрузок (см. WORKLOADS): шагов/сек, пик памяти, время журнала
+    python Benchmark.py micro
+        микрозамеры отдельных оптимизаций
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+from Command import CommandSet
+from ExecutionLog import LOG_LEVELS
+from Tape import TAPE_MODES
+from Turing_Machine import TuringMachine
+from Multi_Tape_Machine import MultiTapeMachine
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from engine import benchmark
+
+
+class LinearCommandSet(CommandSet):
+    """Набор команд с линейным поиском (поведение до появления индекса)"""
+
+    def find_command(self, state, symbol):
+        for cmd in self.commands:
+            if cmd.matches(state, symbol):
+                return cmd
+        return None
+
+
+def make_cycle_program(states, symbols=4):
+    """Программа из states состояний, которая бесконечно идет вправо по пустой ленте.
+
+    Для каждого состояния дополнительно объявляются переходы по symbols
+    "лишним" символам, чтобы размер таблицы рос как states * (symbols + 1).
+    Переход по '_' объявляется последним - худший случай для линейного поиска.
+    """
+    program = []
+    for state in range(states):
+        for symbol in range(symbols):
+            program.append(f"{state} s{symbol} {state} s{symbol} R")
+    for state in range(states):
+        program.append(f"{state} _ {(state + 1) % states} _ R")
+    return program
+
+
+def measure_steps_per_second(program, command_set_class, steps):
+    tm = TuringMachine()
+    tm.commands = command_set_class()
+    tm.load_program(program)
+
+    start = time.perf_counter()
+    tm.run(max_steps=steps)
+    elapsed = time.perf_counter() - start
+    return tm.step_count / elapsed
+
+
+def bench_lookup(sizes=(1, 10, 100, 1000), steps=2000):
+    """Шагов в секунду в зависимости от размера программы"""
+    results = []
+    for states in sizes:
+        program = make_cycle_program(states)
+        results.append({
+            'states': states,
+            'transitions': len(program),
+            'indexed': measure_steps_per_second(program, CommandSet, steps),
+            'linear': measure_steps_per_second(program, LinearCommandSet, steps),
+        })
+    return results
+
+
+def print_lookup(results):
+    print("Поиск перехода: шагов/сек в зависимости от размера программы")
+    print(f"{'состояний':>10} {'переходов':>10} {'индекс':>12} {'перебор':>12}")
+    for row in results:
+        print(f"{row['states']:>10} {row['transitions']:>10} "
+              f"{row['indexed']:>12.0f} {row['linear']:>12.0f}")
+
+
+def fill_tape(tape_class, cells):
+    tape = tape_class()
+    for _ in range(cells // 2):
+        tape.write('1')
+        tape.move('R')
+    tape.position = -1
+    for _ in range(cells // 2):
+        tape.write('0')
+        tape.move('L')
+    tape.get_full_tape()
+    return tape
+
+
+def bench_tape(cells=200000):
+    """Время и память на запись cells ячеек по обе стороны от начала ленты"""
+    results = []
+    for mode, tape_class in TAPE_MODES.items():
+        start = time.perf_counter()
+        fill_tape(tape_class, cells)
+        elapsed = time.perf_counter() - start
+
+        # Память меряем отдельным прогоном: tracemalloc сильно замедляет код
+        tracemalloc.start()
+        tape = fill_tape(tape_class, cells)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del tape
+        results.append({'mode': mode, 'seconds': elapsed, 'bytes': memory})
+    return results
+
+
+def print_tape(results):
+    print("Лента: запись ячеек в обе стороны и полная выгрузка")
+    print(f"{'режим':>10} {'секунд':>10} {'байт':>12}")
+    for row in results:
+        print(f"{row['mode']:>10} {row['seconds']:>10.3f} {row['bytes']:>12}")
+
+
+def bench_log_levels(steps=100000):
+    """Время прогона с разными уровнями журнала на растущей ленте"""
+    results = []
+    for level in LOG_LEVELS:
+        tm = TuringMachine(log_level=level)
+        tm.load_program(["0 _ 0 1 R"])
+        start = time.perf_counter()
+        tm.run(max_steps=steps)
+        elapsed = time.perf_counter() - start
+        results.append({'level': level, 'seconds': elapsed, 'entries': len(tm.log)})
+    return results
+
+
+def print_log_levels(results):
+    print("Журнал: прогон с разными уровнями")
+    print(f"{'уровень':>10} {'секунд':>10} {'записей':>10}")
+    for row in results:
+        print(f"{row['level']:>10} {row['seconds']:>10.3f} {row['entries']:>10}")
+
+
+# Программы из TuringMashine_test.py на длинных лентах
+TEST_PROGRAMS = {
+    'inversion': ("10" * 5000, [
+        "0 1 0 0 R",
+        "0 0 0 1 R",
+        "0 _ 1 _ L",
+        "1 0 1 0 L",
+        "1 1 1 1 L",
+        "1 _ 2 _ R"
+    ]),
+    'movement': ("1" * 10000, ["0 1 0 1 R", "0 _ 1 _ L"]),
+    'erase': ("1" * 10000, ["0 1 0 0 R", "0 _ 1 _ L"]),
+    'loop': ("1", ["0 1 0 1 S"]),
+}
+
+
+def bench_run_fast(max_steps=100000):
+    """Сравнение run() и run_fast() на программах из тестов"""
+    results = []
+    for name, (tape_str, program) in TEST_PROGRAMS.items():
+        row = {'program': name}
+        for method in ('run', 'run_fast'):
+            tm = TuringMachine()
+            tm.load_tape(tape_str)
+            tm.load_program(program)
+            start = time.perf_counter()
+            getattr(tm, method)(max_steps)
+            row[method] = time.perf_counter() - start
+            row['steps'] = tm.step_count
+        results.append(row)
+    return results
+
+
+def print_run_fast(results):
+    print("run() против run_fast(), секунд")
+    print(f"{'программа':>10} {'шагов':>8} {'run':>10} {'run_fast':>10} {'ускорение':>10}")
+    for row in results:
+        print(f"{row['program']:>10} {row['steps']:>8} {row['run']:>10.4f} "
+              f"{row['run_fast']:>10.4f} {row['run'] / row['run_fast']:>10.1f}")
+
+
+UNARY_ADDITION = [
+    "0 1 0 1 R",
+    "0 + 0 1 R",
+    "0 _ 1 _ L",
+    "1 1 2 _ L",
+    "2 1 2 1 L",
+    "2 _ 3 _ R"
+]
+
+BINARY_INCREMENT = [
+    "0 0 0 0 R",
+    "0 1 0 1 R",
+    "0 _ 1 _ L",
+    "1 1 1 0 L",
+    "1 0 2 1 L",
+    "1 _ 2 1 L",
+    "2 0 2 0 L",
+    "2 1 2 1 L",
+    "2 _ 3 _ R"
+]
+
+SWEEP_PROGRAMS = {
+    'unary_add': ("1" * 50000 + "+" + "1" * 50000, UNARY_ADDITION),
+    'binary_inc': ("1" + "0" * 100000, BINARY_INCREMENT),
+}
+
+
+def bench_sweeps(max_steps=10 ** 7):
+    """run_fast() против run_sweeps() на программах с длинными пробегами"""
+    results = []
+    for name, (tape_str, program) in SWEEP_PROGRAMS.items():
+        row = {'program': name}
+        for method, tape_mode in (('run_fast', 'array'), ('run_sweeps', 'rle')):
+            tm = TuringMachine(tape_mode=tape_mode)
+            tm.load_tape(tape_str)
+            tm.load_program(program)
+            start = time.perf_counter()
+            getattr(tm, method)(max_steps)
+            row[method] = time.perf_counter() - start
+            row['steps'] = tm.step_count
+        results.append(row)
+    return results
+
+
+def print_sweeps(results):
+    print("run_fast() против run_sweeps(), секунд")
+    print(f"{'программа':>10} {'шагов':>8} {'run_fast':>10} {'run_sweeps':>10} {'ускорение':>10}")
+    for row in results:
+        print(f"{row['program']:>10} {row['steps']:>8} {row['run_fast']:>10.4f} "
+              f"{row['run_sweeps']:>10.4f} {row['run_fast'] / row['run_sweeps']:>10.1f}")
+
+
+# Чемпионы "усердного бобра" с 2-5 состояниями: '_' - это 0, 'H' - остановка
+BUSY_BEAVERS = {
+    2: ["0 _ 1 1 R", "0 1 1 1 L",
+        "1 _ 0 1 L", "1 1 H 1 R"],
+    3: ["0 _ 1 1 R", "0 1 H 1 R",
+        "1 _ 1 1 L", "1 1 2 _ R",
+        "2 _ 2 1 L", "2 1 0 1 L"],
+    4: ["0 _ 1 1 R", "0 1 1 1 L",
+        "1 _ 0 1 L", "1 1 2 _ L",
+        "2 _ H 1 R", "2 1 3 1 L",
+        "3 _ 3 1 R", "3 1 0 _ R"],
+    5: ["0 _ 1 1 R", "0 1 2 1 L",
+        "1 _ 2 1 R", "1 1 1 1 R",
+        "2 _ 3 1 R", "2 1 4 _ L",
+        "3 _ 0 1 L", "3 1 3 1 L",
+        "4 _ H 1 R", "4 1 0 _ L"],
+}
+
+# Унарное умножение: "11*111=" -> "xx*111=111111"
+UNARY_MULTIPLICATION = [
+    "0 1 1 x R",    # помечаем очередную единицу первого множителя
+    "1 1 1 1 R",
+    "1 * 2 * R",
+    "2 y 2 y R",
+    "2 1 3 y R",    # помечаем единицу второго множителя
+    "2 = 5 = L",    # второй множитель пройден - снимаем пометки
+    "3 1 3 1 R",
+    "3 = 3 = R",
+    "3 _ 4 1 L",    # дописываем единицу к результату
+    "4 1 4 1 L",
+    "4 = 4 = L",
+    "4 y 2 y R",
+    "5 y 5 1 L",
+    "5 * 6 * L",
+    "6 1 6 1 L",
+    "6 x 0 x R"
+]
+
+# Проверка двоичного палиндрома: останавливается в состоянии Y или N
+PALINDROME = [
+    "0 0 1 _ R", "0 1 2 _ R", "0 _ Y _ S",   # стираем первый символ и запоминаем его
+    "1 0 1 0 R", "1 1 1 1 R", "1 _ 3 _ L",
+    "2 0 2 0 R", "2 1 2 1 R", "2 _ 4 _ L",
+    "3 0 5 _ L", "3 1 N 1 S", "3 _ Y _ S",   # последний символ должен совпасть
+    "4 1 5 _ L", "4 0 N 0 S", "4 _ Y _ S",
+    "5 0 5 0 L", "5 1 5 1 L", "5 _ 0 _ R"
+]
+
+
+def bench_macro(max_steps=2 * 10 ** 6, block_size=3):
+    """run_fast() против run_macro() на усердных бобрах и программах с пробегами"""
+    programs = {'bb4': ("", BUSY_BEAVERS[4]), 'bb5': ("", BUSY_BEAVERS[5])}
+    programs.update(SWEEP_PROGRAMS)
+    results = []
+    for name, (tape_str, program) in programs.items():
+        row = {'program': name}
+        for method in ('run_fast', 'run_macro'):
+            tm = TuringMachine(log_level='off')
+            tm.load_tape(tape_str)
+            tm.load_program(program)
+            start = time.perf_counter()
+            if method == 'run_macro':
+                tm.run_macro(max_steps, block_size)
+            else:
+                tm.run_fast(max_steps)
+            row[method] = time.perf_counter() - start
+            row['steps'] = tm.step_count
+        results.append(row)
+    return results
+
+
+def print_macro(results):
+    print("run_fast() против run_macro(), секунд")
+    print(f"{'программа':>10} {'шагов':>8} {'run_fast':>10} {'run_macro':>10} {'ускорение':>10}")
+    for row in results:
+        print(f"{row['program']:>10} {row['steps']:>8} {row['run_fast']:>10.4f} "
+              f"{row['run_macro']:>10.4f} {row['run_fast'] / row['run_macro']:>10.1f}")
+
+
+def bench_compiled(max_steps=10 ** 6):
+    """run(), run_fast() и run_compiled() на усердных бобрах, пробегах и тысяче состояний"""
+    programs = {'bb4': ("", BUSY_BEAVERS[4]), 'bb5': ("", BUSY_BEAVERS[5])}
+    programs.update(SWEEP_PROGRAMS)
+    programs['cycle_1000'] = ("", make_cycle_program(1000))
+    results = []
+    for name, (tape_str, program) in programs.items():
+        row = {'program': name}
+        for method in ('run', 'run_fast', 'run_compiled'):
+            tm = TuringMachine(log_level='off')
+            tm.load_tape(tape_str)
+            tm.load_program(program)
+            start = time.perf_counter()
+            getattr(tm, method)(max_steps)
+            row[method] = time.perf_counter() - start
+            row['steps'] = tm.step_count
+        results.append(row)
+    return results
+
+
+def print_compiled(results):
+    print("run() и run_fast() против run_compiled(), секунд")
+    print(f"{'программа':>10} {'шагов':>8} {'run':>10} {'run_fast':>10} "
+          f"{'compiled':>10} {'ускорение':>10}")
+    for row in results:
+        print(f"{row['program']:>10} {row['steps']:>8} {row['run']:>10.4f} "
+              f"{row['run_fast']:>10.4f} {row['run_compiled']:>10.4f} "
+              f"{row['run_fast'] / row['run_compiled']:>10.1f}")
+
+
+# Унарное копирование на одной ленте: "111" -> "111_111"
+UNARY_COPY = [
+    "0 1 1 x R",    # помечаем очередную единицу
+    "0 _ H _ S",
+    "1 1 1 1 R",
+    "1 _ 2 _ R",
+    "2 1 2 1 R",
+    "2 _ 3 1 L",    # дописываем единицу к копии
+    "3 1 3 1 L",
+    "3 _ 4 _ L",
+    "4 1 4 1 L",
+    "4 x 0 1 R"     # снимаем пометку
+]
+
+# Те же задачи на двух лентах: вторая лента - рабочая
+UNARY_COPY_2 = [
+    "0 1,_ 0 1,1 R,R",
+    "0 _,_ H _,_ S,S"
+]
+
+PALINDROME_2 = (
+    # копируем вход на вторую ленту
+    [f"0 {a},_ 0 {a},{a} R,R" for a in "01"] + ["0 _,_ 1 _,_ L,L"]
+    # возвращаем первую головку к началу входа
+    + [f"1 {a},{b} 1 {a},{b} L,S" for a in "01" for b in "01_"]
+    + [f"1 _,{b} 2 _,{b} R,S" for b in "01_"]
+    # сравниваем вход слева направо с копией справа налево
+    + [f"2 {a},{a} 2 {a},{a} R,L" for a in "01"]
+    + ["2 0,1 N 0,1 S,S", "2 1,0 N 1,0 S,S", "2 _,_ Y _,_ S,S"]
+)
+
+MULTI_TAPE_TASKS = {
+    'copy': ("1" * 200, UNARY_COPY, UNARY_COPY_2),
+    'palindrome': ("0110" * 50 + "0110"[::-1] * 50, PALINDROME, PALINDROME_2),
+}
+
+
+def bench_multi_tape(max_steps=10 ** 7):
+    """Одна лента против двух: число шагов и время на одних и тех же задачах"""
+    results = []
+    for name, (tape_str, single, multi) in MULTI_TAPE_TASKS.items():
+        row = {'task': name, 'length': len(tape_str)}
+        for key, machine in (('single', TuringMachine(log_level='off')),
+                             ('multi', MultiTapeMachine(2))):
+            if key == 'single':
+                machine.load_tape(tape_str)
+            else:
+                machine.load_tapes(tape_str)
+            machine.load_program(single if key == 'single' else multi)
+            start = time.perf_counter()
+            machine.run(max_steps)
+            row[key + '_seconds'] = time.perf_counter() - start
+            row[key + '_steps'] = machine.step_count
+        results.append(row)
+    return results
+
+
+def print_multi_tape(results):
+    print("Одна лента против двух")
+    print(f"{'задача':>10} {'длина':>6} {'шагов (1)':>10} {'шагов (2)':>10} "
+          f"{'секунд (1)':>10} {'секунд (2)':>10}")
+    for row in results:
+        print(f"{row['task']:>10} {row['length']:>6} {row['single_steps']:>10} "
+              f"{row['multi_steps']:>10} {row['single_seconds']:>10.4f} "
+              f"{row['multi_seconds']:>10.4f}")
+
+
+def workload(tape_str, program, max_steps):
+    def factory(log_level):
+        tm = TuringMachine(log_level=log_level)
+        tm.load_tape(tape_str)
+        tm.load_program(program)
+        return tm
+    return factory, max_steps
+
+
+WORKLOADS = {
+    'bb2': workload("", BUSY_BEAVERS[2], 1000),
+    'bb3': workload("", BUSY_BEAVERS[3], 1000),
+    'bb4': workload("", BUSY_BEAVERS[4], 1000),
+    # 47 176 870 шагов до остановки - замеряем только начало
+    'bb5': workload("", BUSY_BEAVERS[5], 200000),
+    'binary_inc': workload("1" * 50000, BINARY_INCREMENT, 10 ** 6),
+    'unary_add': workload("1" * 25000 + "+" + "1" * 25000, UNARY_ADDITION, 10 ** 6),
+    'unary_mul': workload("1" * 30 + "*" + "1" * 30 + "=", UNARY_MULTIPLICATION, 10 ** 6),
+    'palindrome': workload("0110" * 50 + "0110"[::-1] * 50, PALINDROME, 10 ** 6),
+}
+
+
+def print_micro():
+    print_lookup(bench_lookup())
+    print()
+    print_tape(bench_tape())
+    print()
+    print_log_levels(bench_log_levels())
+    print()
+    print_run_fast(bench_run_fast())
+    print()
+    print_sweeps(bench_sweeps())
+    print()
+    print_macro(bench_macro())
+    print()
+    print_compiled(bench_compiled())
+    print()
+    print_multi_tape(bench_multi_tape())
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ['micro']:
+        print_micro()
+    else:
+        sys.exit(benchmark.main('turing', WORKLOADS))
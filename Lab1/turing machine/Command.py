@@ -1,3 +1,10 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from engine import vm
+
+
 class Command:
     def __init__(self, state, symbol, new_state, new_symbol, direction):
         self.state = state
@@ -5,30 +12,167 @@ class Command:
         self.new_state = new_state
         self.new_symbol = new_symbol
         self.direction = direction
+        # Переход-"пробег": головка идет в одну сторону, не меняя ни символ, ни состояние
+        self.sweep = state == new_state and symbol == new_symbol and direction in ('L', 'R')
 
     def matches(self, state, symbol):
         return self.state == state and self.symbol == symbol
 
+    def same_action(self, other):
+        """Проверяет, что две команды выполняют одно и то же действие"""
+        return (self.new_state == other.new_state
+                and self.new_symbol == other.new_symbol
+                and self.direction == other.direction)
+
+
+class CompiledProgram(vm.Program):
+    """Программа, скомпилированная в таблицу общей виртуальной машины (engine/vm.py).
+
+    Строки таблицы - состояния, символы пронумерованы, пустой символ '_' имеет
+    код 0. Для пары (состояние, символ) без перехода в таблице стоит vm.HALT.
+    """
+
+    def __init__(self, commands, states=(), symbols=()):
+        state_codes = {}
+        self.symbols = ['_']
+        self.symbol_codes = {'_': 0}
+
+        for cmd in commands:
+            state_codes.setdefault(cmd.state, len(state_codes))
+            state_codes.setdefault(cmd.new_state, len(state_codes))
+            self._intern_symbol(cmd.symbol)
+            self._intern_symbol(cmd.new_symbol)
+        for state in states:
+            state_codes.setdefault(state, len(state_codes))
+        for symbol in symbols:
+            self._intern_symbol(symbol)
+
+        super().__init__(len(self.symbols))
+        for state in state_codes:
+            self.add_row(state)
+        self.states = self.labels
+        self.state_codes = self.label_codes
+
+        for cmd in commands:
+            self.set(self.state_codes[cmd.state], self.symbol_codes[cmd.symbol],
+                     self.symbol_codes[cmd.new_symbol],
+                     -1 if cmd.direction == 'L' else 1 if cmd.direction == 'R' else 0,
+                     self.state_codes[cmd.new_state])
+
+    def _intern_symbol(self, symbol):
+        if symbol not in self.symbol_codes:
+            self.symbol_codes[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+
+    def covers(self, states, symbols):
+        return (all(state in self.state_codes for state in states)
+                and all(symbol in self.symbol_codes for symbol in symbols))
+
 
 class CommandSet:
     def __init__(self):
         self.commands = []
+        # Индекс переходов: (состояние, символ) -> команда
+        self.index = {}
+        # Повторно объявленные (полностью совпадающие) переходы
+        self.duplicates = []
+        # Последняя скомпилированная версия программы (см. compile)
+        self.compiled = None
 
     def add_command(self, state, symbol, new_state, new_symbol, direction):
-        self.commands.append(Command(state, symbol, new_state, new_symbol, direction))
+        cmd = Command(state, symbol, new_state, new_symbol, direction)
+        key = (state, symbol)
+        existing = self.index.get(key)
+        if existing is not None:
+            if not existing.same_action(cmd):
+                raise ValueError(
+                    f"Конфликтующие переходы для состояния '{state}' и символа '{symbol}'"
+                )
+            # Дубликат ничего не меняет - запоминаем его и пропускаем
+            self.duplicates.append(cmd)
+            return
+        self.commands.append(cmd)
+        self.index[key] = cmd
+        self.compiled = None
 
     def find_command(self, state, symbol):
-        for cmd in self.commands:
-            if cmd.matches(state, symbol):
-                return cmd
+        return self.index.get((state, symbol))
+
+    def compile(self, states=(), symbols=()):
+        """Возвращает CompiledProgram, знающую также о дополнительных состояниях и символах"""
+        program = self.compiled
+        if program is None or not program.covers(states, symbols):
+            if program is not None:
+                states = list(program.states) + list(states)
+                symbols = list(program.symbols) + list(symbols)
+            program = CompiledProgram(self.commands, states, symbols)
+            self.compiled = program
+        return program
+
+    @staticmethod
+    def parse_line(line):
+        """Разбирает строку программы; None для пустых строк, комментариев и мусора"""
+        line = line.strip()
+        if line and not line.startswith('#'):
+            parts = line.split()
+            if len(parts) == 5:
+                return tuple(parts)
         return None
 
     def load_from_file(self, filename):
         with open(filename, 'r', encoding='utf-8') as f:
             for line in f:
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    parts = line.split()
-                    if len(parts) == 5:
-                        state, symbol, new_state, new_symbol, direction = parts
-                        self.add_command(state, symbol, new_state, new_symbol, direction)
\ No newline at end of file
+                parts = self.parse_line(line)
+                if parts is not None:
+                    self.add_command(*parts)
+
+
+class MultiTapeCommandSet(CommandSet):
+    """Набор команд k-ленточной машины (см. MultiTapeMachine).
+
+    Символы, записываемые символы и направления - кортежи по одному элементу
+    на ленту. В файле программы элементы кортежа пишутся через запятую:
+    "0 1,_ 0 1,1 R,R". Строки с другим числом элементов пропускаются.
+    """
+
+    def __init__(self, tapes):
+        super().__init__()
+        self.tapes = tapes
+
+    def parse_line(self, line):
+        parts = CommandSet.parse_line(line)
+        if parts is None:
+            return None
+        state, symbols, new_state, new_symbols, directions = parts
+        fields = [tuple(field.split(',')) for field in (symbols, new_symbols, directions)]
+        if any(len(field) != self.tapes for field in fields):
+            return None
+        return state, fields[0], new_state, fields[1], fields[2]
+
+
+class NondeterministicCommandSet(CommandSet):
+    """Набор команд, в котором у пары (состояние, символ) может быть несколько переходов.
+
+    find_command по-прежнему возвращает первый объявленный переход, все
+    варианты возвращает find_commands (см. NondeterministicExplorer).
+    """
+
+    def __init__(self):
+        super().__init__()
+        # Все переходы: (состояние, символ) -> список команд в порядке объявления
+        self.choices = {}
+
+    def add_command(self, state, symbol, new_state, new_symbol, direction):
+        cmd = Command(state, symbol, new_state, new_symbol, direction)
+        key = (state, symbol)
+        choices = self.choices.setdefault(key, [])
+        if any(existing.same_action(cmd) for existing in choices):
+            self.duplicates.append(cmd)
+            return
+        choices.append(cmd)
+        self.commands.append(cmd)
+        self.index.setdefault(key, cmd)
+        self.compiled = None
+
+    def find_commands(self, state, symbol):
+        return self.choices.get((state, symbol), [])
@@ -0,0 +1,173 @@
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+from Tape import Tape
+
+# Уровни журнала:
+#   'off'     - ничего не записывается
+#   'summary' - хранится только последняя запись и число записанных шагов
+#   'ring'    - кольцевой буфер последних size записей
+#   'full'    - все шаги в виде компактных дельт
+LOG_LEVELS = ('off', 'summary', 'ring', 'full')
+
+SHIFTS = {'L': -1, 'R': 1}
+
+
+class ExecutionLog:
+    """Журнал выполнения машины Тьюринга.
+
+    Каждый шаг хранится как дельта: номер шага, выполненная команда (она задает
+    состояние, старый и новый символ и направление) и позиция записанной ячейки.
+    Снимки ленты не хранятся - они восстанавливаются при чтении журнала откатом
+    дельт от текущего содержимого ленты, поэтому запись шага стоит O(1).
+    Для чтения журнал ведет себя как список словарей прежнего формата.
+    """
+
+    def __init__(self, level='full', size=1000):
+        if level not in LOG_LEVELS:
+            raise ValueError(f"Неизвестный уровень журнала: {level}")
+        if level == 'ring' and size <= 0:
+            raise ValueError("Размер кольцевого буфера должен быть положительным")
+        self.level = level
+        self.size = size
+        self.record = getattr(self, f"_record_{level}")
+        self.clear()
+
+    def clear(self):
+        self.total = 0         # сколько шагов было записано
+        self.tape = None       # лента, на которой записаны дельты
+        self.frozen = []       # записи, уже развернутые в словари (см. _rebase)
+        self.steps = array('q')
+        self.commands = []
+        self.positions = array('q')
+        self.ring = deque(maxlen=self.size if self.level == 'ring' else None)
+        self.last = None
+
+    # --- запись ---
+
+    def _rebase(self, tape):
+        """Машине подменили ленту: старые дельты разворачиваем, пока лента доступна"""
+        if self.tape is not None:
+            self.frozen.extend(self._entries(0, self._stored_count()))
+            self.steps = array('q')
+            self.commands = []
+            self.positions = array('q')
+            self.ring.clear()
+            self.last = None
+        self.tape = tape
+
+    def freeze(self):
+        """Разворачивает хранимые дельты: ленту сейчас изменят без записи в журнал"""
+        if self.tape is not None:
+            self._rebase(None)
+
+    def _record_off(self, step, command, position, tape):
+        pass
+
+    def _record_summary(self, step, command, position, tape):
+        # Предыдущая запись все равно вытесняется, разворачивать ее не нужно
+        if self.frozen:
+            self.frozen = []
+        self.tape = tape
+        self.last = (step, command, position)
+        self.total += 1
+
+    def _record_ring(self, step, command, position, tape):
+        if tape is not self.tape:
+            self._rebase(tape)
+        if self.frozen and len(self.frozen) + len(self.ring) >= self.size:
+            del self.frozen[0]
+        self.ring.append((step, command, position))
+        self.total += 1
+
+    def _record_full(self, step, command, position, tape):
+        if tape is not self.tape:
+            self._rebase(tape)
+        self.steps.append(step)
+        self.commands.append(command)
+        self.positions.append(position)
+        self.total += 1
+
+    def truncate(self, step):
+        """Удаляет записи о шагах с номером step и дальше (для перемотки назад)"""
+        self.frozen = [entry for entry in self.frozen if entry['step'] < step]
+        if self.level == 'full':
+            cut = bisect_left(self.steps, step)
+            self.total -= len(self.commands) - cut
+            del self.steps[cut:]
+            del self.commands[cut:]
+            del self.positions[cut:]
+        elif self.level == 'ring':
+            while self.ring and self.ring[-1][0] >= step:
+                self.ring.pop()
+                self.total -= 1
+        elif self.last is not None and self.last[0] >= step:
+            self.last = None
+
+    # --- чтение ---
+
+    def _stored_count(self):
+        if self.level == 'full':
+            return len(self.commands)
+        if self.level == 'ring':
+            return len(self.ring)
+        return 1 if self.last is not None else 0
+
+    def _record_at(self, index):
+        if self.level == 'full':
+            return self.steps[index], self.commands[index], self.positions[index]
+        if self.level == 'ring':
+            return self.ring[index]
+        return self.last
+
+    def _entries(self, start, stop):
+        """Разворачивает хранимые дельты [start, stop) в словари со снимками ленты"""
+        if start >= stop:
+            return []
+
+        # Откатываем дельты от последней к start на копии текущей ленты
+        scratch = Tape()
+        scratch.tape = self.tape.cells()
+        entries = []
+        for index in range(self._stored_count() - 1, start - 1, -1):
+            step, command, position = self._record_at(index)
+            if index < stop:
+                scratch.position = position + SHIFTS.get(command.direction, 0)
+                entries.append({
+                    'step': step,
+                    'state': command.state,
+                    'symbol': command.symbol,
+                    'new_state': command.new_state,
+                    'new_symbol': command.new_symbol,
+                    'direction': command.direction,
+                    'position': scratch.position,
+                    'tape_snapshot': scratch.get_visible_tape()
+                })
+            scratch.position = position
+            scratch.write(command.symbol)
+        entries.reverse()
+        return entries
+
+    def get_log(self):
+        """Возвращает журнал в виде списка словарей"""
+        return self.frozen + self._entries(0, self._stored_count())
+
+    def __len__(self):
+        return len(self.frozen) + self._stored_count()
+
+    def __iter__(self):
+        return iter(self.get_log())
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self.get_log()[item]
+        length = len(self)
+        if item < 0:
+            item += length
+        if not 0 <= item < length:
+            raise IndexError("Индекс записи журнала вне диапазона")
+        if item < len(self.frozen):
+            return self.frozen[item]
+        item -= len(self.frozen)
+        return self._entries(item, item + 1)[0]
@@ -0,0 +1,119 @@
+SHIFTS = {'L': -1, 'R': 1}
+
+
+def block_transition(index, state, block, entry, limit=None):
+    """Прогон машины внутри блока из k ячеек.
+
+    Головка входит в блок block (кортеж символов) в ячейку entry (0 - слева,
+    k - 1 - справа) в состоянии state. Возвращает (новый блок, состояние,
+    выход, шаги, позиция): выход 'L' или 'R' - головка покинула блок с этой
+    стороны; 'halt' - нет перехода (позиция - ячейка остановки); 'loop' -
+    машина зациклилась внутри блока; None - исчерпан limit шагов.
+    """
+    cells = list(block)
+    size = len(cells)
+    position = entry
+    steps = 0
+    seen = set()
+    while limit is None or steps < limit:
+        cmd = index.get((state, cells[position]))
+        if cmd is None:
+            return tuple(cells), state, 'halt', steps, position
+        if limit is None:
+            key = (state, position, tuple(cells))
+            if key in seen:
+                return tuple(cells), state, 'loop', steps, position
+            seen.add(key)
+        cells[position] = cmd.new_symbol
+        position += SHIFTS.get(cmd.direction, 0)
+        state = cmd.new_state
+        steps += 1
+        if position < 0:
+            return tuple(cells), state, 'L', steps, position
+        if position >= size:
+            return tuple(cells), state, 'R', steps, position
+    return tuple(cells), state, None, steps, position
+
+
+class BlockTape:
+    """Лента из блоков по k ячеек, сжатая в серии одинаковых блоков.
+
+    Головка стоит на границе boundary между блоками и смотрит в сторону
+    direction: 'R' - на первую ячейку блока справа, 'L' - на последнюю ячейку
+    блока слева. Блоки по обе стороны хранятся стеками серий [блок, число]
+    (ближайшая к головке серия - последняя), за краями стеков - пустые блоки.
+    """
+
+    def __init__(self, cells, position, size):
+        self.size = size
+        self.blank = ('_',) * size
+        self.boundary = position
+        self.direction = 'R'
+        self.left = []
+        self.right = []
+        # Блоки выравниваются по позиции головки: блок j - ячейки с position + j * size
+        blocks = {}
+        for cell, symbol in cells.items():
+            if symbol != '_':
+                j, i = divmod(cell - position, size)
+                blocks.setdefault(j, list(self.blank))[i] = symbol
+        # Стеки заполняются от дальних блоков к ближним, промежутки - пустыми сериями
+        previous = None
+        for j in sorted(j for j in blocks if j < 0):
+            if previous is not None and j - previous > 1:
+                self.push(self.left, self.blank, j - previous - 1)
+            self.push(self.left, tuple(blocks[j]))
+            previous = j
+        if previous is not None and previous < -1:
+            self.push(self.left, self.blank, -1 - previous)
+        previous = None
+        for j in sorted((j for j in blocks if j >= 0), reverse=True):
+            if previous is not None and previous - j > 1:
+                self.push(self.right, self.blank, previous - j - 1)
+            self.push(self.right, tuple(blocks[j]))
+            previous = j
+        if previous is not None and previous > 0:
+            self.push(self.right, self.blank, previous)
+
+    def push(self, stack, block, count=1):
+        if stack and stack[-1][0] == block:
+            stack[-1][1] += count
+        elif stack or block != self.blank:
+            stack.append([block, count])
+
+    def top(self, stack):
+        """Блок перед головкой и длина его серии (None - бесконечная пустая серия)"""
+        if stack:
+            return stack[-1][0], stack[-1][1]
+        return self.blank, None
+
+    def pop(self, stack, count=1):
+        if stack:
+            stack[-1][1] -= count
+            if not stack[-1][1]:
+                stack.pop()
+
+    def cells(self):
+        """Содержимое ленты: позиция -> символ (без пустых ячеек)"""
+        cells = {}
+        position = self.boundary
+        for block, count in reversed(self.right):
+            if block == self.blank:
+                position += count * self.size
+                continue
+            for _ in range(count):
+                for i, symbol in enumerate(block):
+                    if symbol != '_':
+                        cells[position + i] = symbol
+                position += self.size
+        position = self.boundary
+        for block, count in reversed(self.left):
+            if block == self.blank:
+                position -= count * self.size
+                continue
+            for _ in range(count):
+                position -= self.size
+                for i, symbol in enumerate(block):
+                    if symbol != '_':
+                        cells[position + i] = symbol
+        return cells
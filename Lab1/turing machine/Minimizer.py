@@ -0,0 +1,94 @@
+from Command import CommandSet
+
+
+def _states(commands, start_state):
+    """Все состояния программы (начальное - первым) в порядке первого упоминания"""
+    states = {start_state: None}
+    for cmd in commands:
+        states.setdefault(cmd.state, None)
+        states.setdefault(cmd.new_state, None)
+    return list(states)
+
+
+def _reachable(by_state, start_state):
+    """Состояния, достижимые из start_state, в порядке обхода в ширину"""
+    order = [start_state]
+    seen = {start_state}
+    for state in order:
+        for cmd in by_state.get(state, ()):
+            if cmd.new_state not in seen:
+                seen.add(cmd.new_state)
+                order.append(cmd.new_state)
+    return order
+
+
+def _refine(states, by_state):
+    """Разбиение состояний на классы эквивалентности (как при минимизации ДКА).
+
+    Сначала состояния делятся по тому, что они делают с каждым символом
+    (запись и направление); затем классы дробятся по классам следующих
+    состояний, пока разбиение не перестанет меняться. Состояния без
+    переходов (остановки) всегда остаются отдельными классами: по ним видно,
+    чем закончилась работа.
+    """
+    block = {}
+    for state in states:
+        cmds = by_state.get(state)
+        if cmds:
+            block[state] = tuple(sorted((cmd.symbol, cmd.new_symbol, cmd.direction) for cmd in cmds))
+        else:
+            block[state] = ('halt', state)
+
+    count = None
+    while True:
+        signatures = {}
+        new_block = {}
+        for state in states:
+            signature = (block[state], tuple(sorted(
+                (cmd.symbol, block[cmd.new_state]) for cmd in by_state.get(state, ()))))
+            new_block[state] = signatures.setdefault(signature, len(signatures))
+        block = new_block
+        if len(signatures) == count:
+            return block
+        count = len(signatures)
+
+
+def minimize(commands, start_state='0'):
+    """Удаляет недостижимые состояния и склеивает эквивалентные.
+
+    Возвращает новый CommandSet и отчет: число состояний и переходов до и
+    после, список недостижимых состояний и словарь склеенных состояний
+    (состояние -> представитель класса). Новая программа из start_state
+    выполняет те же шаги с той же лентой; склеенные состояния называются
+    по представителю - первому в порядке обхода от start_state.
+    """
+    by_state = {}
+    for cmd in commands.commands:
+        by_state.setdefault(cmd.state, []).append(cmd)
+
+    states = _states(commands.commands, start_state)
+    reachable = _reachable(by_state, start_state)
+    block = _refine(reachable, by_state)
+
+    representatives = {}
+    for state in reachable:
+        representatives.setdefault(block[state], state)
+    rename = {state: representatives[block[state]] for state in reachable}
+
+    result = CommandSet()
+    for state in reachable:
+        if rename[state] == state:
+            for cmd in by_state.get(state, ()):
+                result.add_command(state, cmd.symbol, rename[cmd.new_state],
+                                   cmd.new_symbol, cmd.direction)
+
+    reachable_set = set(reachable)
+    report = {
+        'states_before': len(states),
+        'states_after': len(representatives),
+        'transitions_before': len(commands.commands),
+        'transitions_after': len(result.commands),
+        'unreachable': [state for state in states if state not in reachable_set],
+        'merged': {state: name for state, name in rename.items() if state != name}
+    }
+    return result, report
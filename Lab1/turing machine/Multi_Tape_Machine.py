@@ -0,0 +1,84 @@
+from Tape import TAPE_MODES
+from Command import MultiTapeCommandSet
+
+
+class MultiTapeMachine:
+    """Машина Тьюринга с k лентами и независимыми головками.
+
+    Переход читает кортеж символов под всеми головками, пишет кортеж символов
+    и сдвигает каждую головку в своем направлении (см. MultiTapeCommandSet).
+    Первая лента - входная, остальные в начале пустые.
+    """
+
+    def __init__(self, tapes=2, tape_mode='dict'):
+        if tapes < 1:
+            raise ValueError("Нужна хотя бы одна лента")
+        if tape_mode not in TAPE_MODES:
+            raise ValueError(f"Неизвестный режим ленты: {tape_mode}")
+        self.tape_class = TAPE_MODES[tape_mode]
+        self.tapes = [self.tape_class() for _ in range(tapes)]
+        self.commands = MultiTapeCommandSet(tapes)
+        self.current_state = '0'  # начальное состояние
+        self.halted = False
+        self.step_count = 0  # счетчик шагов
+
+    def load_tapes(self, *tape_strs):
+        """Загружает данные на первые ленты, остальные ленты очищаются"""
+        if len(tape_strs) > len(self.tapes):
+            raise ValueError(f"Лент всего {len(self.tapes)}")
+        tape_strs += ("",) * (len(self.tapes) - len(tape_strs))
+        self.tapes = [self.tape_class(tape_str) for tape_str in tape_strs]
+
+    def load_program(self, program_lines):
+        """Загружает программу из списка строк"""
+        for line in program_lines:
+            parts = self.commands.parse_line(line)
+            if parts is not None:
+                self.commands.add_command(*parts)
+
+    def load_program_from_file(self, filename):
+        self.commands.load_from_file(filename)
+
+    def read(self):
+        return tuple(tape.read() for tape in self.tapes)
+
+    def step(self):
+        """Выполняет один шаг машины"""
+        if self.halted:
+            return False
+
+        cmd = self.commands.find_command(self.current_state, self.read())
+        if cmd is None:
+            self.halted = True
+            return False
+
+        for tape, symbol, direction in zip(self.tapes, cmd.new_symbol, cmd.direction):
+            tape.write(symbol)
+            tape.move(direction)
+        self.current_state = cmd.new_state
+        self.step_count += 1
+        return True
+
+    def run(self, max_steps=1000):
+        """Выполняет не больше max_steps шагов; возвращает число выполненных шагов"""
+        steps_executed = 0
+        while steps_executed < max_steps and self.step():
+            steps_executed += 1
+        return steps_executed
+
+    def reset(self):
+        """Сбрасывает машину в начальное состояние"""
+        self.current_state = '0'
+        self.halted = False
+        self.step_count = 0
+
+    def get_status(self):
+        """Возвращает текущий статус машины"""
+        return {
+            'state': self.current_state,
+            'positions': [tape.position for tape in self.tapes],
+            'symbols': self.read(),
+            'halted': self.halted,
+            'steps': self.step_count,
+            'tape_contents': [tape.get_full_tape() for tape in self.tapes]
+        }
@@ -0,0 +1,136 @@
+import hashlib
+import os
+import sys
+
+from Command import NondeterministicCommandSet
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from engine.frontier import Frontier
+
+SHIFTS = {'L': -1, 'R': 1}
+
+
+def _normalize(cells, head):
+    """Обрезает пустые ячейки по краям ленты, не трогая ячейку под головкой"""
+    start, stop = 0, len(cells)
+    while start < head and cells[start] == '_':
+        start += 1
+    while stop - 1 > head and cells[stop - 1] == '_':
+        stop -= 1
+    return tuple(cells[start:stop]), head - start
+
+
+def _digest(state, cells, head):
+    """Компактный хэш конфигурации (без абсолютной позиции - она не влияет на работу)"""
+    key = f"{state}\x1e{head}\x1e" + '\x1f'.join(cells)
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+
+
+class NondeterministicExplorer:
+    """Поиск принимающих вычислений недетерминированной машины Тьюринга.
+
+    Из каждой конфигурации (состояние, лента, головка) раскрываются все
+    подходящие переходы. Посещенные конфигурации хранятся только в виде
+    16-байтовых хэшей, так что повторы не раскрываются второй раз. Фронт
+    поиска - Frontier: при переполнении он сбрасывает часть конфигураций
+    на диск. Без эвристики обход идет в ширину, с эвристикой heuristic(state,
+    cells, head) - сначала конфигурации с меньшим значением.
+    """
+
+    def __init__(self, accept_states=('Y',), heuristic=None,
+                 frontier_limit=100000, spill_dir=None):
+        self.commands = NondeterministicCommandSet()
+        self.accept_states = set(accept_states)
+        self.heuristic = heuristic
+        self.frontier_limit = frontier_limit
+        self.spill_dir = spill_dir
+
+    def load_program(self, program_lines):
+        """Загружает программу из списка строк"""
+        for line in program_lines:
+            parts = self.commands.parse_line(line)
+            if parts is not None:
+                self.commands.add_command(*parts)
+
+    def load_program_from_file(self, filename):
+        self.commands.load_from_file(filename)
+
+    def explore(self, tape_str, start_state='0', max_configurations=100000,
+                max_depth=None, max_paths=1):
+        """Ищет до max_paths принимающих путей из начальной конфигурации.
+
+        Возвращает словарь: 'accepted', 'paths' (списки команд от начала до
+        принимающего состояния), 'configurations' (сколько различных
+        конфигураций найдено), 'expanded', 'spilled' (сколько конфигураций
+        побывало на диске) и 'exhausted' - все достижимые конфигурации
+        (в пределах max_depth) просмотрены.
+        """
+        cells, head = _normalize(tuple(tape_str) or ('_',), 0)
+        root = _digest(start_state, cells, head)
+        # Хэш конфигурации -> (хэш родителя, команда): по ним восстанавливаются пути
+        parents = {root: (None, None)}
+        frontier = Frontier(self.frontier_limit, self.spill_dir)
+        frontier.push(self._priority(start_state, cells, head, 0),
+                      (start_state, cells, head, 0, root))
+
+        paths = []
+        expanded = 0
+        try:
+            while frontier and len(paths) < max_paths:
+                if expanded >= max_configurations:
+                    break
+                _, (state, cells, head, depth, digest) = frontier.pop()
+                if state in self.accept_states:
+                    paths.append(self._path(parents, digest))
+                    continue
+                if max_depth is not None and depth >= max_depth:
+                    continue
+                expanded += 1
+                for cmd in self.commands.find_commands(state, cells[head]):
+                    new_cells, new_head = self._apply(cells, head, cmd)
+                    new_digest = _digest(cmd.new_state, new_cells, new_head)
+                    if new_digest in parents:
+                        continue
+                    parents[new_digest] = (digest, cmd)
+                    frontier.push(self._priority(cmd.new_state, new_cells, new_head, depth + 1),
+                                  (cmd.new_state, new_cells, new_head, depth + 1, new_digest))
+            exhausted = not frontier
+            spilled = frontier.spilled
+        finally:
+            frontier.close()
+
+        return {
+            'accepted': bool(paths),
+            'paths': paths,
+            'configurations': len(parents),
+            'expanded': expanded,
+            'spilled': spilled,
+            'exhausted': exhausted
+        }
+
+    def _priority(self, state, cells, head, depth):
+        if self.heuristic is None:
+            return depth
+        return self.heuristic(state, cells, head)
+
+    @staticmethod
+    def _apply(cells, head, cmd):
+        cells = list(cells)
+        cells[head] = cmd.new_symbol
+        head += SHIFTS.get(cmd.direction, 0)
+        if head < 0:
+            cells.insert(0, '_')
+            head = 0
+        elif head == len(cells):
+            cells.append('_')
+        return _normalize(cells, head)
+
+    @staticmethod
+    def _path(parents, digest):
+        path = []
+        parent, cmd = parents[digest]
+        while cmd is not None:
+            path.append(cmd)
+            parent, cmd = parents[parent]
+        path.reverse()
+        return path
@@ -1,3 +1,12 @@
+import os
+import sys
+from array import array
+from bisect import bisect_right
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from engine.mmap_tape import MappedCells
+
+
 class Tape:
     def __init__(self, initial_data=""):
         # Словарь для хранения символов: ключ - позиция, значение - символ
@@ -12,6 +21,10 @@ class Tape:
         # Если в текущей позиции есть символ - возвращаем его, иначе возвращаем пустой символ '_'
         return self.tape.get(self.position, '_')
 
+    def read_at(self, position):
+        """Возвращает символ в произвольной позиции, не двигая головку"""
+        return self.tape.get(position, '_')
+
     def write(self, symbol):
         if symbol == '_':
             # Если пишем пустой символ, удаляем позицию из словаря
@@ -62,4 +75,473 @@ class Tape:
         for i in range(min_pos, max_pos + 1):
             symbols.append(self.tape.get(i, '_'))
 
-        return ''.join(symbols)
\ No newline at end of file
+        return ''.join(symbols)
+
+    def cells(self):
+        """Возвращает копию содержимого ленты: позиция -> символ"""
+        return dict(self.tape)
+
+    def snapshot(self):
+        """Компактная копия содержимого ленты (без позиции головки)"""
+        return dict(self.tape)
+
+    def restore(self, snapshot):
+        """Восстанавливает содержимое, сохраненное snapshot()"""
+        self.tape = dict(snapshot)
+
+
+class ArrayTape:
+    """Лента на двух растущих массивах: правая половина хранит позиции 0, 1, 2, ...,
+    левая - позиции -1, -2, ... Символы хранятся кодами, '_' всегда имеет код 0.
+
+    Публичный интерфейс совпадает с Tape. Пустые символы в ячейках не отличаются
+    от отсутствующих, поэтому границы ленты определяются только непустыми символами.
+    """
+
+    def __init__(self, initial_data=""):
+        self.symbols = ['_']    # код -> символ
+        self.codes = {'_': 0}   # символ -> код
+        self.position = 0
+
+        self.right = bytearray(self._intern(symbol) for symbol in initial_data)
+        self.left = bytearray()
+
+        # Границы непустой части ленты; могут быть шире реальных после записи '_'
+        self.low = 0
+        self.high = len(initial_data) - 1
+
+    def _intern(self, symbol):
+        code = self.codes.get(symbol)
+        if code is None:
+            code = len(self.symbols)
+            if code == 256 and isinstance(self.right, bytearray):
+                # В байт коды больше не помещаются - переходим на 16-битные массивы
+                # (список нужен, иначе array прочитает bytearray как сырые байты)
+                self.right = array('H', list(self.right))
+                self.left = array('H', list(self.left))
+            self.symbols.append(symbol)
+            self.codes[symbol] = code
+        return code
+
+    @staticmethod
+    def _extend(buffer, size):
+        if isinstance(buffer, bytearray):
+            buffer.extend(bytes(size))
+        else:
+            buffer.frombytes(bytes(size * buffer.itemsize))
+
+    def read(self):
+        position = self.position
+        if position >= 0:
+            if position < len(self.right):
+                return self.symbols[self.right[position]]
+        else:
+            index = -position - 1
+            if index < len(self.left):
+                return self.symbols[self.left[index]]
+        return '_'
+
+    def read_at(self, position):
+        """Возвращает символ в произвольной позиции, не двигая головку"""
+        return self.symbols[self._code_at(position)]
+
+    def write(self, symbol):
+        code = self.codes.get(symbol)
+        if code is None:
+            code = self._intern(symbol)
+
+        position = self.position
+        if position >= 0:
+            buffer, index = self.right, position
+        else:
+            buffer, index = self.left, -position - 1
+
+        if index >= len(buffer):
+            if code == 0:
+                return
+            # Растим половину хотя бы вдвое - амортизированно O(1) на запись
+            self._extend(buffer, max(index + 1 - len(buffer), len(buffer)))
+        buffer[index] = code
+
+        if code:
+            if self.low > self.high:
+                self.low = self.high = position
+            elif position < self.low:
+                self.low = position
+            elif position > self.high:
+                self.high = position
+
+    def move(self, direction):
+        if direction == 'L':
+            self.position -= 1
+        elif direction == 'R':
+            self.position += 1
+        # 'S' - остается на месте
+
+    def _codes(self, start, end):
+        """Коды символов на позициях [start, end), за пределами массивов - нули"""
+        codes = []
+        if start < 0:
+            first, last = -min(end, 0), -start
+            chunk = list(self.left[first:last])
+            chunk.extend([0] * (last - first - len(chunk)))
+            chunk.reverse()
+            codes.extend(chunk)
+        if end > 0:
+            first = max(start, 0)
+            chunk = self.right[first:end]
+            codes.extend(chunk)
+            codes.extend([0] * (end - first - len(chunk)))
+        return codes
+
+    def _code_at(self, position):
+        if position >= 0:
+            return self.right[position] if position < len(self.right) else 0
+        index = -position - 1
+        return self.left[index] if index < len(self.left) else 0
+
+    def _bounds(self):
+        """Сужает границы до непустых символов; None, если лента пуста"""
+        while self.low <= self.high and not self._code_at(self.low):
+            self.low += 1
+        while self.low <= self.high and not self._code_at(self.high):
+            self.high -= 1
+        if self.low > self.high:
+            return None
+        return self.low, self.high
+
+    def get_visible_tape(self, width=10):
+        """Возвращает видимую часть ленты вокруг текущей позиции"""
+        bounds = self._bounds()
+        if bounds is None:
+            return "[_] (пустая лента)"
+
+        start = min(bounds[0], self.position - width)
+        end = max(bounds[1], self.position + width) + 1
+        tape_str = ''.join(map(self.symbols.__getitem__, self._codes(start, end)))
+
+        return f"[{tape_str}] (позиция {self.position})"
+
+    def get_full_tape(self):
+        """Возвращает полное содержимое ленты в виде строки"""
+        bounds = self._bounds()
+        if bounds is None:
+            return ""
+        return ''.join(map(self.symbols.__getitem__, self._codes(bounds[0], bounds[1] + 1)))
+
+    def cells(self):
+        """Возвращает копию непустого содержимого ленты: позиция -> символ"""
+        bounds = self._bounds()
+        if bounds is None:
+            return {}
+        symbols = self.symbols
+        return {position: symbols[code]
+                for position, code in enumerate(self._codes(bounds[0], bounds[1] + 1), bounds[0])
+                if code}
+
+    def snapshot(self):
+        """Компактная копия содержимого ленты (без позиции головки)"""
+        return self.right[:], self.left[:], self.low, self.high
+
+    def restore(self, snapshot):
+        """Восстанавливает содержимое, сохраненное snapshot()"""
+        right, left, self.low, self.high = snapshot
+        if isinstance(self.right, array) and isinstance(right, bytearray):
+            # После снимка лента перешла на 16-битные коды
+            right, left = array('H', list(right)), array('H', list(left))
+        self.right, self.left = right[:], left[:]
+
+
+class RunLengthTape:
+    """Лента, хранящая серии одинаковых символов.
+
+    Серия i начинается в позиции starts[i], состоит из символов runs[i] и
+    тянется до начала следующей серии (последняя - до end). Соседние серии
+    всегда различны, а крайние серии никогда не пустые, поэтому длину серии
+    под головкой можно узнать за O(1) - на этом построено ускорение "пробегов"
+    в TuringMachine.run_sweeps.
+    """
+
+    def __init__(self, initial_data=""):
+        self.position = 0
+        self.starts = []
+        self.runs = []
+        self.end = 0
+        self.hint = 0  # индекс серии, к которой обращались последней
+
+        for i, symbol in enumerate(initial_data):
+            if self.runs and self.runs[-1] == symbol:
+                continue
+            self.starts.append(i)
+            self.runs.append(symbol)
+        self.end = len(initial_data)
+        self._trim()
+
+    def _find(self, position):
+        """Индекс серии, содержащей position, или -1 за пределами серий"""
+        starts = self.starts
+        if not starts or position < starts[0] or position >= self.end:
+            return -1
+        i = self.hint
+        if i < len(starts) and starts[i] <= position and (
+                i + 1 == len(starts) or position < starts[i + 1]):
+            return i
+        i = bisect_right(starts, position) - 1
+        self.hint = i
+        return i
+
+    def _run_end(self, i):
+        return self.starts[i + 1] if i + 1 < len(self.starts) else self.end
+
+    def _trim(self):
+        """Убирает пустые серии по краям ленты"""
+        while self.runs and self.runs[-1] == '_':
+            self.end = self.starts.pop()
+            self.runs.pop()
+        while self.runs and self.runs[0] == '_':
+            del self.starts[0]
+            del self.runs[0]
+        if not self.runs:
+            self.end = 0
+        self.hint = 0
+
+    def read(self):
+        i = self._find(self.position)
+        return self.runs[i] if i >= 0 else '_'
+
+    def read_at(self, position):
+        """Возвращает символ в произвольной позиции, не двигая головку"""
+        i = self._find(position)
+        return self.runs[i] if i >= 0 else '_'
+
+    def write(self, symbol):
+        position = self.position
+        i = self._find(position)
+        if i < 0:
+            if symbol == '_':
+                return
+            self._write_outside(position, symbol)
+            return
+        old = self.runs[i]
+        if old == symbol:
+            return
+
+        start, end = self.starts[i], self._run_end(i)
+        starts, runs = [], []
+        if start < position:
+            starts.append(start)
+            runs.append(old)
+        starts.append(position)
+        runs.append(symbol)
+        if position + 1 < end:
+            starts.append(position + 1)
+            runs.append(old)
+        self.starts[i:i + 1] = starts
+        self.runs[i:i + 1] = runs
+
+        # Склеиваем новую серию с соседями, если символы совпали
+        j = i + (1 if start < position else 0)
+        if j + 1 < len(self.runs) and self.runs[j + 1] == symbol:
+            del self.starts[j + 1]
+            del self.runs[j + 1]
+        if j > 0 and self.runs[j - 1] == symbol:
+            del self.starts[j]
+            del self.runs[j]
+        if symbol == '_' and (j == 0 or j >= len(self.runs) - 1):
+            self._trim()
+        self.hint = 0
+
+    def _write_outside(self, position, symbol):
+        if not self.runs:
+            self.starts, self.runs, self.end = [position], [symbol], position + 1
+        elif position >= self.end:
+            if position > self.end:
+                self.starts.append(self.end)
+                self.runs.append('_')
+            if self.runs[-1] == symbol:
+                self.end = position + 1
+                return
+            self.starts.append(position)
+            self.runs.append(symbol)
+            self.end = position + 1
+        else:
+            if position + 1 < self.starts[0]:
+                self.starts.insert(0, position + 1)
+                self.runs.insert(0, '_')
+            if self.runs[0] == symbol:
+                self.starts[0] = position
+                return
+            self.starts.insert(0, position)
+            self.runs.insert(0, symbol)
+        self.hint = 0
+
+    def move(self, direction):
+        if direction == 'L':
+            self.position -= 1
+        elif direction == 'R':
+            self.position += 1
+        # 'S' - остается на месте
+
+    def run_length(self, direction):
+        """Сколько ячеек подряд, начиная с текущей, в направлении direction
+        содержат тот же символ, что и текущая. None - если серия бесконечна."""
+        position = self.position
+        i = self._find(position)
+        if i >= 0:
+            if direction == 'R':
+                return self._run_end(i) - position
+            return position - self.starts[i] + 1
+        if not self.runs:
+            return None
+        if position >= self.end:
+            return None if direction == 'R' else position - self.end + 1
+        return None if direction == 'L' else self.starts[0] - position
+
+    def jump(self, direction, count):
+        """Сдвигает головку на count ячеек в направлении direction"""
+        if direction == 'L':
+            self.position -= count
+        elif direction == 'R':
+            self.position += count
+
+    def _render(self, start, end):
+        """Строка ячеек [start, end); отрезок должен покрывать все серии"""
+        pieces = ['_' * (self.starts[0] - start)]
+        for i, symbol in enumerate(self.runs):
+            pieces.append(symbol * (self._run_end(i) - self.starts[i]))
+        pieces.append('_' * (end - self.end))
+        return ''.join(pieces)
+
+    def get_visible_tape(self, width=10):
+        """Возвращает видимую часть ленты вокруг текущей позиции"""
+        if not self.runs:
+            return "[_] (пустая лента)"
+
+        start = min(self.starts[0], self.position - width)
+        end = max(self.end - 1, self.position + width) + 1
+        return f"[{self._render(start, end)}] (позиция {self.position})"
+
+    def get_full_tape(self):
+        """Возвращает полное содержимое ленты в виде строки"""
+        if not self.runs:
+            return ""
+        return self._render(self.starts[0], self.end)
+
+    def cells(self):
+        """Возвращает копию непустого содержимого ленты: позиция -> символ"""
+        cells = {}
+        for i, symbol in enumerate(self.runs):
+            if symbol != '_':
+                for position in range(self.starts[i], self._run_end(i)):
+                    cells[position] = symbol
+        return cells
+
+    def snapshot(self):
+        """Компактная копия содержимого ленты (без позиции головки)"""
+        return self.starts[:], self.runs[:], self.end
+
+    def restore(self, snapshot):
+        """Восстанавливает содержимое, сохраненное snapshot()"""
+        starts, runs, self.end = snapshot
+        self.starts, self.runs = starts[:], runs[:]
+        self.hint = 0
+
+
+class MappedTape:
+    """Лента в файле, отображенном в память (см. engine/mmap_tape.py).
+
+    Символы хранятся байтовыми кодами, '_' имеет код 0, поэтому символов не
+    больше 256. Лента может быть намного больше оперативной памяти; лимит
+    max_cells ограничивает размер файла. Публичный интерфейс совпадает с Tape.
+    """
+
+    def __init__(self, initial_data="", path=None, max_cells=None):
+        self.symbols = ['_']    # код -> символ
+        self.codes = {'_': 0}   # символ -> код
+        self.position = 0
+        self.store = MappedCells(path, max_cells=max_cells)
+        self.store.load(0, bytes(self._intern(symbol) for symbol in initial_data))
+
+    def _intern(self, symbol):
+        code = self.codes.get(symbol)
+        if code is None:
+            code = len(self.symbols)
+            if code == 256:
+                raise ValueError("На ленте в файле не больше 256 различных символов")
+            self.symbols.append(symbol)
+            self.codes[symbol] = code
+        return code
+
+    def read(self):
+        return self.symbols[self.store.get(self.position)]
+
+    def read_at(self, position):
+        """Возвращает символ в произвольной позиции, не двигая головку"""
+        return self.symbols[self.store.get(position)]
+
+    def write(self, symbol):
+        code = self.codes.get(symbol)
+        if code is None:
+            code = self._intern(symbol)
+        self.store.set(self.position, code)
+
+    def move(self, direction):
+        if direction == 'L':
+            self.position -= 1
+        elif direction == 'R':
+            self.position += 1
+        # 'S' - остается на месте
+
+    def _text(self, start, end):
+        return ''.join(map(self.symbols.__getitem__, self.store.export(start, end)))
+
+    def get_visible_tape(self, width=10):
+        """Возвращает видимую часть ленты вокруг текущей позиции"""
+        bounds = self.store.bounds()
+        if bounds is None:
+            return "[_] (пустая лента)"
+
+        start = min(bounds[0], self.position - width)
+        end = max(bounds[1], self.position + width) + 1
+        return f"[{self._text(start, end)}] (позиция {self.position})"
+
+    def get_full_tape(self):
+        """Возвращает полное содержимое ленты в виде строки"""
+        bounds = self.store.bounds()
+        if bounds is None:
+            return ""
+        return self._text(bounds[0], bounds[1] + 1)
+
+    def cells(self):
+        """Возвращает копию непустого содержимого ленты: позиция -> символ"""
+        bounds = self.store.bounds()
+        if bounds is None:
+            return {}
+        symbols = self.symbols
+        return {position: symbols[code]
+                for position, code in self.store.nonzero(bounds[0], bounds[1] + 1)}
+
+    def reserve(self, start, stop):
+        """Готовит место под позиции [start, stop] (MemoryError сверх max_cells)"""
+        self.store.reserve(start, stop)
+
+    def snapshot(self):
+        """Компактная копия содержимого ленты (без позиции головки)"""
+        return self.store.snapshot()
+
+    def restore(self, snapshot):
+        """Восстанавливает содержимое, сохраненное snapshot()"""
+        self.store.restore(snapshot)
+
+    def close(self):
+        """Закрывает файл ленты"""
+        self.store.close()
+
+
+# Доступные режимы хранения ленты
+TAPE_MODES = {
+    'dict': Tape,
+    'array': ArrayTape,
+    'rle': RunLengthTape,
+    'mmap': MappedTape,
+}
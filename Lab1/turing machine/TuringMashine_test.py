@@ -1,7 +1,22 @@
+import asyncio
+import json
 import pytest
-from Tape import Tape
-from Command import Command, CommandSet
+import random
+import struct
+import zlib
+from Tape import Tape, ArrayTape, MappedTape
+from Command import Command, CommandSet, MultiTapeCommandSet, NondeterministicCommandSet
+from Multi_Tape_Machine import MultiTapeMachine
+from Nondeterministic_Machine import NondeterministicExplorer
+from Minimizer import minimize
+from Macro_Machine import BlockTape
 from Turing_Machine import TuringMachine
+from Batch import run_batch
+from engine import benchmark, codegen, program_cache, spacetime
+from engine.frontier import Frontier
+from engine.streaming import stream_steps
+from engine.mmap_tape import MappedCells
+import Benchmark
 
 
 def test_tape_initialization():
@@ -79,6 +94,56 @@ def test_tape_expansion():
     assert tape.get_full_tape() == "CAB"
 
 
+def test_array_tape_read_write_move():
+    tape = ArrayTape("101")
+    assert tape.read() == '1'
+    tape.move('R')
+    assert tape.read() == '0'
+    tape.write('_')
+    assert tape.get_full_tape() == "1_1"
+
+    tape.move('L')
+    tape.move('L')
+    tape.move('L')
+    tape.write('A')
+    assert tape.position == -2
+    assert tape.get_full_tape() == "A_1_1"
+
+
+def test_array_tape_bounds_shrink():
+    tape = ArrayTape("11")
+    tape.write('_')
+    tape.move('R')
+    tape.write('_')
+    assert tape.get_full_tape() == ""
+    assert tape.get_visible_tape() == "[_] (пустая лента)"
+
+
+def test_array_tape_matches_dict_tape():
+    rng = random.Random(1)
+    dict_tape, array_tape = Tape("ab"), ArrayTape("ab")
+    for _ in range(2000):
+        symbol = rng.choice("ab_")
+        direction = rng.choice("LRS")
+        for tape in (dict_tape, array_tape):
+            tape.write(symbol)
+            tape.move(direction)
+        assert array_tape.read() == dict_tape.read()
+    assert array_tape.position == dict_tape.position
+    assert array_tape.get_full_tape() == dict_tape.get_full_tape()
+    assert array_tape.get_visible_tape(4) == dict_tape.get_visible_tape(4)
+
+
+def test_array_tape_many_symbols():
+    tape = ArrayTape()
+    for i in range(300):
+        tape.write(f"s{i}")
+        tape.move('R')
+    tape.move('L')
+    assert tape.read() == "s299"
+    assert tape.get_full_tape().startswith("s0s1s2")
+
+
 def test_command_creation():
     cmd = Command('0', '1', '1', '0', 'R')
     assert cmd.state == '0'
@@ -120,6 +185,37 @@ def test_command_set_empty():
     assert cmd is None
 
 
+def test_command_set_index():
+    cmd_set = CommandSet()
+    cmd_set.add_command('0', '1', '1', '0', 'R')
+    cmd_set.add_command('1', '_', '2', '1', 'L')
+
+    assert cmd_set.index[('0', '1')] is cmd_set.commands[0]
+    assert cmd_set.index[('1', '_')] is cmd_set.commands[1]
+
+
+def test_command_set_duplicate():
+    cmd_set = CommandSet()
+    cmd_set.add_command('0', '1', '1', '0', 'R')
+    cmd_set.add_command('0', '1', '1', '0', 'R')
+
+    assert len(cmd_set.commands) == 1
+    assert len(cmd_set.duplicates) == 1
+
+
+def test_command_set_conflict():
+    cmd_set = CommandSet()
+    cmd_set.add_command('0', '1', '1', '0', 'R')
+    with pytest.raises(ValueError):
+        cmd_set.add_command('0', '1', '1', '1', 'R')
+
+
+def test_turing_machine_load_program_conflict():
+    tm = TuringMachine()
+    with pytest.raises(ValueError):
+        tm.load_program(["0 1 0 0 R", "0 1 1 0 L"])
+
+
 def test_turing_machine_initialization():
     tm = TuringMachine()
     assert tm.current_state == '0'
@@ -128,6 +224,11 @@ def test_turing_machine_initialization():
     assert len(tm.log) == 0
 
 
+def test_turing_machine_unknown_tape_mode():
+    with pytest.raises(ValueError):
+        TuringMachine(tape_mode='tree')
+
+
 def test_turing_machine_load_tape():
     tm = TuringMachine()
     tm.load_tape("101")
@@ -367,6 +468,466 @@ def test_turing_machine_log_structure():
     assert 'tape_snapshot' in log_entry
 
 
+INVERSION_PROGRAM = [
+    "0 1 0 0 R",
+    "0 0 0 1 R",
+    "0 _ 1 _ L",
+    "1 0 1 0 L",
+    "1 1 1 1 L",
+    "1 _ 2 _ R"
+]
+
+
+def test_log_snapshots_match_eager_snapshots():
+    tm = TuringMachine()
+    tm.load_tape("1011")
+    tm.load_program(INVERSION_PROGRAM)
+
+    snapshots = []
+    while tm.step():
+        snapshots.append(tm.tape.get_visible_tape())
+    snapshots.append(tm.tape.get_visible_tape())
+
+    log = tm.get_log()
+    assert [entry['tape_snapshot'] for entry in log] == snapshots
+    assert [entry['step'] for entry in log] == list(range(len(snapshots)))
+    assert log[-1]['new_state'] == 'HALT'
+    assert tm.log[3] == log[3]
+    assert tm.log[-2:] == log[-2:]
+
+
+@pytest.mark.parametrize("log_level", ['full', 'ring', 'summary'])
+@pytest.mark.parametrize("tape_str, program", [
+    ("11_", ["0 1 0 _ R"]),
+    ("11_", ["0 1 0 _ R", "0 _ 1 _ L"]),
+    ("_1_1_", ["0 _ 0 1 R", "0 1 0 _ R"]),
+])
+def test_log_snapshots_keep_literal_blanks(log_level, tape_str, program):
+    """Тест: явные '_' исходной ленты видны в снимках журнала, как в снимках на ходу"""
+    tm = TuringMachine(log_level=log_level, log_size=2)
+    tm.load_tape(tape_str)
+    tm.load_program(program)
+
+    snapshots = []
+    for _ in range(20):
+        moved = tm.step()
+        snapshots.append(tm.tape.get_visible_tape())
+        if not moved:
+            break
+
+    log = tm.get_log()
+    assert [entry['tape_snapshot'] for entry in log] == snapshots[-len(log):]
+
+
+def test_log_literal_blanks_after_seek():
+    tm = TuringMachine(checkpoint_interval=2)
+    tm.load_tape("_1_1_")
+    tm.load_program(["0 _ 0 1 R", "0 1 0 _ R"])
+    snapshots = []
+    while tm.step():
+        snapshots.append(tm.tape.get_visible_tape())
+
+    tm.seek(2)
+    while tm.step():
+        pass
+    assert [entry['tape_snapshot'] for entry in tm.get_log()[:-1]] == snapshots
+
+
+def test_log_level_off():
+    tm = TuringMachine(log_level='off')
+    tm.load_tape("101")
+    tm.load_program(INVERSION_PROGRAM)
+    tm.run(max_steps=100)
+    assert tm.halted == True
+    assert len(tm.log) == 0
+    assert tm.get_log() == []
+
+
+def test_log_level_summary():
+    tm = TuringMachine(log_level='summary')
+    tm.load_tape("101")
+    tm.load_program(INVERSION_PROGRAM)
+    tm.run(max_steps=100)
+    assert len(tm.log) == 1
+    assert tm.log.total == tm.step_count + 1
+    assert tm.log[0]['new_state'] == 'HALT'
+
+
+def test_log_level_ring():
+    full = TuringMachine()
+    ring = TuringMachine(log_level='ring', log_size=3)
+    for tm in (full, ring):
+        tm.load_tape("10110")
+        tm.load_program(INVERSION_PROGRAM)
+        tm.run(max_steps=100)
+    assert len(ring.log) == 3
+    assert ring.get_log() == full.get_log()[-3:]
+
+
+def test_log_survives_tape_reload():
+    tm = TuringMachine()
+    tm.load_tape("1")
+    tm.load_program(["0 1 1 0 R", "1 1 2 0 R"])
+    tm.step()
+    before = tm.get_log()
+
+    tm.load_tape("1")
+    tm.step()
+    assert tm.get_log()[0] == before[0]
+    assert tm.get_log()[1]['tape_snapshot'] == tm.tape.get_visible_tape()
+
+
+def machine_state(tm):
+    return (tm.current_state, tm.tape.get_full_tape(), tm.tape.position,
+            tm.step_count, tm.halted)
+
+
+UNARY_ADDITION_PROGRAM = [
+    "0 1 0 1 R",
+    "0 + 0 1 R",
+    "0 _ 1 _ L",
+    "1 1 2 _ L",
+    "2 1 2 1 L",
+    "2 _ 3 _ R"
+]
+
+BINARY_INCREMENT_PROGRAM = [
+    "0 0 0 0 R",
+    "0 1 0 1 R",
+    "0 _ 1 _ L",
+    "1 1 1 0 L",
+    "1 0 2 1 L",
+    "1 _ 2 1 L",
+    "2 0 2 0 L",
+    "2 1 2 1 L",
+    "2 _ 3 _ R"
+]
+
+RUN_CASES = [
+    ("101010", INVERSION_PROGRAM, 1000),
+    ("101010", INVERSION_PROGRAM, 5),
+    ("111", ["0 1 0 1 R", "0 _ 1 _ L"], 10),
+    ("111", ["0 1 0 0 R"], 2),
+    ("1", ["0 1 0 1 S"], 5),
+    ("1", ["0 1 1 0 R"], 0),
+    ("", ["0 _ 0 a L"], 50),
+    ("", ["0 _ 0 _ R"], 50),
+    ("1", [], 10),
+    ("111+11", UNARY_ADDITION_PROGRAM, 1000),
+    ("111+11", UNARY_ADDITION_PROGRAM, 4),
+    ("10111", BINARY_INCREMENT_PROGRAM, 1000),
+    ("111", BINARY_INCREMENT_PROGRAM, 1000),
+]
+
+
+@pytest.mark.parametrize("tape_str, program, max_steps", RUN_CASES)
+def test_run_fast_matches_run(tape_str, program, max_steps):
+    slow, fast = TuringMachine(), TuringMachine()
+    for tm in (slow, fast):
+        tm.load_tape(tape_str)
+        tm.load_program(program)
+
+    assert fast.run_fast(max_steps) == slow.run(max_steps)
+    assert machine_state(fast) == machine_state(slow)
+
+
+@pytest.mark.parametrize("tape_str, program, max_steps", RUN_CASES)
+def test_run_vm_engine_matches_run(tape_str, program, max_steps):
+    slow, fast = TuringMachine(), TuringMachine(log_level='off')
+    for tm in (slow, fast):
+        tm.load_tape(tape_str)
+        tm.load_program(program)
+
+    assert fast.run(max_steps, engine='vm') == slow.run(max_steps)
+    assert machine_state(fast) == machine_state(slow)
+
+
+def test_run_engine_does_not_depend_on_log_level():
+    """Тест: без журнала run() по-прежнему идет пошагово, таблица - только по запросу"""
+    tm = TuringMachine(log_level='off')
+    tm.load_tape("111")
+    tm.load_program(INVERSION_PROGRAM)
+    tm.execute = None
+    assert tm.run(100) == 8 and tm.halted
+
+    with pytest.raises(ValueError):
+        tm.run(100, engine='jit')
+    with pytest.raises(ValueError):
+        tm.run(100, detect_loops=True, engine='vm')
+
+
+@pytest.mark.parametrize("log_level", ['summary', 'ring', 'full'])
+def test_run_fast_keeps_log(log_level):
+    tm = TuringMachine(log_level=log_level, log_size=3)
+    tm.load_tape("111")
+    tm.load_program(["0 1 0 0 R", "0 _ 0 1 R"])
+    tm.run(max_steps=4)
+    before = tm.get_log()
+    tm.run_fast(10)
+    assert tm.get_log() == before
+
+    tm.run(max_steps=1)
+    # run(n) выполняет n + 1 переходов: 5 + 2 записи в полном журнале
+    assert len(tm.log) == {'summary': 1, 'ring': 3, 'full': 7}[log_level]
+    assert tm.get_log()[-1]['tape_snapshot'] == tm.tape.get_visible_tape()
+
+
+def test_run_fast_array_tape_continues_run():
+    slow, fast = TuringMachine(), TuringMachine(tape_mode='array')
+    for tm in (slow, fast):
+        tm.load_tape("1x1")
+        tm.load_program(["0 1 0 0 R", "0 x 0 y R", "0 _ 1 _ L", "1 0 1 1 L", "1 y 1 y L"])
+        tm.run(max_steps=2)
+
+    assert fast.run_fast(100) == slow.run(100)
+    assert machine_state(fast) == machine_state(slow)
+    assert fast.run_fast(100) == 0
+
+
+def test_load_program_from_file_cache(tmp_path, monkeypatch):
+    program_file = tmp_path / "increment.txt"
+    program_file.write_text("# инкремент\n" + "\n".join(BINARY_INCREMENT_PROGRAM) + "\n")
+    cache_dir = tmp_path / "cache"
+
+    first = TuringMachine()
+    first.load_program_from_file(str(program_file), cache_dir=str(cache_dir))
+    assert len(list(cache_dir.iterdir())) == 1
+
+    # Новый процесс: кэша в памяти нет, разбор строк не нужен
+    monkeypatch.setattr(program_cache, '_memory', {})
+    monkeypatch.setattr(CommandSet, 'parse_line', None)
+    second = TuringMachine()
+    second.load_program_from_file(str(program_file), cache_dir=str(cache_dir))
+    assert ([vars(cmd) for cmd in second.commands.commands]
+            == [vars(cmd) for cmd in first.commands.commands])
+
+    second.load_tape("1011")
+    second.run()
+    assert second.tape.get_full_tape() == "1100"
+
+
+def test_program_cache_rejects_other_formats():
+    data = program_cache.pack('turing', ['0', '1'], [(0, 1)], 2)
+    assert program_cache.unpack('turing', data) == (['0', '1'], [(0, 1)])
+    for broken in (data[:-3], b"garbage", data.replace(b'turing', b'post\0\0')):
+        with pytest.raises(ValueError):
+            program_cache.unpack('turing', broken)
+
+
+@pytest.mark.parametrize("states, steps, ones", [(2, 6, 4), (3, 21, 5), (4, 107, 13)])
+def test_benchmark_busy_beavers(states, steps, ones):
+    tm = TuringMachine()
+    tm.load_program(Benchmark.BUSY_BEAVERS[states])
+    tm.run(max_steps=1000)
+    assert tm.halted and tm.current_state == 'H'
+    assert tm.step_count == steps
+    assert tm.tape.get_full_tape().count('1') == ones
+
+
+def test_benchmark_unary_multiplication_and_palindrome():
+    tm = TuringMachine()
+    tm.load_tape("111*11=")
+    tm.load_program(Benchmark.UNARY_MULTIPLICATION)
+    tm.run(max_steps=10000)
+    assert tm.halted
+    assert tm.tape.get_full_tape().split('=')[1] == "111111"
+
+    for word, verdict in (("0110", 'Y'), ("10101", 'Y'), ("", 'Y'), ("01", 'N'), ("100", 'N')):
+        tm = TuringMachine()
+        tm.load_tape(word)
+        tm.load_program(Benchmark.PALINDROME)
+        tm.run(max_steps=10000)
+        assert tm.halted and tm.current_state == verdict
+
+
+def test_benchmark_compare_reports_regressions():
+    base = {'bb2': {'steps': 6, 'steps_per_sec': 1000.0, 'peak_bytes': 100}}
+    same = {'bb2': {'steps': 6, 'steps_per_sec': 950.0, 'peak_bytes': 105}}
+    worse = {'bb2': {'steps': 7, 'steps_per_sec': 500.0, 'peak_bytes': 300}}
+    assert benchmark.compare(same, base, tolerance=0.1) == []
+    assert len(benchmark.compare(worse, base, tolerance=0.1)) == 3
+
+
+def test_execute_exact_limit():
+    tm = TuringMachine()
+    tm.load_program(["0 _ 0 1 R"])
+    assert tm.execute(7) == 7
+    assert tm.step_count == 7
+    assert tm.tape.get_full_tape() == "1111111"
+
+
+def test_run_batch_matches_run():
+    tapes = ["1" * n + "0" for n in range(10)]
+    results = list(run_batch(BINARY_INCREMENT_PROGRAM, tapes, max_steps=1000,
+                             chunksize=3, workers=2))
+    assert sorted(result['index'] for result in results) == list(range(len(tapes)))
+
+    for result in results:
+        tm = TuringMachine()
+        tm.load_tape(tapes[result['index']])
+        tm.load_program(BINARY_INCREMENT_PROGRAM)
+        tm.run(max_steps=1000)
+        assert result['tape'] == tm.tape.get_full_tape()
+        assert result['steps'] == tm.step_count
+        assert result['halted'] and not result['timeout']
+
+
+def test_run_batch_limits():
+    by_steps = list(run_batch(["0 _ 0 1 R"], ["", "_"], max_steps=5))
+    assert all(result['steps'] == 5 for result in by_steps)
+    assert not any(result['halted'] or result['timeout'] for result in by_steps)
+
+    halting = list(run_batch(["0 1 0 1 R"], ["111"], max_steps=3))
+    assert halting[0]['steps'] == 3 and halting[0]['halted']
+
+    by_time = list(run_batch(["0 _ 0 _ S"], ["", ""], max_steps=10 ** 12,
+                             timeout=0.2, workers=2))
+    assert all(result['timeout'] and not result['halted'] for result in by_time)
+
+
+@pytest.mark.parametrize("tape_mode", ['dict', 'rle'])
+@pytest.mark.parametrize("tape_str, program, max_steps", RUN_CASES)
+def test_run_sweeps_matches_run(tape_str, program, max_steps, tape_mode):
+    slow, fast = TuringMachine(), TuringMachine(tape_mode=tape_mode)
+    for tm in (slow, fast):
+        tm.load_tape(tape_str)
+        tm.load_program(program)
+
+    assert fast.run_sweeps(max_steps) == slow.run(max_steps)
+    assert machine_state(fast) == machine_state(slow)
+
+
+def test_command_sweep_detection():
+    assert Command('0', '1', '0', '1', 'R').sweep
+    assert not Command('0', '1', '0', '1', 'S').sweep
+    assert not Command('0', '1', '1', '1', 'R').sweep
+    assert not Command('0', '1', '0', '0', 'L').sweep
+
+
+def test_run_sweeps_long_unary_addition():
+    tm = TuringMachine(tape_mode='rle')
+    tm.load_tape("1" * 100000 + "+" + "1" * 100000)
+    tm.load_program(UNARY_ADDITION_PROGRAM)
+
+    tm.run_sweeps(max_steps=10 ** 6)
+    assert tm.halted == True
+    assert tm.current_state == '3'
+    assert tm.step_count == 400004
+    assert tm.tape.get_full_tape() == "1" * 200000
+
+
+def test_run_detects_cycle_in_place():
+    tm = TuringMachine()
+    tm.load_tape("1")
+    tm.load_program(["0 1 0 1 S"])
+
+    steps = tm.run(max_steps=10 ** 6, detect_loops=True)
+    cycle = tm.get_status()['cycle']
+    assert steps < 10
+    assert tm.halted == False
+    assert cycle == {'start': 0, 'period': 1, 'shift': 0}
+
+    # Следующий прогон не сообщает о старом цикле
+    tm.run(max_steps=50)
+    assert tm.get_status()['cycle'] is None
+
+
+def test_run_detects_translated_cycle():
+    tm = TuringMachine()
+    tm.load_tape("ab")
+    tm.load_program(["0 a 0 a R", "0 b 0 b R", "0 _ 1 x R", "1 _ 0 y R"])
+
+    steps = tm.run(max_steps=10 ** 6, detect_loops=True)
+    cycle = tm.get_status()['cycle']
+    assert steps < 100
+    assert cycle['period'] % 2 == 0
+    assert cycle['shift'] == cycle['period']
+
+
+def test_run_detects_translated_cycle_leftwards():
+    tm = TuringMachine(tape_mode='array')
+    tm.load_tape("1")
+    # Шаг вправо и два влево: головка дрейфует влево, оставляя след
+    tm.load_program(["0 1 1 1 R", "0 _ 1 1 R", "1 _ 2 x L", "1 1 2 x L", "2 1 0 1 L"])
+
+    steps = tm.run(max_steps=10 ** 6, detect_loops=True)
+    assert steps < 100
+    assert tm.cycle['shift'] < 0
+
+
+def test_run_no_false_cycle_on_counter():
+    tm = TuringMachine()
+    # Двоичный счетчик: бесконечно прибавляет единицу, конфигурации не повторяются
+    tm.load_program(BINARY_INCREMENT_PROGRAM[:-1] + ["2 _ 0 _ R"])
+
+    steps = tm.run(max_steps=5000, detect_loops=True)
+    assert steps == 5000
+    assert tm.get_status()['cycle'] is None
+
+
+def test_run_halting_program_with_loop_detection():
+    tm = TuringMachine()
+    tm.load_tape("101")
+    tm.load_program(INVERSION_PROGRAM)
+
+    tm.run(max_steps=100, detect_loops=True)
+    assert tm.halted == True
+    assert tm.get_status()['cycle'] is None
+    assert tm.get_status()['tape_content'] == "010"
+
+
+@pytest.mark.parametrize("tape_mode", ['dict', 'array', 'rle', 'mmap'])
+def test_seek_restores_every_step(tape_mode):
+    reference = TuringMachine()
+    reference.load_tape("1011")
+    reference.load_program(BINARY_INCREMENT_PROGRAM)
+    states = [machine_state(reference)]
+    while reference.step():
+        states.append(machine_state(reference))
+
+    tm = TuringMachine(tape_mode=tape_mode, checkpoint_interval=4)
+    tm.load_tape("1011")
+    tm.load_program(BINARY_INCREMENT_PROGRAM)
+    tm.run(max_steps=1000)
+    assert len(tm.checkpoints) == len(states) // 4 + 1
+
+    for step in (7, 2, len(states) - 1, 0, 5):
+        assert tm.seek(step) == True
+        assert machine_state(tm) == states[step]
+        assert len(tm.log) == step
+
+
+def test_step_back_to_start():
+    tm = TuringMachine(checkpoint_interval=3)
+    tm.load_tape("101")
+    tm.load_program(INVERSION_PROGRAM)
+    tm.run(max_steps=100)
+    final_log = tm.get_log()
+
+    while tm.step_back():
+        pass
+    assert tm.step_count == 0
+    assert tm.get_status()['tape_content'] == "101"
+    assert tm.current_state == '0'
+
+    tm.run(max_steps=100)
+    assert tm.get_log() == final_log
+
+
+def test_seek_without_checkpoints():
+    tm = TuringMachine()
+    tm.load_tape("1")
+    tm.load_program(["0 1 0 1 R"])
+    tm.run(max_steps=3)
+    with pytest.raises(ValueError):
+        tm.seek(1)
+
+
+def test_log_unknown_level():
+    with pytest.raises(ValueError):
+        TuringMachine(log_level='verbose')
+
+
 def test_complex_program():
     """Тест более сложной программы"""
     tm = TuringMachine()
@@ -387,5 +948,751 @@ def test_complex_program():
     assert tm.get_status()['tape_content'] == "010101"  # Инвертированная строка
 
 
+def test_complex_program_array_tape():
+    tm = TuringMachine(tape_mode='array')
+    tm.load_tape("101010")
+    tm.load_program([
+        "0 1 0 0 R",
+        "0 0 0 1 R",
+        "0 _ 1 _ L",
+        "1 0 1 0 L",
+        "1 1 1 1 L",
+        "1 _ 2 _ R"
+    ])
+
+    tm.run(max_steps=1000)
+    assert tm.halted == True
+    assert tm.get_status()['tape_content'] == "010101"
+    assert tm.tape.position == 0
+
+
 if __name__ == "__main__":
-    pytest.main([__file__, "-v"])
\ No newline at end of file
+    pytest.main([__file__, "-v"])
+
+
+def test_multi_tape_parse_line():
+    """Тест разбора строк k-ленточной программы"""
+    commands = MultiTapeCommandSet(2)
+    assert commands.parse_line("0 1,_ 1 1,1 R,S") == ('0', ('1', '_'), '1', ('1', '1'), ('R', 'S'))
+    assert commands.parse_line("0 1 1 1 R") is None          # одноленточная строка
+    assert commands.parse_line("0 1,_,_ 1 1,1 R,S") is None  # лишняя лента
+    assert commands.parse_line("# 0 1,_ 1 1,1 R,S") is None
+
+
+def test_multi_tape_copy():
+    """Тест копирования входа на вторую ленту"""
+    machine = MultiTapeMachine(2)
+    machine.load_tapes("111")
+    machine.load_program(Benchmark.UNARY_COPY_2)
+    assert machine.run() == 4
+    status = machine.get_status()
+    assert status['state'] == 'H'
+    assert status['halted'] is True
+    assert status['positions'] == [3, 3]
+    assert status['tape_contents'] == ["111", "111"]
+
+
+def test_multi_tape_conflicting_commands():
+    """Тест: конфликтующие переходы по кортежу символов"""
+    machine = MultiTapeMachine(2)
+    with pytest.raises(ValueError):
+        machine.load_program(["0 1,_ 0 1,1 R,R", "0 1,_ 0 1,_ R,R"])
+
+
+def test_multi_tape_too_many_tapes():
+    machine = MultiTapeMachine(2)
+    with pytest.raises(ValueError):
+        machine.load_tapes("1", "1", "1")
+
+
+@pytest.mark.parametrize("tape_str", ["", "0", "01", "0110", "010", "0111", "11011"])
+def test_multi_tape_palindrome_matches_single_tape(tape_str):
+    """Тест: двухленточная проверка палиндрома дает тот же ответ за O(n) шагов"""
+    single = TuringMachine()
+    single.load_tape(tape_str)
+    single.load_program(Benchmark.PALINDROME)
+    single.run(max_steps=10000)
+
+    multi = MultiTapeMachine(2, tape_mode='array')
+    multi.load_tapes(tape_str)
+    multi.load_program(Benchmark.PALINDROME_2)
+    multi.run(max_steps=10000)
+
+    assert multi.current_state == single.current_state
+    assert multi.step_count <= 3 * len(tape_str) + 3
+
+
+def test_single_tape_copy():
+    machine = TuringMachine()
+    machine.load_tape("11")
+    machine.load_program(Benchmark.UNARY_COPY)
+    machine.run()
+    assert machine.current_state == 'H'
+    assert machine.tape.get_full_tape() == "11_11"
+
+
+def test_bench_multi_tape_fewer_steps():
+    for row in Benchmark.bench_multi_tape():
+        assert row['multi_steps'] < row['single_steps']
+
+
+# Недетерминированно угадывает начало подстроки "101"
+GUESS_101 = [
+    "0 0 0 0 R", "0 1 0 1 R",
+    "0 1 1 1 R",                # угадываем начало подстроки
+    "1 0 2 0 R",
+    "2 1 Y 1 S",
+]
+
+
+def test_frontier_order_with_spill(tmp_path):
+    """Тест: очередь со сбросом на диск выдает элементы в порядке приоритета"""
+    rng = random.Random(5)
+    priorities = [rng.randrange(50) for _ in range(500)]
+    frontier = Frontier(limit=16, directory=tmp_path)
+    for i, priority in enumerate(priorities):
+        frontier.push(priority, i)
+    assert frontier.spilled > 0
+    popped = [frontier.pop() for _ in range(len(frontier))]
+    # При равных приоритетах - порядок добавления
+    assert popped == sorted(((p, i) for i, p in enumerate(priorities)), key=lambda x: x[0])
+    with pytest.raises(IndexError):
+        frontier.pop()
+    frontier.close()
+
+
+def test_nondeterministic_command_set():
+    commands = NondeterministicCommandSet()
+    for line in GUESS_101 + ["0 1 0 1 R"]:
+        commands.add_command(*commands.parse_line(line))
+    assert [cmd.new_state for cmd in commands.find_commands('0', '1')] == ['0', '1']
+    assert commands.find_command('0', '1').new_state == '0'
+    assert len(commands.duplicates) == 1
+    assert commands.find_commands('2', '0') == []
+
+
+@pytest.mark.parametrize("tape_str, accepted", [
+    ("0011010", True), ("101", True), ("1001", False), ("", False), ("1100110", False),
+])
+def test_nondeterministic_explorer(tape_str, accepted):
+    explorer = NondeterministicExplorer()
+    explorer.load_program(GUESS_101)
+    result = explorer.explore(tape_str)
+    assert result['accepted'] == accepted
+    assert result['exhausted'] or accepted
+
+    # Найденный путь - последовательность применимых команд
+    for path in result['paths']:
+        tape, state = Tape(tape_str), '0'
+        for cmd in path:
+            assert cmd.matches(state, tape.read())
+            tape.write(cmd.new_symbol)
+            tape.move(cmd.direction)
+            state = cmd.new_state
+        assert state == 'Y'
+
+
+def test_nondeterministic_explorer_all_paths():
+    explorer = NondeterministicExplorer()
+    explorer.load_program(GUESS_101)
+    result = explorer.explore("10101", max_paths=5)
+    assert [len(path) for path in result['paths']] == [3, 5]
+    assert result['exhausted']
+
+
+def test_nondeterministic_explorer_deduplicates():
+    """Тест: повторные конфигурации не раскрываются, зацикленный поиск завершается"""
+    explorer = NondeterministicExplorer()
+    explorer.load_program(["0 _ 0 _ S", "0 _ 1 _ S", "1 _ 0 _ L", "0 1 0 1 R"])
+    result = explorer.explore("")
+    assert not result['accepted']
+    assert result['exhausted']
+    assert result['configurations'] == 2
+
+
+def test_nondeterministic_explorer_spills_frontier(tmp_path):
+    """Тест: при маленьком фронте поиск сбрасывает его на диск с тем же результатом"""
+    # Пишет на пустой ленте произвольное двоичное слово и принимает "01"
+    program = ["0 _ 0 0 R", "0 _ 0 1 R", "0 _ 1 _ L",
+               "1 0 1 0 L", "1 1 1 1 L", "1 _ 2 _ R",
+               "2 0 3 0 R", "3 1 4 1 R", "4 _ Y _ S"]
+    results = []
+    for limit in (100000, 16):
+        explorer = NondeterministicExplorer(frontier_limit=limit, spill_dir=tmp_path)
+        explorer.load_program(program)
+        results.append(explorer.explore("", max_depth=12))
+    assert results[1]['spilled'] > 0
+    assert results[0]['accepted']
+    paths = [[(c.state, c.symbol, c.new_state) for c in result['paths'][0]] for result in results]
+    assert paths[0] == paths[1]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_nondeterministic_explorer_best_first():
+    """Тест: эвристика направляет поиск, число раскрытий меньше, чем в ширину"""
+    # Пишет слово из 7 символов и принимает его, только если оно из одних единиц
+    program = [f"{k} _ {k + 1} {bit} R" for k in range(7) for bit in "01"]
+    program += ["7 _ c _ L", "c 1 c 1 L", "c _ Y _ S"]
+    goal = "1111111"
+
+    def mismatches(state, cells, head):
+        word = ''.join(cells).strip('_')
+        return sum(a != b for a, b in zip(word, goal)) + len(goal) - len(word)
+
+    explorer = NondeterministicExplorer()
+    explorer.load_program(program)
+    bfs = explorer.explore("")
+
+    explorer.heuristic = mismatches
+    best = explorer.explore("")
+    assert bfs['accepted'] and best['accepted']
+    assert best['expanded'] < bfs['expanded']
+
+
+def test_profiler_counts_transitions(tmp_path):
+    """Тест: профиль усердного бобра с 3 состояниями"""
+    tm = TuringMachine(log_level='off')
+    tm.load_program(Benchmark.BUSY_BEAVERS[3])
+    profiler = tm.enable_profiler()
+    tm.run()
+    assert tm.halted
+    assert profiler.steps == tm.step_count == 21
+    assert sum(profiler.hits.values()) == 21
+    assert set(profiler.hits) <= {f"{cmd.state} {cmd.symbol}" for cmd in tm.commands.commands}
+    assert sum(steps for steps, _ in profiler.states.values()) == 21
+    assert sum(profiler.cells.values()) == 21
+
+    report = json.loads(profiler.to_json(tmp_path / "profile.json"))
+    assert report == json.loads((tmp_path / "profile.json").read_text(encoding='utf-8'))
+    assert report['steps'] == 21
+    hits = list(report['transitions'].values())
+    assert hits == sorted(hits, reverse=True)
+
+    heatmap = profiler.heatmap(width=4)
+    assert heatmap.startswith("[") and '@' in heatmap
+    assert "Переходы:" in profiler.format()
+
+
+def test_profiler_disable_restores_step():
+    tm = TuringMachine(log_level='off')
+    tm.load_program(Benchmark.BUSY_BEAVERS[2])
+    tm.enable_profiler()
+    tm.run(max_steps=2)
+    profiler = tm.disable_profiler()
+    assert 'step' not in tm.__dict__ and tm.profiler is None
+    tm.run()
+    assert profiler.steps == 3
+    assert tm.step_count == 6
+
+
+def test_iter_steps_batches_match_log():
+    """Тест: события шагов по пачкам совпадают с журналом выполнения"""
+    tm = TuringMachine()
+    tm.load_program(Benchmark.BUSY_BEAVERS[3])
+    batches = list(tm.iter_steps(batch=5))
+    assert [len(batch) for batch in batches] == [5, 5, 5, 5, 1]
+    events = [event for batch in batches for event in batch]
+    assert tm.halted and tm.step_count == 21
+    assert [event.step for event in events] == list(range(21))
+    for event, entry in zip(events, tm.get_log()):
+        assert (event.state, event.symbol, event.new_state, event.new_symbol) == \
+            (entry['state'], entry['symbol'], entry['new_state'], entry['new_symbol'])
+    assert events[0] == (0, '0', '_', '1', '1', 0, 1)
+
+
+def test_iter_steps_max_steps():
+    tm = TuringMachine(log_level='off')
+    tm.load_program(["0 _ 0 1 R"])
+    assert sum(len(batch) for batch in tm.iter_steps(batch=3, max_steps=10)) == 10
+    assert tm.step_count == 10 and tm.tape.get_full_tape() == "1" * 10
+    with pytest.raises(ValueError):
+        next(tm.iter_steps(batch=0))
+
+
+def test_stream_steps_yields_to_event_loop():
+    """Тест: асинхронный прогон отдает управление циклу событий после каждой пачки"""
+    tm = TuringMachine(log_level='off')
+    tm.load_program(["0 _ 0 1 R"])
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(tm.step_count)
+            await asyncio.sleep(0)
+
+    async def main():
+        task = asyncio.create_task(ticker())
+        sizes = [len(batch) async for batch in stream_steps(tm, batch=100, max_steps=1000)]
+        task.cancel()
+        return sizes
+
+    assert asyncio.run(main()) == [100] * 10
+    assert len(set(ticks)) >= 5
+
+
+# Инверсия с дублированными состояниями: 1, 2, 3 и 4 делают одно и то же,
+# состояния 7 и 8 недостижимы
+REDUNDANT_INVERSION = [
+    "0 0 1 1 R", "0 1 3 0 R", "0 _ H x S",
+    "1 0 3 1 R", "1 1 2 0 R", "1 _ H _ S",
+    "2 0 1 1 R", "2 1 4 0 R", "2 _ H _ S",
+    "3 0 1 1 R", "3 1 4 0 R", "3 _ H _ S",
+    "4 0 3 1 R", "4 1 2 0 R", "4 _ H _ S",
+    "7 0 8 0 L", "8 _ 7 _ R",
+]
+
+
+def test_minimize_report():
+    commands = CommandSet()
+    for line in REDUNDANT_INVERSION:
+        commands.add_command(*commands.parse_line(line))
+    minimal, report = minimize(commands)
+    assert report == {
+        'states_before': 8, 'states_after': 3,
+        'transitions_before': 17, 'transitions_after': 6,
+        'unreachable': ['7', '8'],
+        'merged': {'3': '1', '4': '1', '2': '1'},
+    }
+    assert sorted((cmd.state, cmd.symbol, cmd.new_state) for cmd in minimal.commands) == [
+        ('0', '0', '1'), ('0', '1', '1'), ('0', '_', 'H'),
+        ('1', '0', '1'), ('1', '1', '1'), ('1', '_', 'H')]
+
+
+@pytest.mark.parametrize("name", [2, 3, 4])
+def test_minimize_keeps_busy_beavers(name):
+    """Тест: в чемпионах усердного бобра нечего удалять"""
+    commands = CommandSet()
+    for line in Benchmark.BUSY_BEAVERS[name]:
+        commands.add_command(*commands.parse_line(line))
+    _, report = minimize(commands)
+    assert report['states_after'] == report['states_before']
+    assert report['transitions_after'] == report['transitions_before']
+
+
+@pytest.mark.parametrize("program", [REDUNDANT_INVERSION, Benchmark.PALINDROME,
+                                     Benchmark.UNARY_MULTIPLICATION])
+def test_minimize_same_behaviour(program):
+    """Тест: минимальная программа работает так же на случайных лентах"""
+    rng = random.Random(20)
+    for _ in range(30):
+        tape_str = ''.join(rng.choice("01*=") for _ in range(rng.randrange(12)))
+        machines = []
+        for minimal in (False, True):
+            tm = TuringMachine(log_level='off')
+            tm.load_tape(tape_str)
+            tm.load_program(program)
+            if minimal:
+                report = tm.minimize()
+                rename = report['merged']
+            tm.run(max_steps=500)
+            machines.append(tm)
+        original, minimal = machines
+        assert minimal.tape.get_full_tape() == original.tape.get_full_tape()
+        assert minimal.tape.position == original.tape.position
+        assert minimal.step_count == original.step_count
+        assert minimal.halted == original.halted
+        assert minimal.current_state == rename.get(original.current_state, original.current_state)
+
+
+def turing_state(tm):
+    return (tm.current_state, tm.tape.position, tm.tape.cells(), tm.step_count, tm.halted)
+
+
+@pytest.mark.parametrize("tape_mode", ['dict', 'array', 'rle', 'mmap'])
+def test_save_and_load_state(tmp_path, tape_mode):
+    """Тест: прогон, прерванный сохранением, продолжается с того же места"""
+    reference = TuringMachine(tape_mode=tape_mode)
+    reference.load_program(Benchmark.BUSY_BEAVERS[4])
+    reference.run(max_steps=200)
+
+    tm = TuringMachine(tape_mode=tape_mode)
+    tm.load_program(Benchmark.BUSY_BEAVERS[4])
+    tm.run(max_steps=50)
+    tm.save_state(tmp_path / "bb4.state")
+
+    resumed = TuringMachine(tape_mode=tape_mode)
+    resumed.load_program(Benchmark.BUSY_BEAVERS[4])
+    resumed.load_state(tmp_path / "bb4.state")
+    assert turing_state(resumed) == turing_state(tm)
+    resumed.run(max_steps=200)
+    assert turing_state(resumed) == turing_state(reference)
+
+
+def test_load_state_errors(tmp_path):
+    tm = TuringMachine()
+    tm.load_tape("ab")
+    tm.load_program(["0 a 0 b R"])
+    tm.save_state(tmp_path / "run.state")
+
+    other = TuringMachine()
+    other.load_program(["0 a 0 c R"])
+    with pytest.raises(ValueError):
+        other.load_state(tmp_path / "run.state")
+
+    (tmp_path / "bad.state").write_bytes(b"L1RS\x01garbage")
+    with pytest.raises(ValueError):
+        tm.load_state(tmp_path / "bad.state")
+
+
+@pytest.mark.parametrize("log_level, engine", [('off', 'step'), ('off', 'vm'), ('full', 'step')])
+def test_run_autosave(tmp_path, log_level, engine):
+    """Тест: run периодически сохраняет состояние, последнее сохранение - итоговое"""
+    tm = TuringMachine(log_level=log_level)
+    tm.load_program(Benchmark.BUSY_BEAVERS[4])
+    saves = []
+    save_state = tm.save_state
+    tm.save_state = lambda filename: (saves.append(tm.step_count), save_state(filename))
+    steps = tm.run(max_steps=1000, autosave=tmp_path / "bb4.state", autosave_every=25,
+                   engine=engine)
+    assert steps == 107 and tm.halted
+    assert saves[:4] == [25, 50, 75, 100] and saves[-1] == 107
+
+    resumed = TuringMachine()
+    resumed.load_program(Benchmark.BUSY_BEAVERS[4])
+    resumed.load_state(tmp_path / "bb4.state")
+    assert turing_state(resumed) == turing_state(tm)
+
+
+MACRO_CASES = [
+    ("", Benchmark.BUSY_BEAVERS[3]),
+    ("", Benchmark.BUSY_BEAVERS[4]),
+    ("1" * 40 + "+" + "1" * 30, Benchmark.UNARY_ADDITION),
+    ("1" + "0" * 50, Benchmark.BINARY_INCREMENT),
+    ("0110" * 5 + "0110"[::-1] * 5, Benchmark.PALINDROME),
+    ("1", ["0 1 0 1 S"]),                       # цикл внутри блока
+    ("", ["0 _ 0 _ L"]),                        # бесконечный пробег по пустой ленте
+]
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 3, 5])
+@pytest.mark.parametrize("max_steps", [0, 1, 7, 100, 3000])
+@pytest.mark.parametrize("tape_str, program", MACRO_CASES)
+def test_run_macro_matches_run(tape_str, program, max_steps, block_size):
+    """Тест: макромашина дает тот же результат, что и пошаговый прогон"""
+    machines = []
+    for macro in (False, True):
+        tm = TuringMachine(log_level='off')
+        tm.load_tape(tape_str)
+        tm.load_program(program)
+        tm.run(max_steps=3)     # головка не на границе исходных данных
+        result = tm.run_macro(max_steps, block_size) if macro else tm.run(max_steps)
+        machines.append((result, turing_state(tm)))
+    assert machines[0] == machines[1]
+
+
+def test_run_macro_busy_beaver_5():
+    """Тест: усердный бобер с 5 состояниями доходит до остановки за доли секунды"""
+    tm = TuringMachine(log_level='off')
+    tm.load_program(Benchmark.BUSY_BEAVERS[5])
+    tm.run_macro(10 ** 9, block_size=3)
+    assert tm.halted
+    assert tm.step_count == 47176870
+    assert list(tm.tape.cells().values()).count('1') == 4098
+
+
+def test_block_tape_roundtrip():
+    cells = {-7: 'a', -1: 'b', 0: 'c', 4: 'd', 100: 'e'}
+    for size in (1, 2, 3, 8):
+        tape = BlockTape(cells, 2, size)
+        assert tape.cells() == cells
+
+
+def test_mapped_cells_grow_both_ways(tmp_path):
+    """Тест: файл ленты растет в обе стороны, окно сбрасывается в файл"""
+    cells = MappedCells(tmp_path / "tape.bin", chunk=16, window=4)
+    rng = random.Random(23)
+    expected = {}
+    for _ in range(2000):
+        position = rng.randrange(-300, 300)
+        code = rng.choice([0, 1, 2, 255])
+        cells.set(position, code)
+        expected[position] = code
+        probe = rng.randrange(-400, 400)
+        assert cells.get(probe) == expected.get(probe, 0)
+    nonzero = {position: code for position, code in expected.items() if code}
+    assert dict(cells.nonzero(-400, 400)) == nonzero
+    assert cells.bounds() == (min(nonzero), max(nonzero))
+    assert cells.export(-2, 3) == bytes(expected.get(p, 0) for p in range(-2, 3))
+
+    snapshot = cells.snapshot()
+    cells.set(1000, 7)
+    cells.restore(snapshot)
+    assert dict(cells.nonzero(-400, 2000)) == nonzero
+    cells.close()
+    assert (tmp_path / "tape.bin").stat().st_size >= 600
+
+
+def test_mapped_cells_max_cells():
+    cells = MappedCells(chunk=8, window=4, max_cells=32)
+    for position in range(16):
+        cells.set(position, 1)
+    with pytest.raises(MemoryError):
+        cells.set(100, 1)
+    cells.set(100, 0)       # запись нуля за пределами файла ничего не требует
+    assert cells.get(100) == 0
+    assert dict(cells.nonzero(0, 16)) == dict.fromkeys(range(16), 1)
+    cells.close()
+
+
+def test_mapped_tape_matches_tape():
+    """Тест: лента в файле ведет себя как лента-словарь"""
+    rng = random.Random(7)
+    tape, mapped = Tape("ab_c"), MappedTape("ab_c")
+    for _ in range(3000):
+        direction = rng.choice("LRS")
+        symbol = rng.choice("ab_c")
+        for t in (tape, mapped):
+            t.write(symbol)
+            t.move(direction)
+        assert mapped.read() == tape.read()
+    assert mapped.cells() == {p: s for p, s in tape.cells().items() if s != '_'}
+    assert mapped.get_full_tape() == visible_symbols(tape)
+    mapped.close()
+
+
+def visible_symbols(tape):
+    array_tape = ArrayTape()
+    for position, symbol in tape.cells().items():
+        array_tape.position = position
+        array_tape.write(symbol)
+    return array_tape.get_full_tape()
+
+
+def test_turing_machine_mmap_tape_limit():
+    """Тест: при переполнении лимита ячеек прогон прерывается ошибкой, а не съедает память"""
+    tm = TuringMachine(tape_mode='mmap', tape_options={'max_cells': 1000}, log_level='off')
+    tm.load_program(["0 _ 0 1 R"])
+    with pytest.raises(MemoryError):
+        tm.run(max_steps=10 ** 6)
+    # Ошибка на записи очередной ячейки: все предыдущие шаги на ленте
+    assert 0 < tm.step_count < 1000
+    assert tm.tape.cells() == dict.fromkeys(range(tm.step_count), '1')
+    assert tm.tape.position == tm.step_count
+
+
+def test_mmap_tape_reload_keeps_log(tmp_path):
+    """Тест: новая лента в том же файле не портит журнал прогона на старой"""
+    tm = TuringMachine(tape_mode='mmap', tape_options={'path': tmp_path / "tape.bin"})
+    tm.load_tape("111")
+    tm.load_program(["0 1 0 a R"])
+    tm.run()
+    log = tm.get_log()
+    assert [entry['tape_snapshot'].split(']')[0].strip('[_') for entry in log[:3]] == \
+        ['a11', 'aa1', 'aaa']
+
+    old_tape = tm.tape
+    tm.load_tape("1")
+    assert tm.get_log() == log
+    assert old_tape.store.map.closed
+    tm.halted = False
+    tm.run()
+    assert tm.get_log()[:len(log)] == log
+    assert tm.tape.get_full_tape() == "a"
+
+    tm.save_state(tmp_path / "state.bin")
+    tm.load_state(tmp_path / "state.bin")
+    assert tm.tape.get_full_tape() == "a"
+    tm.tape.close()
+
+
+@pytest.mark.parametrize("method", ['run_fast', 'run_sweeps', 'run_macro', 'run_compiled'])
+def test_fast_runs_check_mmap_tape_limit(method):
+    """Тест: быстрый прогон не переносит на ленту больше max_cells ячеек и не меняет машину"""
+    tm = TuringMachine(tape_mode='mmap', tape_options={'max_cells': 1000}, log_level='off')
+    tm.load_tape("11")
+    tm.load_program(["0 _ 0 1 R", "0 1 0 1 R"])
+    with pytest.raises(MemoryError):
+        getattr(tm, method)(5000)
+    assert turing_state(tm) == ('0', 0, {0: '1', 1: '1'}, 0, False)
+    assert tm.run_fast(300) == 300
+    assert len(tm.tape.cells()) == 301
+
+
+@pytest.mark.parametrize("tape_str, program, max_steps", RUN_CASES)
+def test_run_compiled_matches_run(tape_str, program, max_steps):
+    slow, fast = TuringMachine(), TuringMachine()
+    for tm in (slow, fast):
+        tm.load_tape(tape_str)
+        tm.load_program(program)
+
+    assert fast.run_compiled(max_steps) == slow.run(max_steps)
+    assert machine_state(fast) == machine_state(slow)
+
+
+@pytest.mark.parametrize("max_steps", [0, 1, 7, 100, 3000])
+@pytest.mark.parametrize("tape_str, program", MACRO_CASES)
+def test_run_compiled_continues_run(tape_str, program, max_steps):
+    """Тест: сгенерированный код продолжает прогон с любого места, лента растет в обе стороны"""
+    machines = []
+    for compiled in (False, True):
+        tm = TuringMachine(log_level='off')
+        tm.load_tape(tape_str)
+        tm.load_program(program)
+        tm.run(max_steps=3)
+        result = tm.run_compiled(max_steps) if compiled else tm.run(max_steps)
+        machines.append((result, turing_state(tm)))
+    assert machines[0] == machines[1]
+
+
+def test_codegen_cache():
+    """Тест: код одной программы генерируется и компилируется один раз"""
+    program = CommandSet()
+    for line in Benchmark.BUSY_BEAVERS[3]:
+        program.add_command(*line.split())
+    table = program.compile(('0',), {'_', '1'})
+    function = codegen.load(table)
+    assert codegen.load(program.compile(('0',), {'_', '1'})) is function
+    assert "def run(cells, position, pc, limit):" in codegen.generate(table)
+
+    # Та же программа в другом наборе команд берется из кэша по содержимому
+    other = CommandSet()
+    for line in Benchmark.BUSY_BEAVERS[3]:
+        other.add_command(*line.split())
+    assert codegen.load(other.compile(('0',), {'_', '1'})) is function
+
+    tm = TuringMachine(log_level='off')
+    tm.load_program(Benchmark.BUSY_BEAVERS[3])
+    assert tm.run_compiled(100) == 21
+    assert tm.halted
+
+
+def test_run_compiled_many_states():
+    """Тест: программа из тысяч состояний компилируется и выполняется как run_fast"""
+    program = Benchmark.make_cycle_program(4000)
+    machines = []
+    for method in ('run_fast', 'run_compiled'):
+        tm = TuringMachine(log_level='off')
+        tm.load_program(program)
+        result = getattr(tm, method)(20000)
+        machines.append((result, turing_state(tm)))
+    assert machines[0] == machines[1]
+    assert machines[0][1][0] == str(20001 % 4000)
+
+
+def reference_rows(tape_str, program, max_steps, stride):
+    """Строки диаграммы, снятые с ленты напрямую (без файла изменений)"""
+    tm = TuringMachine(log_level='off')
+    tm.load_tape(tape_str)
+    tm.load_program(program)
+    codes = {'_': 0}
+    snapshots, positions = [], set()
+    for step in range(max_steps + 1):
+        positions.update(tm.tape.cells(), [tm.tape.position])
+        if step % stride == 0:
+            snapshots.append((tm.tape.cells(), tm.tape.position))
+        if step == max_steps or not tm.step():
+            break
+    for cells, _ in snapshots:
+        for symbol in sorted(set(cells.values())):
+            codes.setdefault(symbol, len(codes) + 1)
+    low, high = min(positions), max(positions)
+    rows = []
+    for cells, head in snapshots:
+        row = bytearray(codes[cells.get(p, '_')] for p in range(low, high + 1))
+        row[head - low] = spacetime.HEAD
+        rows.append(bytes(row))
+    return rows
+
+
+@pytest.mark.parametrize("max_rows, stride", [(1024, 1), (20, 6)])
+def test_space_time_rows(max_rows, stride):
+    """Тест: строки диаграммы совпадают с лентой на каждом stride-м шаге"""
+    tm = TuringMachine(log_level='off')
+    tm.load_program(Benchmark.BUSY_BEAVERS[4])
+    diagram = spacetime.SpaceTimeDiagram(max_rows=max_rows)
+    assert diagram.record(tm, batch=7) == 107
+    assert tm.halted and diagram.stride == stride
+    rows = list(diagram.rows())
+    assert rows == reference_rows("", Benchmark.BUSY_BEAVERS[4], 107, stride)
+    assert diagram.shape == (len(rows), len(rows[0]))
+    diagram.close()
+
+
+def read_png(filename):
+    with open(filename, 'rb') as f:
+        data = f.read()
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    offset, chunks = 8, {}
+    while offset < len(data):
+        length, kind = struct.unpack_from('>I4s', data, offset)
+        chunks.setdefault(kind, []).append(data[offset + 8:offset + 8 + length])
+        offset += 12 + length
+    width, height = struct.unpack_from('>II', chunks[b'IHDR'][0])
+    pixels = zlib.decompress(b''.join(chunks[b'IDAT']))
+    rows = [pixels[i * (width + 1):(i + 1) * (width + 1)] for i in range(height)]
+    assert all(row[0] == 0 for row in rows)
+    return chunks, [row[1:] for row in rows]
+
+
+def test_space_time_png_and_ppm(tmp_path):
+    """Тест: картинка с прореживанием строк и столбцов пишется в PNG и PPM"""
+    tm = TuringMachine(log_level='off')
+    tm.load_tape("1" * 300)
+    tm.load_program(["0 1 0 1 R", "0 _ 1 _ L", "1 1 1 _ L"])
+    diagram = spacetime.SpaceTimeDiagram(max_rows=50, max_columns=40)
+    diagram.record(tm)
+    assert diagram.steps == 601 and diagram.shape == (47, 38)
+
+    diagram.write_png(tmp_path / "run.png")
+    chunks, rows = read_png(tmp_path / "run.png")
+    assert rows == list(diagram.rows())
+    assert chunks[b'PLTE'][0][:9] == bytes([255, 255, 255, 220, 40, 40, 0, 0, 0])
+    assert rows[0] == bytes([1]) + bytes([2]) * 37     # головка в начале, дальше единицы
+    assert rows[-1] == bytes([1]) + bytes(37)          # все стерто
+
+    diagram.write_ppm(tmp_path / "run.ppm")
+    data = (tmp_path / "run.ppm").read_bytes()
+    assert data.startswith(b'P6\n38 47\n255\n')
+    assert len(data) == len(b'P6\n38 47\n255\n') + 47 * 38 * 3
+    assert data[-3 * 37:] == bytes([255]) * 3 * 37
+    diagram.close()
+
+
+def test_space_time_record_turns_log_off():
+    """Тест: запись диаграммы не копит журнал, прежний журнал остается"""
+    tm = TuringMachine()
+    tm.load_program(Benchmark.BUSY_BEAVERS[4])
+    tm.run(max_steps=9)
+    log = tm.log
+    before = log.get_log()
+    diagram = spacetime.SpaceTimeDiagram()
+    assert diagram.record(tm, max_steps=50) == 50
+    assert tm.log is log and log.level == 'full'
+    assert log.get_log() == before
+    tm.run(max_steps=5)
+    assert len(tm.log) == len(before) + 6
+    diagram.close()
+
+
+def test_space_time_image():
+    numpy = pytest.importorskip("numpy")
+    tm = TuringMachine(log_level='off')
+    tm.load_program(Benchmark.BUSY_BEAVERS[3])
+    diagram = spacetime.SpaceTimeDiagram()
+    diagram.record(tm)
+    image = diagram.image()
+    assert image.dtype == numpy.uint8 and image.shape == diagram.shape
+    assert [bytes(row) for row in image] == list(diagram.rows())
+    diagram.close()
+
+
+LITERAL_BLANK_CASES = [
+    ("___1__", ["0 _ 0 _ R", "0 1 H 1 S"]),
+    ("_a_b__", ["0 _ 0 x R", "0 a 0 a R", "0 b 1 _ L", "1 x 1 _ L", "1 a 1 a L"]),
+    ("1__1", ["0 1 0 1 R", "0 _ 0 _ R"]),
+]
+
+
+@pytest.mark.parametrize("method", ['run_fast', 'run_sweeps', 'run_macro', 'run_compiled'])
+@pytest.mark.parametrize("max_steps", [0, 1, 2, 5, 33])
+@pytest.mark.parametrize("tape_str, program", LITERAL_BLANK_CASES)
+def test_fast_runs_keep_literal_blanks(tape_str, program, max_steps, method):
+    """Тест: явные '_' из исходных данных удаляются с ленты, только если в них писали"""
+    machines = []
+    for name in ('run', method):
+        tm = TuringMachine()
+        tm.load_tape(tape_str)
+        tm.load_program(program)
+        result = getattr(tm, name)(max_steps)
+        machines.append((result, turing_state(tm)))
+    assert machines[0] == machines[1]
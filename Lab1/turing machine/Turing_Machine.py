@@ -1,96 +1,576 @@
-from Tape import Tape
-from Command import CommandSet
+import io
+import os
+import sys
+from bisect import bisect_right, insort
+from collections import namedtuple
+from functools import lru_cache, partial
+
+from Tape import TAPE_MODES, MappedTape, RunLengthTape
+from Command import Command, CommandSet, CompiledProgram
+from ExecutionLog import ExecutionLog
+from Macro_Machine import BlockTape, block_transition
+from Minimizer import minimize
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from engine import codegen, program_cache, run_state, streaming, vm
+from engine.loop_detector import LoopDetector
+from engine.profiler import Profiler
+
+# Событие шага (см. iter_steps): номер шага, состояние и символ до шага,
+# новое состояние и символ, позиция записанной ячейки и новая позиция головки
+StepEvent = namedtuple('StepEvent', 'step state symbol new_state new_symbol position new_position')
+
+# Метка явно записанного '_' на ленте-словаре (так хранятся '_' из исходных
+# данных). run() удаляет такую ячейку, только когда пишет в нее, поэтому
+# быстрые прогоны работают на копии ленты, где эти ячейки помечены, а метка
+# читается программой как '_' (см. _fast_copy)
+BLANK_MARK = object()
+
+# Исполнители run: 'step' - пошагово через step, 'vm' - по скомпилированной таблице
+ENGINES = ('step', 'vm')
 
 
 class TuringMachine:
-    def __init__(self):
-        self.tape = Tape()
+    def __init__(self, tape_mode='dict', log_level='full', log_size=1000,
+                 checkpoint_interval=None, tape_options=None):
+        if tape_mode not in TAPE_MODES:
+            raise ValueError(f"Неизвестный режим ленты: {tape_mode}")
+        # tape_options - параметры конструктора ленты, например max_cells для 'mmap'
+        self.tape_class = partial(TAPE_MODES[tape_mode], **(tape_options or {}))
+        self.tape = self.tape_class()
         self.commands = CommandSet()
         self.current_state = '0'  # начальное состояние
         self.halted = False
-        self.log = []  # лог выполнения
+        self.log = ExecutionLog(log_level, log_size)  # лог выполнения
         self.step_count = 0  # счетчик шагов
+        self.cycle = None  # найденный цикл (см. run с detect_loops=True)
+        self.profiler = None  # профилировщик шагов (см. enable_profiler)
+
+        # Контрольные точки для перемотки (см. seek): шаг -> (лента, позиция, состояние)
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoints = {}
+        self.checkpoint_steps = []
 
     def load_tape(self, tape_str):
         """Загружает данные на ленту"""
-        self.tape = Tape(tape_str)
+        self.tape = self._new_tape(tape_str)
+        self.clear_checkpoints()
+
+    def _new_tape(self, *args):
+        """Новая лента взамен текущей.
+
+        Лента в файле закрывается до того, как откроют новую: с тем же path
+        новая лента перезаписала бы файл старой, а журнал еще читает старую
+        ленту - поэтому он сначала разворачивает ее снимки.
+        """
+        if isinstance(self.tape, MappedTape):
+            self.log.freeze()
+            self.tape.close()
+        return self.tape_class(*args)
 
     def load_program(self, program_lines):
         """Загружает программу из списка строк"""
         for line in program_lines:
-            line = line.strip()
-            if line and not line.startswith('#'):
-                parts = line.split()
-                if len(parts) == 5:
-                    state, symbol, new_state, new_symbol, direction = parts
-                    self.commands.add_command(state, symbol, new_state, new_symbol, direction)
+            parts = self.commands.parse_line(line)
+            if parts is not None:
+                self.commands.add_command(*parts)
+
+    def load_program_from_file(self, filename, cache_dir=None):
+        """Загружает программу из файла.
 
-    def load_program_from_file(self, filename):
-        """Загружает программу из файла"""
-        self.commands.load_from_file(filename)
+        Разобранная программа кэшируется по хэшу содержимого файла: в памяти
+        процесса и, если задан cache_dir, в двоичном файле в этом каталоге,
+        так что повторные загрузки той же программы не разбирают текст.
+        """
+        with open(filename, 'rb') as f:
+            data = f.read()
+        digest = program_cache.source_digest(data)
+
+        cached = program_cache.load('turing', digest, cache_dir)
+        if cached is not None:
+            strings, rows = cached
+            for row in rows:
+                self.commands.add_command(*[strings[code] for code in row])
+            return
+
+        table = program_cache.StringTable()
+        rows = []
+        for line in io.TextIOWrapper(io.BytesIO(data), encoding='utf-8'):
+            parts = self.commands.parse_line(line)
+            if parts is not None:
+                self.commands.add_command(*parts)
+                rows.append([table.intern(part) for part in parts])
+        program_cache.store('turing', digest, table.strings, rows, 5, cache_dir)
+
+    def minimize(self):
+        """Заменяет программу минимальной: без недостижимых и эквивалентных состояний.
+
+        Достижимость считается от текущего состояния. Возвращает отчет
+        minimize (см. Minimizer.py) с числом состояний и переходов до и после.
+        """
+        self.commands, report = minimize(self.commands, self.current_state)
+        return report
 
     def step(self):
         """Выполняет один шаг машины"""
         if self.halted:
             return False
 
+        if self.checkpoint_interval and self.step_count % self.checkpoint_interval == 0:
+            self._save_checkpoint()
+
         current_symbol = self.tape.read()
         cmd = self.commands.find_command(self.current_state, current_symbol)
 
         if cmd is None:
             self.halted = True
-            # Логируем остановку
-            self.log.append({
-                'step': self.step_count,
-                'state': self.current_state,
-                'symbol': current_symbol,
-                'new_state': 'HALT',
-                'new_symbol': current_symbol,
-                'direction': 'S',
-                'position': self.tape.position,
-                'tape_snapshot': self.tape.get_visible_tape()
-            })
+            # Логируем остановку как команду, которая ничего не меняет
+            halt = Command(self.current_state, current_symbol, 'HALT', current_symbol, 'S')
+            self.log.record(self.step_count, halt, self.tape.position, self.tape)
             return False
 
         # Выполняем команду
-        old_state = self.current_state
-        old_symbol = current_symbol
+        position = self.tape.position
         self.tape.write(cmd.new_symbol)
         self.tape.move(cmd.direction)
         self.current_state = cmd.new_state
 
-        # Логируем шаг
-        self.log.append({
-            'step': self.step_count,
-            'state': old_state,
-            'symbol': old_symbol,
-            'new_state': cmd.new_state,
-            'new_symbol': cmd.new_symbol,
-            'direction': cmd.direction,
-            'position': self.tape.position,
-            'tape_snapshot': self.tape.get_visible_tape()
-        })
+        # Логируем шаг: команда и позиция записанной ячейки
+        self.log.record(self.step_count, cmd, position, self.tape)
 
         self.step_count += 1
         return True
 
-    def run(self, max_steps=1000):
-        """Запускает выполнение до остановки или достижения max_steps"""
+    def enable_profiler(self, profiler=None):
+        """Включает профилирование шагов и возвращает профилировщик (см. engine/profiler.py).
+
+        Переход в профиле - пара "состояние символ". step подменяется оберткой,
+        поэтому без профилировщика шаги не замедляются.
+        """
+        self.profiler = profiler or Profiler()
+        self.step = self.profiler.wrap(
+            TuringMachine.step.__get__(self),
+            lambda: (f"{self.current_state} {self.tape.read()}",
+                     self.current_state, self.tape.position))
+        return self.profiler
+
+    def disable_profiler(self):
+        """Выключает профилирование и возвращает накопленный профиль"""
+        profiler, self.profiler = self.profiler, None
+        self.__dict__.pop('step', None)
+        return profiler
+
+    def _save_checkpoint(self):
+        if self.step_count not in self.checkpoints:
+            self.checkpoints[self.step_count] = (
+                self.tape.snapshot(), self.tape.position, self.current_state)
+            insort(self.checkpoint_steps, self.step_count)
+
+    def clear_checkpoints(self):
+        """Забывает контрольные точки (например, после ручной правки ленты)"""
+        self.checkpoints = {}
+        self.checkpoint_steps = []
+
+    def seek(self, step):
+        """Переводит машину к состоянию после step шагов.
+
+        Восстанавливается ближайшая контрольная точка не позже step, затем
+        недостающие шаги доигрываются - не больше checkpoint_interval шагов.
+        Если журнал хранит шаги, вперед машина просто доигрывается от текущего
+        шага, иначе в журнале остался бы пропуск. Возвращает False, если
+        машина остановилась раньше шага step.
+        """
+        forward = self.step_count <= step and not self.halted
+        if not (forward and self.log.level in ('ring', 'full')):
+            i = bisect_right(self.checkpoint_steps, step) - 1
+            if i < 0:
+                raise ValueError(f"Нет контрольной точки для шага {step}")
+            base = self.checkpoint_steps[i]
+            if not forward or base > self.step_count:
+                snapshot, position, state = self.checkpoints[base]
+                self.tape.restore(snapshot)
+                self.tape.position = position
+                self.current_state = state
+                self.step_count = base
+                self.halted = False
+                self.cycle = None
+                self.log.truncate(base)
+
+        while self.step_count < step and self.step():
+            pass
+        return self.step_count == step
+
+    def step_back(self):
+        """Откатывает машину на один шаг назад"""
+        if self.step_count == 0:
+            return False
+        return self.seek(self.step_count - 1)
+
+    def program_digest(self):
+        """Хэш загруженной программы (по переходам в порядке объявления)"""
+        text = '\n'.join(f"{cmd.state} {cmd.symbol} {cmd.new_state} {cmd.new_symbol} {cmd.direction}"
+                         for cmd in self.commands.commands)
+        return program_cache.source_digest(text.encode('utf-8'))
+
+    def save_state(self, filename):
+        """Сохраняет ленту, головку, состояние и счетчик шагов в двоичный файл.
+
+        Формат - engine/run_state.py; в файл записывается хэш программы, по
+        которому load_state проверяет, что загружена та же программа.
+        """
+        cells = self.tape.cells()
+        symbols = ['_']
+        codes = {'_': 0}
+        low = min(cells, default=0)
+        high = max(cells, default=-1)
+        table = [0] * (high - low + 1)
+        for cell, symbol in cells.items():
+            code = codes.get(symbol)
+            if code is None:
+                code = codes[symbol] = len(symbols)
+                symbols.append(symbol)
+            table[cell - low] = code
+        data = run_state.pack('turing', self.program_digest(), self.current_state,
+                              self.tape.position, self.step_count, self.halted,
+                              (low, high), symbols[1:], low, table)
+        run_state.save(filename, data)
+
+    def load_state(self, filename):
+        """Восстанавливает машину из файла save_state; программа должна быть уже загружена"""
+        saved = run_state.unpack('turing', run_state.load(filename))
+        if saved['digest'] != self.program_digest():
+            raise ValueError("Состояние сохранено для другой программы")
+        symbols = ['_'] + saved['symbols']
+        tape = self._new_tape()
+        for offset, code in enumerate(saved['codes']):
+            if code:
+                tape.position = saved['low'] + offset
+                tape.write(symbols[code])
+        tape.position = saved['position']
+        self.tape = tape
+        self.current_state = saved['state']
+        self.step_count = saved['steps']
+        self.halted = saved['halted']
+        self.cycle = None
+        self.log.clear()
+        self.clear_checkpoints()
+
+    def run(self, max_steps=1000, detect_loops=False, autosave=None, autosave_every=100000,
+            engine='step'):
+        """Запускает выполнение до остановки или достижения max_steps.
+
+        С detect_loops=True выполнение прерывается, как только доказано, что
+        машина зациклилась; описание цикла попадает в get_status()['cycle'].
+        Если задан файл autosave, состояние сохраняется в него (save_state)
+        каждые autosave_every шагов и в конце прогона.
+        С engine='vm' прогон идет через run_fast - по скомпилированной
+        таблице, без журнала, поиска циклов, контрольных точек и профилировщика.
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Неизвестный исполнитель: {engine}")
+        self.cycle = None
+        if engine == 'vm':
+            if detect_loops or self.checkpoint_interval or self.profiler is not None:
+                raise ValueError("Поиск циклов, контрольные точки и профилировщик "
+                                 "работают только пошагово")
+            return self.run_fast(max_steps, autosave, autosave_every)
+
+        detector = None
+        if detect_loops:
+            detector = LoopDetector('_')
+            detector.start(self.step_count, self.current_state, self.tape.position, self.tape)
+
         steps_executed = 0
         while self.step() and steps_executed < max_steps:
             steps_executed += 1
+            if autosave is not None and self.step_count % autosave_every == 0:
+                self.save_state(autosave)
+            if detector is not None:
+                self.cycle = detector.check(self.step_count, self.current_state,
+                                            self.tape.position, self.tape)
+                if self.cycle is not None:
+                    break
+        if autosave is not None:
+            self.save_state(autosave)
         return steps_executed
 
+    def iter_steps(self, batch=100, max_steps=None):
+        """Генератор выполнения: выдает списки из batch событий StepEvent.
+
+        Выполняет не больше max_steps шагов (None - до остановки); шаги идут
+        через step, так что журнал, контрольные точки и профилировщик работают
+        как при run. Асинхронная обертка - engine.streaming.stream_steps.
+        """
+        return streaming.batched(self._step_events(max_steps), batch)
+
+    def _step_events(self, max_steps):
+        executed = 0
+        while max_steps is None or executed < max_steps:
+            state, position = self.current_state, self.tape.position
+            symbol = self.tape.read()
+            if not self.step():
+                return
+            executed += 1
+            yield StepEvent(self.step_count - 1, state, symbol, self.current_state,
+                            self.tape.read_at(position), position, self.tape.position)
+
+    def run_fast(self, max_steps=1000, autosave=None, autosave_every=100000):
+        """Быстрый прогон по скомпилированной таблице переходов, без журнала.
+
+        Оставляет машину в том же состоянии, что и run(max_steps): то же
+        состояние, лента, позиция, счетчик шагов и признак остановки.
+        С autosave прогон идет отрезками по autosave_every шагов, после
+        каждого состояние сохраняется в файл autosave.
+        """
+        # run() выполняет на один переход больше, чем возвращает (см. условие цикла)
+        limit = max(max_steps, 0) + 1
+        if autosave is None:
+            steps = self.execute(limit)
+        else:
+            steps = 0
+            while True:
+                steps += self.execute(min(autosave_every, limit - steps))
+                self.save_state(autosave)
+                if steps >= limit or self.halted:
+                    break
+        return min(steps, max(max_steps, 0))
+
+    def run_compiled(self, max_steps=1000):
+        """Прогон по коду на Python, сгенерированному для этой программы, без журнала.
+
+        Каждое состояние становится отдельным блоком с проверками символов
+        прямо в тексте (см. engine.codegen); скомпилированный код кэшируется,
+        повторные прогоны той же программы его не пересобирают. Результат
+        совпадает с run(max_steps).
+        """
+        return min(self.execute(max(max_steps, 0) + 1, generated=True), max(max_steps, 0))
+
+    def execute(self, limit, generated=False):
+        """Выполняет ровно limit переходов (или меньше, если машина остановилась).
+
+        Работает по скомпилированной таблице переходов, без журнала; с
+        generated - по сгенерированному из таблицы коду (см. engine.codegen).
+        Возвращает число выполненных переходов.
+        """
+        if self.halted:
+            return 0
+        self.log.freeze()
+
+        cells, marked, extra = self._fast_copy()
+        if extra:
+            program = CompiledProgram(self.commands.commands + extra, (self.current_state,),
+                                      set(marked.values()))
+        else:
+            program = self.commands.compile((self.current_state,), set(marked.values()))
+        codes = program.symbol_codes
+
+        # Локальная копия ленты: список кодов от самой левой до самой правой ячейки
+        position = self.tape.position
+        low = min(min(cells, default=position), position)
+        high = max(max(cells, default=position), position)
+        buffer = [0] * (high - low + 1)
+        for cell, symbol in marked.items():
+            buffer[cell - low] = codes[symbol]
+
+        pc = program.state_codes[self.current_state]
+        if generated:
+            steps, index, state, status, shift = codegen.load(program)(
+                buffer, position - low, pc, limit)
+        else:
+            steps, index, state, status, shift, _, _ = program.execute(
+                buffer, position - low, pc, limit)
+
+        low -= shift
+        symbols = program.symbols
+        self._write_back(cells, {low + offset: symbols[code]
+                                 for offset, code in enumerate(buffer) if code}, low + index)
+
+        self.current_state = program.states[state]
+        self.halted = status == vm.HALT
+        self.step_count += steps
+        return steps
+
+    def _fast_copy(self):
+        """Содержимое ленты для быстрого прогона: (ячейки, копия, доп. команды).
+
+        В копии явные '_' заменены на BLANK_MARK, а доп. команды повторяют
+        для метки команды для '_'. Без явных '_' копия - те же ячейки.
+        """
+        cells = self.tape.cells()
+        if '_' not in cells.values():
+            return cells, cells, []
+        marked = {cell: BLANK_MARK if symbol == '_' else symbol for cell, symbol in cells.items()}
+        extra = [Command(cmd.state, BLANK_MARK, cmd.new_state, cmd.new_symbol, cmd.direction)
+                 for cmd in self.commands.commands if cmd.symbol == '_']
+        return cells, marked, extra
+
+    def _index(self, extra):
+        """Индекс переходов с дополнительными командами (см. _fast_copy)"""
+        if not extra:
+            return self.commands.index
+        index = dict(self.commands.index)
+        index.update(((cmd.state, cmd.symbol), cmd) for cmd in extra)
+        return index
+
+    def _write_back(self, old_cells, new_cells, head):
+        """Переносит на ленту результат прогона на ее копии и ставит головку в head.
+
+        old_cells - содержимое ленты до прогона, new_cells - после (пустые
+        ячейки можно не указывать, нетронутые явные '_' - BLANK_MARK);
+        записываются только изменившиеся ячейки и явные '_', в которые писали.
+        Место на ленте в файле готовится заранее: если оно превышает max_cells,
+        MemoryError выбрасывается до того, как лента изменится.
+        """
+        if isinstance(self.tape, MappedTape) and new_cells:
+            self.tape.reserve(min(new_cells), max(new_cells))
+        for cell in old_cells.keys() | new_cells.keys():
+            symbol = new_cells.get(cell, '_')
+            if symbol is BLANK_MARK:
+                continue
+            old = old_cells.get(cell, '_')
+            if symbol != old or (old == '_' and cell in old_cells):
+                self.tape.position = cell
+                self.tape.write(symbol)
+        self.tape.position = head
+
+    def run_sweeps(self, max_steps=1000):
+        """Прогон с ускорением переходов-"пробегов", без журнала.
+
+        Переход вида (q, a) -> (q, a, L/R) повторяется, пока под головкой a,
+        поэтому вся серия одинаковых символов проходится за одну операцию на
+        RunLengthTape, а к step_count добавляется длина серии. Результат
+        совпадает с run(max_steps).
+        """
+        if self.halted:
+            return 0
+        self.log.freeze()
+
+        tape = self.tape
+        extra = []
+        if not isinstance(tape, RunLengthTape):
+            cells, marked, extra = self._fast_copy()
+            tape = RunLengthTape()
+            for cell, symbol in sorted(marked.items(), key=lambda item: item[0]):
+                tape.position = cell
+                tape.write(symbol)
+            tape.position = self.tape.position
+
+        index = self._index(extra)
+        # run() выполняет на один переход больше, чем возвращает (см. условие цикла)
+        limit = max(max_steps, 0) + 1
+        state = self.current_state
+        steps = 0
+        halted = False
+        while steps < limit:
+            cmd = index.get((state, tape.read()))
+            if cmd is None:
+                halted = True
+                break
+            if cmd.sweep:
+                run = tape.run_length(cmd.direction)
+                count = limit - steps if run is None else min(run, limit - steps)
+                tape.jump(cmd.direction, count)
+                steps += count
+                continue
+            tape.write(cmd.new_symbol)
+            tape.move(cmd.direction)
+            state = cmd.new_state
+            steps += 1
+
+        if tape is not self.tape:
+            self._write_back(cells, tape.cells(), tape.position)
+
+        self.current_state = state
+        self.halted = halted
+        self.step_count += steps
+        return min(steps, max(max_steps, 0))
+
+    def run_macro(self, max_steps=1000, block_size=3, cache_size=65536):
+        """Прогон макромашины: лента делится на блоки по block_size ячеек, без журнала.
+
+        Переход блока (состояние, содержимое, сторона входа) -> (новый блок,
+        состояние, сторона выхода, шаги) вычисляется по ячейкам один раз и
+        запоминается в LRU-кэше на cache_size переходов. Лента хранится
+        сериями одинаковых блоков (см. BlockTape): если головка проходит блок
+        насквозь, не меняя состояния, вся серия таких блоков проходится за раз.
+        Переход, не помещающийся в оставшийся бюджет шагов, и циклы внутри
+        блока доигрываются по ячейкам. Результат совпадает с run(max_steps).
+        """
+        if self.halted:
+            return 0
+        if block_size < 1:
+            raise ValueError("Размер блока должен быть положительным")
+        self.log.freeze()
+
+        old_cells, marked, extra = self._fast_copy()
+        index = self._index(extra)
+        transition = lru_cache(maxsize=cache_size)(partial(block_transition, index))
+        tape = BlockTape(marked, self.tape.position, block_size)
+        # run() выполняет на один переход больше, чем возвращает (см. условие цикла)
+        limit = max(max_steps, 0) + 1
+        state = self.current_state
+        steps = 0
+        head = None  # позиция головки, если прогон закончился внутри блока
+        halted = False
+        while steps < limit:
+            forward = tape.direction == 'R'
+            stack = tape.right if forward else tape.left
+            block, run = tape.top(stack)
+            entry = 0 if forward else block_size - 1
+            new_block, new_state, exit, cost, inner = transition(state, block, entry)
+
+            remaining = limit - steps
+            if exit == 'loop' or cost > remaining or (exit == 'halt' and cost == remaining):
+                # Переход целиком не помещается в бюджет - доигрываем по ячейкам
+                new_block, new_state, exit, cost, inner = block_transition(
+                    index, state, block, entry, remaining)
+            if exit == 'halt' or exit is None:
+                tape.pop(stack)
+                tape.push(stack, new_block)
+                head = (tape.boundary if forward else tape.boundary - block_size) + inner
+                halted = exit == 'halt'
+                state = new_state
+                steps += cost
+                break
+
+            count = 1
+            if exit == tape.direction:
+                # Головка прошла блок насквозь; в том же состоянии - всю серию сразу
+                if new_state == state:
+                    count = remaining // cost if run is None else min(run, remaining // cost)
+                tape.pop(stack, count)
+                tape.push(tape.left if forward else tape.right, new_block, count)
+                tape.boundary += count * block_size if forward else -count * block_size
+            else:
+                # Головка вернулась назад: блок остается на месте
+                tape.pop(stack)
+                tape.push(stack, new_block)
+                tape.direction = exit
+            state = new_state
+            steps += count * cost
+
+        if head is None:
+            head = tape.boundary if tape.direction == 'R' else tape.boundary - 1
+
+        self._write_back(old_cells, tape.cells(), head)
+
+        self.current_state = state
+        self.halted = halted
+        self.step_count += steps
+        return min(steps, max(max_steps, 0))
+
     def get_log(self):
-        """Возвращает лог выполнения"""
-        return self.log
+        """Возвращает лог выполнения; снимки ленты восстанавливаются при вызове"""
+        return self.log.get_log()
 
     def reset(self):
         """Сбрасывает машину в начальное состояние"""
         self.current_state = '0'
         self.halted = False
-        self.log = []
+        self.log.clear()
         self.step_count = 0
+        self.cycle = None
+        self.clear_checkpoints()
 
     def get_status(self):
         """Возвращает текущий статус машины"""
@@ -100,5 +580,6 @@ class TuringMachine:
             'symbol': self.tape.read(),
             'halted': self.halted,
             'steps': self.step_count,
-            'tape_content': self.tape.get_full_tape()
+            'tape_content': self.tape.get_full_tape(),
+            'cycle': self.cycle
         }
\ No newline at end of file